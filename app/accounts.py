@@ -0,0 +1,67 @@
+"""
+Account creation for email signups.
+
+Usernames are derived from the email's local part. Instead of probing
+``rahul``, ``rahul1``, ``rahul2``... with one query each, we insert
+directly and let the unique index on ``auth_user.username`` arbitrate:
+on a collision we retry with a random numeric suffix that grows by a digit
+each time, so even a very common local part settles in one or two inserts
+and concurrent signups can never both claim the same name.
+"""
+import random
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from .backends import users_by_email
+from .models import UserProfile
+
+MAX_ATTEMPTS = 8
+FIRST_SUFFIX_DIGITS = 4
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+
+
+class EmailAlreadyRegistered(Exception):
+    pass
+
+
+def username_candidates(email):
+    """The bare local part first, then random suffixes of increasing length"""
+    base = email.split('@')[0][:USERNAME_MAX_LENGTH - FIRST_SUFFIX_DIGITS - MAX_ATTEMPTS] or 'user'
+    yield base
+    for digits in range(FIRST_SUFFIX_DIGITS, FIRST_SUFFIX_DIGITS + MAX_ATTEMPTS - 1):
+        yield f'{base}{random.randrange(10 ** (digits - 1), 10 ** digits)}'
+
+
+async def acreate_user_with_profile(email, password, **extra_fields):
+    """
+    Create a user and its profile with a unique username, without any
+    read-before-write. Raises EmailAlreadyRegistered if the email is taken
+    (including by a concurrent signup that won the race).
+
+    The password is hashed once, in a worker thread so the event loop keeps
+    serving; the inserts need a transaction, which the async ORM cannot
+    open, so they run as one sync call.
+    """
+    password_hash = await sync_to_async(make_password, thread_sensitive=False)(password)
+    return await sync_to_async(insert_user_with_profile)(email, password_hash, **extra_fields)
+
+
+def insert_user_with_profile(email, password_hash, **extra_fields):
+    """The insert loop of acreate_user_with_profile(), for an already hashed password"""
+    email = User.objects.normalize_email(email.strip())
+    for username in username_candidates(email):
+        try:
+            with transaction.atomic():
+                user = User(username=User.normalize_username(username), email=email, **extra_fields)
+                user.password = password_hash
+                user.save()
+                UserProfile.objects.create(user=user)
+                return user
+        except IntegrityError:
+            # Either the username or the email is taken; only the former is retryable
+            if users_by_email(email).exists():
+                raise EmailAlreadyRegistered(email)
+    raise IntegrityError(f"Could not allocate a unique username for {email}")
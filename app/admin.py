@@ -2,8 +2,13 @@ from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
 from .models import *
+from .catalog import invalidate_catalog
+from .eligibility import ELIGIBLE_SCORE
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -81,12 +86,15 @@ class LoanProductAdmin(admin.ModelAdmin):
     actions = ['activate_products', 'deactivate_products']
     
     def activate_products(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        # queryset.update() skips post_save, so invalidate the catalog by hand
+        updated = queryset.update(is_active=True, updated_at=timezone.now())
+        invalidate_catalog()
         self.message_user(request, f'{updated} products were successfully activated.')
     activate_products.short_description = "Activate selected products"
     
     def deactivate_products(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, updated_at=timezone.now())
+        invalidate_catalog()
         self.message_user(request, f'{updated} products were successfully deactivated.')
     deactivate_products.short_description = "Deactivate selected products"
     
@@ -110,11 +118,100 @@ class LoanProductAdmin(admin.ModelAdmin):
     tenure_range_display.admin_order_field = 'min_tenure'
 
 
+def human_size(size):
+    if size < 1024:
+        return f"{size} bytes"
+    elif size < 1024*1024:
+        return f"{size/1024:.1f} KB"
+    else:
+        return f"{size/(1024*1024):.1f} MB"
+
+
+def thumbnail_preview(obj):
+    """The normalized thumbnail, linking to the full document"""
+    if not obj.thumbnail:
+        return obj.get_processing_status_display() if obj.content_type.startswith('image/') else "-"
+    return format_html(
+        '<a href="{}" target="_blank"><img src="{}" alt="" style="max-height:80px;max-width:120px"></a>',
+        obj.document_file.url, obj.thumbnail.url,
+    )
+thumbnail_preview.short_description = 'Preview'
+
+
 class LoanDocumentInline(admin.TabularInline):
     model = LoanDocument
     extra = 0
-    readonly_fields = ['uploaded_at', 'original_filename']
-    fields = ['document_type', 'document_file', 'is_mandatory', 'uploaded_at']
+    readonly_fields = ['uploaded_at', 'original_filename', 'preview']
+    fields = ['preview', 'document_type', 'document_file', 'is_mandatory', 'uploaded_at']
+
+    def preview(self, obj):
+        return thumbnail_preview(obj) if obj.pk else "-"
+    preview.short_description = 'Preview'
+
+
+def annotate_document_counts(queryset):
+    """
+    Annotate applications with ``documents_total``, ``mandatory_documents``
+    (distinct mandatory types uploaded) and ``required_documents``.
+
+    Correlated subqueries rather than JOIN + GROUP BY, so the database only
+    evaluates them for the page of rows being displayed and the changelist's
+    COUNT(*) stays a plain count.
+    """
+    documents = LoanDocument.objects.filter(application=OuterRef('pk')).order_by().values('application')
+    total = documents.annotate(n=Count('pk')).values('n')
+    mandatory = (
+        documents.filter(is_mandatory=True)
+        .annotate(n=Count('document_type', distinct=True)).values('n')
+    )
+    return queryset.annotate(
+        documents_total=Coalesce(Subquery(total), 0),
+        mandatory_documents=Coalesce(Subquery(mandatory), 0),
+        # Mirrors views.mandatory_documents_for: Aadhar + PAN, plus Udyam for business loans
+        required_documents=Case(
+            When(loan_product__category__icontains='business', then=Value(3)),
+            default=Value(2),
+        ),
+    )
+
+
+class DocumentCompletenessFilter(admin.SimpleListFilter):
+    title = 'documents'
+    parameter_name = 'documents'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('incomplete', 'Mandatory documents missing'),
+            ('complete', 'Mandatory documents complete'),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'incomplete':
+            return queryset.filter(mandatory_documents__lt=F('required_documents'))
+        if self.value() == 'complete':
+            return queryset.filter(mandatory_documents__gte=F('required_documents'))
+        return queryset
+
+
+class EligibilityFilter(admin.SimpleListFilter):
+    title = 'eligibility'
+    parameter_name = 'eligibility'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('eligible', 'Eligible'),
+            ('ineligible', 'Ineligible'),
+            ('unscored', 'Not scored'),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'eligible':
+            return queryset.filter(eligibility_score__gte=ELIGIBLE_SCORE)
+        if self.value() == 'ineligible':
+            return queryset.filter(eligibility_score__lt=ELIGIBLE_SCORE)
+        if self.value() == 'unscored':
+            return queryset.filter(eligibility_score__isnull=True)
+        return queryset
 
 
 @admin.register(LoanApplication)
@@ -124,6 +221,7 @@ class LoanApplicationAdmin(admin.ModelAdmin):
         'applicant_name', 
         'loan_product', 
         'requested_amount', 
+        'eligibility_score',
         'status', 
         'created_at',
         'documents_count'
@@ -133,7 +231,9 @@ class LoanApplicationAdmin(admin.ModelAdmin):
         'loan_product', 
         'created_at', 
         'updated_at',
-        'user_profile__is_email_verified'
+        'user_profile__is_email_verified',
+        DocumentCompletenessFilter,
+        EligibilityFilter,
     ]
     search_fields = [
         'application_id', 
@@ -144,7 +244,7 @@ class LoanApplicationAdmin(admin.ModelAdmin):
         'user_profile__user__last_name',
         'user_profile__user__email'
     ]
-    readonly_fields = ['application_id', 'created_at', 'updated_at']
+    readonly_fields = ['application_id', 'eligibility_score', 'max_eligible_amount', 'created_at', 'updated_at']
     inlines = [LoanDocumentInline]
     
     fieldsets = (
@@ -158,6 +258,9 @@ class LoanApplicationAdmin(admin.ModelAdmin):
         ('Loan Details', {
             'fields': ('loan_product', 'requested_amount', 'annual_income', 'purpose')
         }),
+        ('Eligibility', {
+            'fields': ('eligibility_score', 'max_eligible_amount'),
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -169,16 +272,20 @@ class LoanApplicationAdmin(admin.ModelAdmin):
     applicant_name.short_description = 'Applicant Name'
     
     def documents_count(self, obj):
-        count = obj.documents.count()
+        count = obj.documents_total
         if count > 0:
-            # Replace 'yourapp' with your actual app name
             url = reverse('admin:app_loandocument_changelist') + f'?application__id={obj.id}'
+            if obj.mandatory_documents < obj.required_documents:
+                return format_html('<a href="{}">{} documents</a> (mandatory missing)', url, count)
             return format_html('<a href="{}">{} documents</a>', url, count)
         return "No documents"
     documents_count.short_description = 'Documents'
+    documents_count.admin_order_field = 'documents_total'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user_profile__user', 'loan_product')
+        return annotate_document_counts(
+            super().get_queryset(request).select_related('user_profile__user', 'loan_product')
+        )
     
     actions = ['mark_as_approved', 'mark_as_rejected', 'mark_as_under_review']
     
@@ -198,6 +305,33 @@ class LoanApplicationAdmin(admin.ModelAdmin):
     mark_as_under_review.short_description = 'Mark selected applications as under review'
 
 
+class FileSizeFilter(admin.SimpleListFilter):
+    title = 'file size'
+    parameter_name = 'size'
+
+    BUCKETS = {
+        'small': ('Under 100 KB', None, 100 * 1024),
+        'medium': ('100 KB - 1 MB', 100 * 1024, 1024 * 1024),
+        'large': ('1 MB - 5 MB', 1024 * 1024, 5 * 1024 * 1024),
+        'huge': ('Over 5 MB', 5 * 1024 * 1024, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, _, _) in self.BUCKETS.items()] + [('unknown', 'Unknown')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'unknown':
+            return queryset.filter(file_size__isnull=True)
+        if self.value() not in self.BUCKETS:
+            return queryset
+        _, low, high = self.BUCKETS[self.value()]
+        if low is not None:
+            queryset = queryset.filter(file_size__gte=low)
+        if high is not None:
+            queryset = queryset.filter(file_size__lt=high)
+        return queryset
+
+
 @admin.register(LoanDocument)
 class LoanDocumentAdmin(admin.ModelAdmin):
     list_display = [
@@ -206,13 +340,17 @@ class LoanDocumentAdmin(admin.ModelAdmin):
         'document_type_display',
         'is_mandatory',
         'uploaded_at',
-        'file_size'
+        'file_size_display',
+        'processing_status',
     ]
     list_filter = [
         'document_type',
         'is_mandatory',
         'uploaded_at',
-        'application__status'
+        'application__status',
+        FileSizeFilter,
+        'content_type',
+        'processing_status',
     ]
     search_fields = [
         'application__application_id',
@@ -220,14 +358,24 @@ class LoanDocumentAdmin(admin.ModelAdmin):
         'application__last_name',
         'original_filename'
     ]
-    readonly_fields = ['uploaded_at', 'original_filename', 'file_size']
+    readonly_fields = [
+        'uploaded_at', 'original_filename', 'file_size_display', 'content_type', 'content_hash',
+        'preview', 'processing_status', 'savings_display',
+    ]
     
     fieldsets = (
         ('Document Information', {
             'fields': ('application', 'document_type', 'is_mandatory')
         }),
         ('File Details', {
-            'fields': ('document_file', 'original_filename', 'file_size', 'uploaded_at')
+            'fields': (
+                'document_file', 'original_filename', 'file_size_display', 'content_type', 'content_hash',
+                'uploaded_at'
+            )
+        }),
+        ('Image Processing', {
+            'fields': ('preview', 'processing_status', 'savings_display'),
+            'description': "JPEG/PNG scans are resized and stripped of metadata by manage.py process_document_images",
         }),
     )
     
@@ -245,20 +393,44 @@ class LoanDocumentAdmin(admin.ModelAdmin):
         return obj.get_document_type_display()
     document_type_display.short_description = 'Document Type'
     
-    def file_size(self, obj):
-        if obj.document_file:
-            try:
-                size = obj.document_file.size
-                if size < 1024:
-                    return f"{size} bytes"
-                elif size < 1024*1024:
-                    return f"{size/1024:.1f} KB"
-                else:
-                    return f"{size/(1024*1024):.1f} MB"
-            except:
-                return "Unknown"
-        return "No file"
-    file_size.short_description = 'File Size'
+    def file_size_display(self, obj):
+        if not obj.document_file:
+            return "No file"
+        size = obj.file_size
+        if size is None:
+            return "Unknown"  # run manage.py backfill_document_metadata
+        return human_size(size)
+    file_size_display.short_description = 'File Size'
+    file_size_display.admin_order_field = 'file_size'
+
+    def preview(self, obj):
+        return thumbnail_preview(obj)
+    preview.short_description = 'Preview'
+
+    def savings_display(self, obj):
+        if obj.original_file_size is None or obj.file_size is None:
+            return "-"
+        saved = obj.original_file_size - obj.file_size
+        return f"{human_size(obj.original_file_size)} -> {human_size(obj.file_size)} ({human_size(saved)} saved)"
+    savings_display.short_description = 'Normalization'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('application__user_profile__user')
\ No newline at end of file
+        return super().get_queryset(request).select_related('application__user_profile__user')
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'kind', 'application', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'kind', 'created_at']
+    search_fields = ['recipient', 'application__application_id']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+    raw_id_fields = ['application']
+
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} emails queued for immediate retry.')
+    retry_now.short_description = 'Retry selected emails now'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('application')
@@ -0,0 +1,163 @@
+"""
+EMI quotes and amortization schedules, matching the calculator in
+static/js/app.js but with exact Decimal arithmetic.
+
+Amounts are rounded to the paisa (half up), rates are annual percentages
+with two decimals, and tenures are in months. The EMI is the standard
+reducing-balance instalment; totals are ``emi * months`` as quoted to
+customers, while the schedule adjusts its last instalment so the balance
+closes at exactly zero.
+
+quote() is memoized. quote_batch() computes whole batches with NumPy when
+it is installed, checks every result that lands within float error of a
+half-paisa rounding boundary with the Decimal formula, and falls back to
+quote() one item at a time otherwise.
+"""
+from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal, localcontext
+from functools import lru_cache
+from typing import NamedTuple
+
+CENT = Decimal('0.01')
+QUOTE_CACHE_SIZE = 4096
+# Below this, building NumPy arrays costs more than it saves
+NUMPY_MIN_BATCH = 32
+# Relative error allowed for float64 results before a Decimal recheck
+FLOAT_TOLERANCE = 1e-9
+
+
+class Quote(NamedTuple):
+    principal: Decimal
+    annual_rate: Decimal
+    months: int
+    emi: Decimal
+    total_payment: Decimal
+    total_interest: Decimal
+
+    def as_dict(self):
+        return {
+            'amount': str(self.principal),
+            'interest_rate': str(self.annual_rate),
+            'tenure': self.months,
+            'emi': str(self.emi),
+            'total_payment': str(self.total_payment),
+            'total_interest': str(self.total_interest),
+        }
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def normalize(principal, annual_rate, months):
+    """Coerce inputs to (Decimal paise, Decimal 2dp rate, int months) and check them"""
+    principal = Decimal(str(principal)).quantize(CENT, ROUND_HALF_UP)
+    annual_rate = Decimal(str(annual_rate)).quantize(CENT, ROUND_HALF_UP)
+    months = int(months)
+    if principal <= 0:
+        raise ValueError("Loan amount must be positive")
+    if annual_rate < 0:
+        raise ValueError("Interest rate cannot be negative")
+    if months <= 0:
+        raise ValueError("Tenure must be at least one month")
+    return principal, annual_rate, months
+
+
+def _emi(principal, annual_rate, months):
+    with localcontext() as context:
+        context.prec = 34
+        if not annual_rate:
+            return (principal / months).quantize(CENT, ROUND_HALF_UP)
+        monthly_rate = annual_rate / 1200
+        factor = (1 + monthly_rate) ** months
+        return (principal * monthly_rate * factor / (factor - 1)).quantize(CENT, ROUND_HALF_UP)
+
+
+def _quote(principal, annual_rate, months, emi):
+    # Interest-free loans repay exactly the principal whatever the EMI rounding
+    total_payment = emi * months if annual_rate else principal
+    return Quote(principal, annual_rate, months, emi, total_payment, total_payment - principal)
+
+
+@lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _cached_quote(principal, annual_rate, months):
+    return _quote(principal, annual_rate, months, _emi(principal, annual_rate, months))
+
+
+def quote(principal, annual_rate, months):
+    """EMI, total payment and total interest for one loan"""
+    return _cached_quote(*normalize(principal, annual_rate, months))
+
+
+def quote_batch(principals, annual_rates, months):
+    """quote() for each (principal, rate, months) triple, vectorized when NumPy is available"""
+    items = [normalize(*args) for args in zip(principals, annual_rates, months, strict=True)]
+    np = _numpy()
+    if np is None or len(items) < NUMPY_MIN_BATCH:
+        return [_cached_quote(*item) for item in items]
+
+    paise = np.array([int(principal * 100) for principal, _, _ in items], dtype=np.float64)
+    monthly_rate = np.array([float(rate) for _, rate, _ in items]) / 1200
+    tenure = np.array([n for _, _, n in items], dtype=np.int64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.power(1 + monthly_rate, tenure)
+        raw = np.where(
+            monthly_rate == 0,
+            paise / tenure,
+            paise * monthly_rate * factor / (factor - 1),
+        )
+    emi_paise = np.floor(raw + 0.5).astype(np.int64)
+    # Results this close to x.5 paise could round either way in float64
+    unsure = np.abs(raw - np.floor(raw) - 0.5) <= raw * FLOAT_TOLERANCE + 1e-6
+
+    quotes = []
+    for index, item in enumerate(items):
+        if unsure[index]:
+            quotes.append(_cached_quote(*item))
+        else:
+            quotes.append(_quote(*item, Decimal(int(emi_paise[index])).scaleb(-2)))
+    return quotes
+
+
+@lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _annuity_factor(annual_rate, months):
+    with localcontext() as context:
+        context.prec = 34
+        if not annual_rate:
+            return Decimal(months)
+        monthly_rate = annual_rate / 1200
+        factor = (1 + monthly_rate) ** months
+        return (factor - 1) / (monthly_rate * factor)
+
+
+def max_principal(emi, annual_rate, months):
+    """The largest loan an EMI of ``emi`` repays over ``months``, rounded down to the paisa"""
+    _, annual_rate, months = normalize(1, annual_rate, months)
+    emi = Decimal(str(emi))
+    if emi <= 0:
+        return Decimal('0.00')
+    return (emi * _annuity_factor(annual_rate, months)).quantize(CENT, ROUND_DOWN)
+
+
+def schedule(principal, annual_rate, months):
+    """Month-by-month instalments; the last one absorbs rounding so the balance ends at zero"""
+    principal, annual_rate, months = normalize(principal, annual_rate, months)
+    emi = _cached_quote(principal, annual_rate, months).emi
+    monthly_rate = annual_rate / 1200
+    balance = principal
+    rows = []
+    for month in range(1, months + 1):
+        interest = (balance * monthly_rate).quantize(CENT, ROUND_HALF_UP)
+        payment = balance + interest if month == months else min(emi, balance + interest)
+        balance -= payment - interest
+        rows.append({
+            'month': month,
+            'payment': str(payment),
+            'principal': str(payment - interest),
+            'interest': str(interest),
+            'balance': str(balance),
+        })
+    return rows
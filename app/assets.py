@@ -0,0 +1,341 @@
+"""
+Static asset pipeline, run by ``manage.py collectstatic``.
+
+PipelineStaticFilesStorage is a ManifestStaticFilesStorage that, once the
+files are hashed:
+
+* minifies the hashed CSS and JS in place (the hash in the name is that of
+  the source, which changes whenever the output does);
+* writes WebP and AVIF copies of every JPEG/PNG at each STATIC_IMAGE_WIDTHS
+  width below the image's own (and at its own width if that is smaller than
+  the largest), registered in the manifest as
+  ``images/1-240w.webp`` and so on for the ``responsive_image`` tag;
+* stores ``.gz`` (and ``.br`` when the brotli package is installed) next to
+  every text file where that is smaller.
+
+serve_static() sends the collected files with a year-long immutable
+Cache-Control for hashed names, picking a precompressed copy from
+Accept-Encoding, for deployments without a web server in front of STATIC_ROOT.
+"""
+import gzip
+import io
+import re
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.static import serve
+from PIL import Image, features
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.xml', '.html')
+IMAGE_SOURCES = ('.jpg', '.jpeg', '.png')
+# Encoder settings per variant format; AVIF holds up at a much lower quality
+IMAGE_FORMATS = {
+    'avif': {'quality': 55},
+    'webp': {'quality': 80, 'method': 6},
+}
+VARIANT_RE = re.compile(r'^(?P<stem>.+)-(?P<width>\d+)w\.(?P<format>avif|webp)$')
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+# CSS ---------------------------------------------------------------------
+
+_CSS_TOKENS = re.compile(r'''
+    (?P<comment>/\*.*?\*/)
+  | (?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+  | (?P<space>\s+)
+  | (?P<other>[^\s"'/]+|/)
+''', re.S | re.X)
+# Whitespace next to these is never significant. ':' only counts on its right
+# ("a :hover" differs from "a:hover") and '+'/'-' are left alone for calc().
+_CSS_NO_SPACE_AFTER = set('{};,>:(')
+_CSS_NO_SPACE_BEFORE = set('{};,>)!')
+
+
+def minify_css(text):
+    """Drop comments and insignificant whitespace; strings are kept verbatim"""
+    out = []
+    space = False
+    for match in _CSS_TOKENS.finditer(text):
+        kind, token = match.lastgroup, match.group()
+        if kind == 'comment':
+            continue
+        if kind == 'space':
+            space = True
+            continue
+        if kind == 'other':
+            token = token.replace(';}', '}')
+            if token[0] == '}' and out and out[-1].endswith(';') and out[-1][0] not in '"\'':
+                out[-1] = out[-1][:-1]
+                if not out[-1]:
+                    out.pop()
+        if space and out and out[-1][-1] not in _CSS_NO_SPACE_AFTER and token[0] not in _CSS_NO_SPACE_BEFORE:
+            out.append(' ')
+        space = False
+        out.append(token)
+    return ''.join(out)
+
+
+# JavaScript --------------------------------------------------------------
+
+# A '/' after one of these (or these keywords) starts a regex, not a division
+_JS_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+# A line break after these (or before the next set) can never end a statement
+_JS_JOIN_AFTER = set('{[(,;=&|^!~?:<>*%')
+_JS_JOIN_BEFORE = set(')]},;.?:')
+
+
+def _is_word_char(char):
+    return char.isalnum() or char in '_$\\' or ord(char) > 127
+
+
+def minify_js(text):
+    """
+    Drop comments and indentation and join lines where that cannot change
+    how the code parses. Line breaks that might end a statement are kept, so
+    automatic semicolon insertion behaves as before; names are not mangled.
+    """
+    out = []
+    last = ''         # last significant character written
+    last_word = ''    # last identifier written, for the regex/division check
+    pending = ''      # whitespace seen since the last token: '', ' ' or '\n'
+    templates = []    # open `${` depth for each template literal we are inside
+    i, n = 0, len(text)
+
+    def emit(token):
+        nonlocal last, last_word, pending
+        first = token[0]
+        if pending == '\n' and last and last not in _JS_JOIN_AFTER and first not in _JS_JOIN_BEFORE:
+            out.append('\n')
+        elif pending and last and (
+            (_is_word_char(last) and _is_word_char(first)) or (last in '+-' and first in '+-')
+        ):
+            out.append(' ')
+        pending = ''
+        out.append(token)
+        last = token[-1]
+        last_word = token if _is_word_char(first) else ''
+
+    def read_template(start):
+        """Copy template text from ``start`` up to and including '`' or '${'"""
+        j = start
+        while j < n:
+            if text[j] == '\\':
+                j += 2
+            elif text[j] == '`':
+                return j + 1, False
+            elif text.startswith('${', j):
+                return j + 2, True
+            else:
+                j += 1
+        return n, False
+
+    while i < n:
+        char = text[i]
+        if char.isspace():
+            j = i
+            while j < n and text[j].isspace():
+                j += 1
+            pending = '\n' if '\n' in text[i:j] or pending == '\n' else ' '
+            i = j
+        elif text.startswith('//', i):
+            i = text.find('\n', i)
+            i = n if i == -1 else i
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if '\n' in text[i:end]:
+                pending = '\n'
+            elif not pending:
+                pending = ' '
+            i = end
+        elif char in '"\'':
+            j = i + 1
+            while j < n and text[j] != char:
+                j += 2 if text[j] == '\\' else 1
+            emit(text[i:j + 1])
+            i = j + 1
+        elif char == '`':
+            j, opened = read_template(i + 1)
+            emit(text[i:j])
+            if opened:
+                templates.append(0)
+            i = j
+        elif char == '}' and templates and templates[-1] == 0:
+            templates.pop()
+            j, opened = read_template(i + 1)
+            emit(text[i:j])
+            if opened:
+                templates.append(0)
+            i = j
+        elif char == '/' and (not last or last in _JS_REGEX_AFTER or last_word in _JS_REGEX_KEYWORDS):
+            j = i + 1
+            in_class = False
+            while j < n and (in_class or text[j] != '/'):
+                if text[j] == '\\':
+                    j += 1
+                elif text[j] == '[':
+                    in_class = True
+                elif text[j] == ']':
+                    in_class = False
+                j += 1
+            j += 1
+            while j < n and text[j].isalpha():
+                j += 1
+            emit(text[i:j])
+            i = j
+        elif _is_word_char(char):
+            j = i
+            while j < n and (_is_word_char(text[j]) or text[j] == '.' and text[i].isdigit()):
+                j += 1
+            emit(text[i:j])
+            i = j
+        else:
+            if templates and char == '{':
+                templates[-1] += 1
+            elif templates and char == '}':
+                templates[-1] -= 1
+            emit(char)
+            i += 1
+    return ''.join(out)
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# Images ------------------------------------------------------------------
+
+def image_formats():
+    """Variant formats this Pillow build can encode"""
+    return [name for name in IMAGE_FORMATS if features.check(name)]
+
+
+def variant_name(name, width, format):
+    return f'{PurePosixPath(name).with_suffix("")}-{width}w.{format}'
+
+
+def encode_variants(data, widths, formats):
+    """Yield ``(width, format, bytes)`` for each variant width of the image"""
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        targets = {width for width in widths if width < image.width}
+        if image.width < max(widths):
+            targets.add(image.width)  # the widest variant an image smaller than that can have
+        targets = sorted(targets)
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+            for format in formats:
+                output = io.BytesIO()
+                resized.save(output, format.upper(), **IMAGE_FORMATS[format])
+                yield width, format, output.getvalue()
+
+
+class PipelineStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        widths = getattr(settings, 'STATIC_IMAGE_WIDTHS', (120, 240, 480))
+        formats = image_formats()
+        for name in sorted(paths):
+            hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+            if hashed_name is None:
+                continue
+            suffix = PurePosixPath(name).suffix.lower()
+            if suffix in MINIFIERS and not name.endswith(('.min.js', '.min.css')):
+                with self.open(hashed_name) as f:
+                    content = f.read().decode('utf-8')
+                self._replace(hashed_name, MINIFIERS[suffix](content).encode('utf-8'))
+            if suffix in COMPRESSIBLE:
+                self._compress(hashed_name)
+            elif suffix in IMAGE_SOURCES and formats:
+                with self.open(hashed_name) as f:
+                    data = f.read()
+                for width, format, variant in encode_variants(data, widths, formats):
+                    logical = variant_name(name, width, format)
+                    hashed_variant = self.hashed_name(logical, ContentFile(variant))
+                    self._replace(hashed_variant, variant)
+                    self.hashed_files[self.hash_key(logical)] = hashed_variant
+                    yield logical, hashed_variant, True
+
+        self._variants = self._hashed_names = None
+        self.save_manifest()
+
+    def _replace(self, name, data):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(data))
+
+    def _compress(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        compressed = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        brotli = _brotli()
+        if brotli:
+            compressed['.br'] = brotli.compress(data, quality=11)
+        for suffix, payload in compressed.items():
+            if len(payload) < len(data):
+                self._replace(name + suffix, payload)
+
+    def image_variants(self, name):
+        """
+        ``{format: [(width, variant name), ...]}`` for the variants collected
+        for ``name``, best format first; empty before collectstatic has run.
+        """
+        if getattr(self, '_variants', None) is None:
+            self._variants = {}
+            for logical in self.hashed_files:
+                match = VARIANT_RE.match(logical)
+                if match:
+                    by_format = self._variants.setdefault(match['stem'], {})
+                    by_format.setdefault(match['format'], []).append((int(match['width']), logical))
+        by_format = self._variants.get(str(PurePosixPath(name).with_suffix('')), {})
+        return {format: sorted(by_format[format]) for format in IMAGE_FORMATS if format in by_format}
+
+    def is_hashed(self, name):
+        if getattr(self, '_hashed_names', None) is None:
+            self._hashed_names = set(self.hashed_files.values())
+        return name in self._hashed_names
+
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def serve_static(request, path):
+    """Serve a collected file from STATIC_ROOT with long-lived caching"""
+    root = settings.STATIC_ROOT
+    accepted = request.headers.get('Accept-Encoding', '')
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and staticfiles_storage.exists(path + suffix):
+            # serve() derives Content-Encoding from the suffix
+            response = serve(request, path + suffix, document_root=root)
+            break
+    else:
+        response = serve(request, path, document_root=root)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    storage = staticfiles_storage
+    if getattr(storage, 'is_hashed', None) and storage.is_hashed(path):
+        patch_cache_control(
+            response, public=True, immutable=True,
+            max_age=getattr(settings, 'STATIC_CACHE_MAX_AGE', 365 * 24 * 60 * 60),
+        )
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
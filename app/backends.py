@@ -0,0 +1,109 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import verify_password
+from django.db.models import Q, UniqueConstraint
+from django.db.models.functions import Lower
+
+# Unique, case-insensitive index on auth_user.email (added by migration 0007).
+# Blank emails are left out so users without one (e.g. from createsuperuser)
+# don't collide.
+EMAIL_CONSTRAINT = UniqueConstraint(
+    Lower('email'),
+    name='auth_user_email_lower_uniq',
+    condition=~Q(email=''),
+)
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+async def acheck_password(user, password):
+    """
+    user.acheck_password() without blocking the event loop: hashing is
+    CPU-bound (and releases the GIL), so it runs in a worker thread, while
+    saving an upgraded hash goes through the async ORM.
+    """
+    is_correct, must_update = await sync_to_async(verify_password, thread_sensitive=False)(password, user.password)
+    if is_correct and must_update:
+        await sync_to_async(user.set_password, thread_sensitive=False)(password)
+        await user.asave(update_fields=['password'])
+    return is_correct
+
+
+def users_by_email(email):
+    """
+    Users whose email matches case-insensitively.
+
+    Written as ``LOWER(email) = %s AND email <> ''`` so the lookup is served
+    by EMAIL_CONSTRAINT's partial functional index rather than a table scan
+    (``email__iexact`` compiles to LIKE/UPPER and cannot use it).
+    """
+    UserModel = get_user_model()
+    return (
+        UserModel._default_manager
+        .alias(email_lower=Lower('email'))
+        .filter(email_lower=normalize_email(email))
+        .exclude(email='')
+    )
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the user's profile in the same query as the user,
+    and authenticates by email as well as by username.
+
+    AuthenticationMiddleware resolves ``request.user`` through ``get_user``,
+    so ``request.user.profile`` (and ``profile.user`` on the way back) is
+    available for the rest of the request without another query.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        if email is None:
+            # Username logins, e.g. the admin site
+            return super().authenticate(request, username=username, password=password, **kwargs)
+        if not email or password is None:
+            return None
+
+        UserModel = get_user_model()
+        user = users_by_email(email).select_related('profile').first()
+        if user is None:
+            # Run the hasher anyway so response time doesn't reveal whether
+            # the email is registered (same as ModelBackend).
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, email=None, **kwargs):
+        if email is None:
+            return await super().aauthenticate(request, username=username, password=password, **kwargs)
+        if not email or password is None:
+            return None
+
+        UserModel = get_user_model()
+        user = await users_by_email(email).select_related('profile').afirst()
+        if user is None:
+            await sync_to_async(UserModel().set_password, thread_sensitive=False)(password)
+            return None
+        if await acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = await UserModel._default_manager.select_related('profile').aget(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,129 @@
+"""
+Streaming readers and writers shared by the bulk import/export commands.
+
+Rows are plain dicts of JSON-friendly values. Every reader and writer works
+one batch at a time, so memory stays flat whatever the file or table size.
+Parquet support needs the optional ``pyarrow`` package.
+"""
+import csv
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.management.base import CommandError
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+
+def guess_format(path, fmt=None):
+    if fmt:
+        return fmt
+    for candidate in FORMATS:
+        if str(path).endswith('.' + candidate):
+            return candidate
+    raise CommandError(f"Cannot tell the format of {path}; pass --format ({', '.join(FORMATS)})")
+
+
+def to_plain(value):
+    """Convert model values to something csv, json and parquet all accept"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise CommandError("Parquet support requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+class RowWriter:
+    """Write batches of row dicts to csv, jsonl or parquet"""
+
+    def __init__(self, path, fmt, fieldnames):
+        self.fmt = fmt
+        self.fieldnames = fieldnames
+        if fmt == 'parquet':
+            self.pa = _pyarrow()
+            self.schema = self.pa.schema([(name, self.pa.string()) for name in fieldnames])
+            self.writer = self.pa.parquet.ParquetWriter(path, self.schema)
+            return
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+            self.writer.writeheader()
+
+    def write_batch(self, rows):
+        if not rows:
+            return
+        if self.fmt == 'parquet':
+            columns = {
+                name: [None if row[name] is None else str(row[name]) for row in rows]
+                for name in self.fieldnames
+            }
+            self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+        elif self.fmt == 'csv':
+            self.writer.writerows(rows)
+        else:
+            self.file.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+    def close(self):
+        if self.fmt == 'parquet':
+            self.writer.close()
+        else:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_batches(path, fmt, batch_size):
+    """Yield lists of at most ``batch_size`` row dicts from a csv, jsonl or parquet file"""
+    if fmt == 'parquet':
+        pa = _pyarrow()
+        for record_batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield record_batch.to_pylist()
+        return
+
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class Throughput:
+    """Counts rows and reports rows/second"""
+
+    def __init__(self):
+        self.rows = 0
+        self.start = time.perf_counter()
+
+    def add(self, count):
+        self.rows += count
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.start
+
+    def summary(self, verb):
+        seconds = self.seconds
+        rate = self.rows / seconds if seconds else 0
+        return f"{verb} {self.rows:,} rows in {seconds:.1f}s ({rate:,.0f} rows/s)"
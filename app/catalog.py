@@ -0,0 +1,112 @@
+"""
+Versioned cache for the active loan product catalog.
+
+Every cached entry is keyed on the current catalog version, so invalidating
+the catalog is a single counter bump: stale entries are simply never read
+again and age out of the cache on their own. The bump only reaches the
+processes that share the cache; without one (settings.SHARED_CACHE) the
+short LOAN_CATALOG_CACHE_TIMEOUT bounds how long other workers lag.
+
+A missing version key (cold cache, or evicted under memory pressure) is
+seeded from the clock rather than restarted at 1, so the new version line
+never meets entries cached under an old one.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+
+from .models import LoanProduct
+
+VERSION_KEY = 'loan_catalog:version'
+API_FIELDS = ('id', 'name', 'category', 'min_loan_amount', 'max_loan_amount')
+
+
+def _timeout():
+    return getattr(settings, 'LOAN_CATALOG_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _seed_version():
+    # Past any version handed out before, which at most counted up from an
+    # earlier seed by one per product change
+    return time.time_ns()
+
+
+def get_catalog_version():
+    """Return the current catalog version, initialising it on a cold cache"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        seed = _seed_version()
+        cache.add(VERSION_KEY, seed, timeout=None)
+        version = cache.get(VERSION_KEY, seed)
+    return version
+
+
+async def aget_catalog_version():
+    """Async get_catalog_version()"""
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        seed = _seed_version()
+        await cache.aadd(VERSION_KEY, seed, timeout=None)
+        version = await cache.aget(VERSION_KEY, seed)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog entry"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key missing (cold or evicted cache): start a fresh version line
+        cache.add(VERSION_KEY, _seed_version(), timeout=None)
+
+
+def invalidate_catalog():
+    """Bump the catalog version once the current transaction commits"""
+    transaction.on_commit(bump_catalog_version)
+
+
+def _key(version, name):
+    return f'loan_catalog:{version}:{name}'
+
+
+def get_active_products():
+    """Active loan products for the homepage cards, served from the cache"""
+    key = _key(get_catalog_version(), 'products')
+    products = cache.get(key)
+    if products is None:
+        products = list(LoanProduct.objects.filter(is_active=True))
+        cache.set(key, products, timeout=_timeout())
+    return products
+
+
+async def aget_products_api_payload():
+    """
+    Payload for the products API along with its validators.
+
+    Returns a dict with ``body`` (the JSON-encoded response), ``etag`` and
+    ``last_modified`` so the view can answer conditional requests without
+    touching the database. A miss reads through the async ORM.
+    """
+    key = _key(await aget_catalog_version(), 'api')
+    payload = await cache.aget(key)
+    if payload is None:
+        loans = [loan async for loan in LoanProduct.objects.filter(is_active=True).values(*API_FIELDS)]
+        last_modified = (await LoanProduct.objects.aaggregate(last=Max('updated_at')))['last']
+        payload = _api_payload(loans, last_modified)
+        await cache.aset(key, payload, timeout=_timeout())
+    return payload
+
+
+def _api_payload(loans, last_modified):
+    body = json.dumps({'loans': loans}, cls=DjangoJSONEncoder)
+    return {
+        'body': body,
+        'etag': '"%s"' % hashlib.sha256(body.encode()).hexdigest()[:32],
+        'last_modified': last_modified,
+    }
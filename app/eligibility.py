@@ -0,0 +1,57 @@
+"""
+Affordability scoring for loan applications.
+
+An applicant may spend at most ELIGIBILITY_MAX_EMI_RATIO of their monthly
+income (``annual_income / 12``) on the new loan's EMI. Turning that EMI
+back into a principal over the product's longest tenure gives the most
+they can borrow at the product's best (minimum) and worst (maximum) rate:
+
+    100        requested amount is affordable even at the maximum rate
+    50 - 99    affordable at the minimum rate only; interpolated between
+               the two amounts
+    0 - 49     not affordable at any rate: 50 * affordable / requested
+
+Applications scoring below ELIGIBLE_SCORE are ineligible. The score and
+the amount affordable at the best rate are stored on LoanApplication.
+"""
+from decimal import ROUND_DOWN, Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .amortization import CENT, max_principal
+
+ELIGIBLE_SCORE = 50
+
+
+class Eligibility(NamedTuple):
+    score: int
+    max_eligible_amount: Decimal
+    max_emi: Decimal
+
+    @property
+    def eligible(self):
+        return self.score >= ELIGIBLE_SCORE
+
+
+def max_emi_ratio():
+    return Decimal(str(getattr(settings, 'ELIGIBILITY_MAX_EMI_RATIO', '0.5')))
+
+
+def assess(loan_product, annual_income, requested_amount, ratio=None):
+    """Score one application; ``loan_product`` only needs its rate and tenure fields"""
+    ratio = max_emi_ratio() if ratio is None else ratio
+    annual_income = Decimal(annual_income)
+    requested_amount = Decimal(requested_amount)
+    max_emi = (max(annual_income, 0) / 12 * ratio).quantize(CENT, ROUND_DOWN)
+    best = max_principal(max_emi, loan_product.min_interest_rate, loan_product.max_tenure)
+    worst = max_principal(max_emi, loan_product.max_interest_rate, loan_product.max_tenure)
+
+    if requested_amount <= 0 or requested_amount <= worst:
+        score = 100
+    elif requested_amount <= best:
+        # best > worst here, since requested_amount lies strictly above worst
+        score = ELIGIBLE_SCORE + int((ELIGIBLE_SCORE - 1) * (best - requested_amount) / (best - worst))
+    else:
+        score = int(ELIGIBLE_SCORE * best / requested_amount)
+    return Eligibility(score, best, max_emi)
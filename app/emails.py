@@ -0,0 +1,247 @@
+"""
+Email outbox: the views enqueue, the process_email_outbox command delivers.
+"""
+from datetime import timedelta
+from functools import lru_cache
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import EmailOutbox, LoanDocument
+
+logger = logging.getLogger(__name__)
+
+
+DOWNLOAD_SALT = 'app.emails.document-download'
+
+
+@lru_cache(maxsize=None)
+def confirmation_templates():
+    """Compiled (html, text) confirmation templates, loaded once per process"""
+    return get_template('loan_confirmation.html'), get_template('loan_confirmation.txt')
+
+
+def link_max_age():
+    return getattr(settings, 'EMAIL_DOCUMENT_LINK_MAX_AGE', 7 * 24 * 60 * 60)
+
+
+def document_download_token(document):
+    return signing.dumps(document.pk, salt=DOWNLOAD_SALT, compress=True)
+
+
+def document_from_token(token):
+    """The LoanDocument a download token was issued for; raises BadSignature if it is forged or expired"""
+    pk = signing.loads(token, salt=DOWNLOAD_SALT, max_age=link_max_age())
+    return LoanDocument.objects.get(pk=pk)
+
+
+def document_download_url(document):
+    base_url = getattr(settings, 'SITE_URL', 'http://localhost:8000').rstrip('/')
+    return base_url + reverse('document_download', args=[document_download_token(document)])
+
+
+def plan_attachments(documents):
+    """
+    Split documents into ``(attached, linked)`` according to
+    EMAIL_ATTACHMENT_MODE: 'attach' everything, send signed 'links' only,
+    or attach each document whose raw bytes still fit in
+    EMAIL_ATTACHMENT_BUDGET and link the rest ('budget'). Sizes come from
+    LoanDocument.file_size, so deciding reads no files.
+    """
+    mode = getattr(settings, 'EMAIL_ATTACHMENT_MODE', 'budget')
+    if mode == 'attach':
+        return list(documents), []
+    if mode == 'links':
+        return [], list(documents)
+
+    budget = getattr(settings, 'EMAIL_ATTACHMENT_BUDGET', 5 * 1024 * 1024)
+    attached, linked = [], []
+    used = 0
+    for document in documents:
+        size = document.file_size
+        if size is not None and used + size <= budget:
+            attached.append(document)
+            used += size
+        else:
+            linked.append(document)
+    return attached, linked
+
+
+def build_confirmation_email(application, uploaded_documents):
+    """Build (but do not send) the confirmation email for an application"""
+    attached, linked = plan_attachments(uploaded_documents)
+    for document in uploaded_documents:
+        document.download_url = None
+    for document in linked:
+        document.download_url = document_download_url(document)
+
+    context = {
+        'application': application,
+        'uploaded_documents': uploaded_documents,
+        'company_name': getattr(settings, 'COMPANY_NAME', 'Your Loan Company'),
+        'company_email': getattr(settings, 'COMPANY_EMAIL', 'support@yourloancompany.com'),
+        'company_phone': getattr(settings, 'COMPANY_PHONE', '+1-800-LOAN-HELP'),
+        'company_address': getattr(settings, 'COMPANY_ADDRESS', '123 Finance Street, Money City, FC 12345'),
+        'website_url': getattr(settings, 'WEBSITE_URL', 'https://yourloancompany.com'),
+        'support_url': getattr(settings, 'SUPPORT_URL', 'https://yourloancompany.com/support'),
+    }
+
+    context['link_expiry_days'] = link_max_age() // (24 * 60 * 60)
+
+    subject = f'Loan Application Confirmation - {application.application_id}'
+    html_template, text_template = confirmation_templates()
+    html_content = html_template.render(context)
+    text_content = text_template.render(context)
+
+    email = EmailMultiAlternatives(
+        subject=subject,
+        body=text_content,
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'sahil.kumar8800931@gmail.com'),
+        to=[application.email],
+        reply_to=[getattr(settings, 'COMPANY_EMAIL', 'sahil.kumar8800931@gmail.com')]
+    )
+    email.attach_alternative(html_content, "text/html")
+
+    for document in attached:
+        try:
+            if document.document_file:
+                # Stored files are named by hash; attach under the applicant's filename
+                with document.document_file.open('rb') as f:
+                    content = f.read()
+                email.attach(document.original_filename, content, document.content_type or None)
+        except Exception as attach_error:
+            logger.warning(f"Could not attach document {document.original_filename}: {str(attach_error)}")
+
+    return email
+
+
+def enqueue_confirmation_email(application):
+    """Queue the confirmation email for an application; returns the outbox entry"""
+    return EmailOutbox.objects.create(
+        kind='loan_confirmation',
+        application=application,
+        recipient=application.email,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE_DELAY', 60)
+    cap = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX_DELAY', 3600)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def claim_due_entries(batch_size):
+    """
+    Lock a batch of due entries by pushing their next_attempt_at forward,
+    so concurrent workers skip them while this one is sending.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', 300))
+    with transaction.atomic():
+        entries = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .select_related('application__loan_product')
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        EmailOutbox.objects.filter(pk__in=[e.pk for e in entries]).update(next_attempt_at=now + lease)
+    return entries
+
+
+def build_message(entry):
+    """Render the email for an outbox entry"""
+    if entry.kind == 'loan_confirmation':
+        application = entry.application
+        return build_confirmation_email(application, list(application.documents.all()))
+    raise ValueError(f"Unknown outbox email kind: {entry.kind}")
+
+
+def _mark_failed(entry, error):
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    entry.attempts += 1
+    entry.last_error = str(error)
+    if entry.attempts >= max_attempts:
+        entry.status = 'failed'
+        logger.error(f"Giving up on outbox email {entry.pk} to {entry.recipient}: {error}")
+    else:
+        entry.next_attempt_at = timezone.now() + retry_delay(entry.attempts)
+        logger.warning(f"Outbox email {entry.pk} to {entry.recipient} failed, will retry: {error}")
+    entry.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _mark_sent(entries):
+    EmailOutbox.objects.filter(pk__in=[e.pk for e in entries]).update(
+        status='sent', sent_at=timezone.now(), last_error=''
+    )
+
+
+def process_outbox(batch_size=None, connection=None):
+    """
+    Deliver one batch of due outbox entries over a single mail connection.
+
+    Messages go out through ``send_messages`` one at a time on the shared
+    connection, so a failure is pinned to its own entry (and backed off)
+    without re-sending the messages that already went through; the
+    connection is then reopened for the rest of the batch. A connection
+    passed in by the caller is left open so a long-running worker can reuse
+    it across batches. Returns ``(sent, failed)``.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+
+    entries = claim_due_entries(batch_size)
+    if not entries:
+        return 0, 0
+
+    ready = []
+    failed = 0
+    for entry in entries:
+        try:
+            ready.append((entry, build_message(entry)))
+        except Exception as e:
+            _mark_failed(entry, e)
+            failed += 1
+
+    if not ready:
+        return 0, failed
+
+    owns_connection = connection is None
+    if owns_connection:
+        connection = get_connection(fail_silently=False)
+    delivered = []
+    connection.open()
+    try:
+        for entry, message in ready:
+            try:
+                sent = connection.send_messages([message])
+            except Exception as e:
+                _mark_failed(entry, e)
+                failed += 1
+                # Swap a possibly broken connection for a fresh one, so the rest
+                # of the batch still shares a connection
+                connection.close()
+                try:
+                    connection.open()
+                except Exception as open_error:
+                    # send_messages() then opens its own for each message
+                    logger.warning(f"Could not reopen the mail connection: {open_error}")
+            else:
+                if sent == 1:
+                    delivered.append(entry)
+                else:
+                    # Skipped by the backend (e.g. no valid recipient) without raising
+                    _mark_failed(entry, "The mail backend did not send the message")
+                    failed += 1
+    finally:
+        if owns_connection:
+            connection.close()
+        _mark_sent(delivered)
+
+    return len(delivered), failed
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 with its cost parameters taken from settings.
+
+    Keeps the stock ``argon2`` algorithm name, so existing hashes verify
+    unchanged; when the parameters are retuned, Django's must_update()
+    notices the difference and rehashes each password on its next login.
+    Memory-hard cost bounds what an attacker gains from GPUs while keeping
+    a single verification cheaper in CPU than 1M rounds of PBKDF2.
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
@@ -0,0 +1,195 @@
+"""
+Time-ordered, collision-free application IDs.
+
+IDs look like ``LA`` followed by 18 zero-padded digits, which pack a
+millisecond timestamp, a node number and a per-millisecond sequence:
+
+    | 41 bits: ms since ID_EPOCH | 6 bits: node | 12 bits: sequence |
+
+Each process leases its own node from the ApplicationIdNode table the
+first time it needs one and renews the lease as it goes, so pre-forked
+workers never share a node and IDs need no database round trip otherwise.
+Because the timestamp is in the high bits, IDs increase over time and new
+rows land at the right-hand edge of the unique index.
+
+A lease taken inside a transaction only counts once that transaction
+commits. Until then only the connection that took it uses the node: the
+IDs it hands out there are rolled back along with the lease if it fails.
+"""
+import atexit
+import os
+import secrets
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+PREFIX = 'LA'
+ID_EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+NODE_BITS = 6
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+DIGITS = 18  # 59 bits always fit in 18 decimal digits, so 'LA' + 18 == max_length 20
+# Tolerated clock difference between hosts: a lapsed lease is only taken
+# over this long after its holder stopped using it
+CLOCK_SKEW = timedelta(seconds=30)
+
+
+class ApplicationIdGenerator:
+    """Thread-safe generator of monotonically increasing application IDs"""
+
+    def __init__(self, node, clock=None):
+        if not 0 <= node <= MAX_NODE:
+            raise ValueError(f"Application ID node must be between 0 and {MAX_NODE}, got {node}")
+        self.node = node
+        self.clock = clock or (lambda: time.time_ns() // 1_000_000)
+        self.last_ms = -1
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def next_value(self):
+        with self.lock:
+            # Never go backwards, even if the wall clock does
+            now = max(self.clock() - ID_EPOCH_MS, self.last_ms)
+            if now == self.last_ms:
+                self.sequence = (self.sequence + 1) & MAX_SEQUENCE
+                if self.sequence == 0:
+                    # Sequence exhausted for this millisecond: borrow the next one
+                    now += 1
+            else:
+                self.sequence = 0
+            self.last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self.sequence
+
+    def next_id(self):
+        return f"{PREFIX}{self.next_value():0{DIGITS}d}"
+
+
+class NodeLease:
+    def __init__(self, node, expires_at):
+        self.node = node
+        self.expires_at = expires_at
+
+
+class NodeAllocator:
+    """Leases a node number for this process from the ApplicationIdNode table"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def _reset(self):
+        # A new process (or one forked from a parent that held a lease)
+        # starts without a lease of its own
+        self.pid = os.getpid()
+        self.owner = f'{socket.gethostname()[:60]}:{self.pid}:{secrets.token_hex(4)}'
+        self.lease = None
+        self.renew_after = None
+        self.pending = threading.local()
+        atexit.register(self.release)
+
+    def duration(self):
+        return timedelta(seconds=getattr(settings, 'APPLICATION_ID_NODE_LEASE', 300))
+
+    def node(self):
+        """This process's node, leasing or renewing it when needed"""
+        now = timezone.now()
+        with self.lock:
+            if self.pid != os.getpid():
+                self._reset()
+            lease = self.lease
+            renew = lease is not None and now >= lease.expires_at - self.duration() / 2 and (
+                self.renew_after is None or now >= self.renew_after
+            )
+            if renew:
+                # One renewal at a time; retried if its transaction never commits
+                self.renew_after = now + timedelta(seconds=10)
+        if lease is not None and now < lease.expires_at:
+            if renew:
+                self._renew(lease.node, now)
+            return lease.node
+
+        pending = getattr(self.pending, 'lease', None)
+        if pending is not None and now < pending[0].expires_at and self._uncommitted(pending):
+            return pending[0].node
+        return self._acquire(now)
+
+    def _confirm(self, lease):
+        with self.lock:
+            if self.pid == os.getpid() and (self.lease is None or lease.expires_at > self.lease.expires_at):
+                self.lease = lease
+                self.renew_after = None
+
+    def _on_commit(self, lease):
+        """Make ``lease`` the process's once the current transaction commits"""
+        callback = lambda: self._confirm(lease)
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.in_atomic_block:
+            self.pending.lease = (lease, callback, connection)
+        transaction.on_commit(callback)
+
+    @staticmethod
+    def _uncommitted(pending):
+        """Whether the transaction that took a pending lease is still open on this thread"""
+        lease, callback, connection = pending
+        return connection is connections[DEFAULT_DB_ALIAS] and connection.in_atomic_block and any(
+            func is callback for _, func, _ in connection.run_on_commit
+        )
+
+    def _renew(self, node, now):
+        ApplicationIdNode = apps.get_model('app', 'ApplicationIdNode')
+        expires_at = now + self.duration()
+        if ApplicationIdNode.objects.filter(node=node, owner=self.owner).update(expires_at=expires_at):
+            self._on_commit(NodeLease(node, expires_at))
+
+    def _acquire(self, now):
+        ApplicationIdNode = apps.get_model('app', 'ApplicationIdNode')
+        expires_at = now + self.duration()
+        with transaction.atomic():
+            ApplicationIdNode.objects.bulk_create(
+                [ApplicationIdNode(node=node) for node in range(MAX_NODE + 1)], ignore_conflicts=True,
+            )
+            free = (
+                ApplicationIdNode.objects.select_for_update(skip_locked=True)
+                .filter(Q(owner=self.owner) | Q(expires_at__isnull=True) | Q(expires_at__lt=now - CLOCK_SKEW))
+                .order_by('node').first()
+            )
+            if free is None:
+                raise RuntimeError(f"All {MAX_NODE + 1} application ID nodes are leased by live processes")
+            ApplicationIdNode.objects.filter(node=free.node).update(owner=self.owner, expires_at=expires_at)
+        self._on_commit(NodeLease(free.node, expires_at))
+        return free.node
+
+    def release(self):
+        """Hand the node back at exit so restarts do not wait out the lease"""
+        if self.pid != os.getpid() or self.lease is None:
+            return
+        try:
+            apps.get_model('app', 'ApplicationIdNode').objects.filter(
+                node=self.lease.node, owner=self.owner,
+            ).update(owner='', expires_at=None)
+        except DatabaseError:
+            pass
+        self.lease = None
+
+
+allocator = NodeAllocator()
+_generators = {}
+_generators_lock = threading.Lock()
+
+
+def generate_application_id():
+    """Return a new unique application ID for this process"""
+    node = allocator.node()
+    generator = _generators.get(node)
+    if generator is None:
+        with _generators_lock:
+            generator = _generators.setdefault(node, ApplicationIdGenerator(node))
+    return generator.next_id()
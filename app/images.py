@@ -0,0 +1,173 @@
+"""
+Normalization of uploaded JPEG/PNG scans.
+
+Phone photos of KYC documents arrive at full sensor resolution with EXIF
+(including GPS) attached. The process_document_images command re-encodes
+each pending image to at most DOCUMENT_IMAGE_MAX_DIMENSION pixels on its
+long side with the orientation applied and all metadata dropped, and adds
+a small JPEG thumbnail for the admin. Both files go through the
+content-addressed document storage and its reference counts.
+
+normalize_image() works on bytes only, so the command can run it in a
+process pool; everything touching the database stays in the parent.
+"""
+import io
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import LoanDocument
+from .storage import hash_from_name
+
+FORMATS = {'image/jpeg': 'JPEG', 'image/png': 'PNG'}
+
+
+class NormalizedImage(NamedTuple):
+    data: bytes
+    thumbnail: bytes
+    width: int
+    height: int
+
+
+def image_options():
+    return {
+        'max_dimension': getattr(settings, 'DOCUMENT_IMAGE_MAX_DIMENSION', 2000),
+        'quality': getattr(settings, 'DOCUMENT_IMAGE_JPEG_QUALITY', 85),
+        'thumbnail_size': getattr(settings, 'DOCUMENT_THUMBNAIL_SIZE', 240),
+    }
+
+
+def _flatten(image):
+    """RGB copy of an image, compositing any transparency onto white"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalize_image(data, content_type, max_dimension, quality, thumbnail_size):
+    """
+    Re-encode an image in its own format, bounded to ``max_dimension`` and
+    without metadata, plus a JPEG thumbnail. Raises on unreadable images.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        original.load()
+        image = ImageOps.exif_transpose(original)
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    if FORMATS[content_type] == 'JPEG':
+        _flatten(image).save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        if image.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        # No pnginfo/exif arguments: text chunks and EXIF are not carried over
+        image.save(output, 'PNG', optimize=True)
+
+    thumbnail = _flatten(image)
+    thumbnail.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+    thumbnail_output = io.BytesIO()
+    thumbnail.save(thumbnail_output, 'JPEG', quality=70, optimize=True)
+    return NormalizedImage(output.getvalue(), thumbnail_output.getvalue(), *image.size)
+
+
+def claim_pending_documents(batch_size):
+    """
+    Lock a batch of pending images by setting processing_claimed_until, so
+    concurrent workers skip them while this one is working. A worker that
+    dies leaves its claim to run out.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'DOCUMENT_PROCESSING_LEASE_SECONDS', 600))
+    with transaction.atomic():
+        documents = list(
+            LoanDocument.objects.select_for_update(skip_locked=True)
+            .filter(processing_status='pending', content_type__in=FORMATS)
+            .filter(Q(processing_claimed_until__isnull=True) | Q(processing_claimed_until__lte=now))
+            .only(
+                'pk', 'document_file', 'original_filename', 'content_type', 'file_size',
+                'content_hash', 'original_file_size', 'thumbnail', 'processing_status',
+            )
+            .order_by('pk')[:batch_size]
+        )
+        LoanDocument.objects.filter(pk__in=[d.pk for d in documents]).update(processing_claimed_until=now + lease)
+    return documents
+
+
+def _normalize_task(args):
+    data, content_type, options = args
+    try:
+        return normalize_image(data, content_type, **options)
+    except Exception as e:
+        return e
+
+
+def apply_result(document, original_size, result):
+    """Swap in the normalized file and thumbnail; returns the bytes saved (may be negative)"""
+    stem = document.original_filename.rsplit('.', 1)[0] or 'document'
+    ext = '.jpg' if document.content_type == 'image/jpeg' else '.png'
+    if document.file_size is None:
+        document.file_size = original_size
+    with transaction.atomic():
+        document.thumbnail.save(f'{stem}-thumbnail.jpg', ContentFile(result.thumbnail), save=False)
+        document.original_file_size = original_size
+        # Always replaced, even when the re-encode came out larger: keeping
+        # the original would keep its EXIF and text chunks
+        document.document_file.save(f'{stem}{ext}', ContentFile(result.data), save=False)
+        document.file_size = len(result.data)
+        document.content_hash = hash_from_name(document.document_file.name)
+        document.processing_status = 'done'
+        document.save(update_fields=[
+            'document_file', 'thumbnail', 'original_file_size', 'processing_status',
+        ])
+    return original_size - document.file_size
+
+
+def process_pending_documents(batch_size, executor=None):
+    """
+    Normalize one batch of pending images, in ``executor`` (any
+    concurrent.futures executor) when given. Returns ``(processed, failed,
+    bytes_saved)``.
+    """
+    # Rows from before this field existed start out pending whatever their
+    # type; ones still missing a content type wait for backfill_document_metadata
+    LoanDocument.objects.filter(processing_status='pending').exclude(
+        content_type__in=[*FORMATS, '']
+    ).update(processing_status='skipped')
+
+    documents = claim_pending_documents(batch_size)
+    if not documents:
+        return 0, 0, 0
+
+    options = image_options()
+    tasks, ready = [], []
+    failed = 0
+    for document in documents:
+        try:
+            with document.document_file.open('rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            LoanDocument.objects.filter(pk=document.pk).update(processing_status='failed')
+            failed += 1
+            continue
+        tasks.append((data, document.content_type, options))
+        ready.append((document, len(data)))
+
+    results = executor.map(_normalize_task, tasks) if executor else map(_normalize_task, tasks)
+    processed = saved = 0
+    for (document, original_size), result in zip(ready, results):
+        if isinstance(result, Exception):
+            LoanDocument.objects.filter(pk=document.pk).update(processing_status='failed')
+            failed += 1
+            continue
+        saved += apply_result(document, original_size, result)
+        processed += 1
+    return processed, failed, saved
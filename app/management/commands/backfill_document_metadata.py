@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from app.models import LoanDocument
+from app.storage import compute_content_hash, guess_content_type, hash_from_name
+
+FIELDS = ['file_size', 'content_type', 'content_hash']
+
+
+class Command(BaseCommand):
+    help = "Record size, MIME type and content hash for documents uploaded before they were tracked"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows written per bulk update")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        updated = missing = 0
+
+        documents = (
+            LoanDocument.objects.filter(file_size__isnull=True)
+            .exclude(document_file='')
+            .only('pk', 'document_file', 'original_filename')
+            .order_by('pk')
+            .iterator(chunk_size=batch_size)
+        )
+        for document in documents:
+            file = document.document_file
+            try:
+                document.file_size = file.size
+                # Content-addressed names already carry the digest; only
+                # legacy files need to be read
+                document.content_hash = hash_from_name(file.name)
+                if not document.content_hash:
+                    with file.open('rb') as f:
+                        document.content_hash = compute_content_hash(f)
+            except FileNotFoundError:
+                missing += 1
+                self.stderr.write(f"Missing file for document {document.pk}: {file.name}")
+                continue
+            document.content_type = guess_content_type(document.original_filename or file.name)
+
+            batch.append(document)
+            if len(batch) >= batch_size:
+                LoanDocument.objects.bulk_update(batch, FIELDS)
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            LoanDocument.objects.bulk_update(batch, FIELDS)
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recorded file metadata for {updated} documents ({missing} missing files)"
+        ))
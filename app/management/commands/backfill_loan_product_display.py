@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from app.catalog import invalidate_catalog
+from app.models import LoanProduct
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed display fields on existing loan products"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Number of products written per bulk update"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        total = 0
+
+        for product in LoanProduct.objects.order_by('pk').iterator(chunk_size=batch_size):
+            product.refresh_display_fields()
+            batch.append(product)
+            if len(batch) >= batch_size:
+                LoanProduct.objects.bulk_update(batch, LoanProduct.DISPLAY_FIELDS)
+                total += len(batch)
+                batch = []
+
+        if batch:
+            LoanProduct.objects.bulk_update(batch, LoanProduct.DISPLAY_FIELDS)
+            total += len(batch)
+
+        # bulk_update() bypasses post_save, so drop the cached catalog explicitly
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f"Backfilled display fields for {total} loan products"))
@@ -0,0 +1,115 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from app.bulk import FORMATS, Throughput, guess_format, read_batches
+from app.models import LoanApplication, LoanProduct, UserProfile
+
+FIELDS = [
+    'application_id', 'status', 'first_name', 'last_name', 'email', 'phone',
+    'requested_amount', 'annual_income', 'purpose',
+]
+# auto_now_add/auto_now overwrite these in bulk_create(), so exported values
+# are written back with bulk_update(), which does not call pre_save()
+TIMESTAMP_FIELDS = ['created_at', 'updated_at']
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create loan applications from a CSV, JSONL or Parquet file. Rows name the "
+        "applicant by user_email and the product by loan_product_id (the export format). "
+        "The import is all or nothing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File to read")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the input file extension")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Rows inserted per bulk_create")
+        parser.add_argument(
+            '--skip-existing', action='store_true',
+            help="Skip rows whose application_id already exists instead of failing"
+        )
+
+    def handle(self, *args, **options):
+        fmt = guess_format(options['input'], options['format'])
+        product_ids = set(LoanProduct.objects.values_list('pk', flat=True))
+        throughput = Throughput()
+
+        with transaction.atomic():
+            for rows in read_batches(options['input'], fmt, options['batch_size']):
+                # One profile lookup per batch keeps memory bounded by the batch size
+                emails = {row.get('user_email') for row in rows}
+                profiles = {
+                    profile.user.email: profile
+                    for profile in UserProfile.objects.select_related('user').filter(user__email__in=emails)
+                }
+                applications, timestamps = [], {}
+                for i, row in enumerate(rows):
+                    line = throughput.rows + i + 1
+                    application = self.build(row, line, profiles, product_ids)
+                    applications.append(application)
+                    stamps = self.timestamps(row, line)
+                    if stamps:
+                        timestamps[application.application_id] = stamps
+                if options['skip_existing'] and timestamps:
+                    # Skipped rows keep the timestamps they already have
+                    for application_id in LoanApplication.objects.filter(
+                        application_id__in=timestamps
+                    ).values_list('application_id', flat=True):
+                        del timestamps[application_id]
+                LoanApplication.objects.bulk_create(
+                    applications,
+                    batch_size=options['batch_size'],
+                    ignore_conflicts=options['skip_existing'],
+                )
+                self.restore_timestamps(timestamps, options['batch_size'])
+                throughput.add(len(applications))
+
+        self.stdout.write(self.style.SUCCESS(throughput.summary("Imported")))
+
+    def build(self, row, line, profiles, product_ids):
+        profile = profiles.get(row.get('user_email'))
+        if profile is None:
+            raise CommandError(f"Row {line}: no user profile for {row.get('user_email')!r}")
+        try:
+            product_id = int(row.get('loan_product_id'))
+        except (TypeError, ValueError):
+            product_id = None
+        if product_id not in product_ids:
+            raise CommandError(f"Row {line}: unknown loan_product_id {row.get('loan_product_id')!r}")
+
+        values = {field: row[field] for field in FIELDS if row.get(field) not in (None, '')}
+        application = LoanApplication(user_profile=profile, loan_product_id=product_id, **values)
+
+        # bulk_create() skips LoanApplication.save(), so apply its defaults here
+        application.fill_defaults()
+        return application
+
+    def timestamps(self, row, line):
+        """The row's exported timestamps as aware datetimes, by field name"""
+        stamps = {}
+        for field in TIMESTAMP_FIELDS:
+            value = row.get(field)
+            if value in (None, ''):
+                continue
+            try:
+                value = LoanApplication._meta.get_field(field).to_python(value)
+            except ValidationError as e:
+                raise CommandError(f"Row {line}: {field}: {' '.join(e.messages)}")
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            stamps[field] = value
+        return stamps
+
+    def restore_timestamps(self, timestamps, batch_size):
+        if not timestamps:
+            return
+        applications = list(
+            LoanApplication.objects.filter(application_id__in=timestamps)
+            .only('pk', 'application_id', *TIMESTAMP_FIELDS)
+        )
+        for application in applications:
+            for field, value in timestamps[application.application_id].items():
+                setattr(application, field, value)
+        LoanApplication.objects.bulk_update(applications, TIMESTAMP_FIELDS, batch_size=batch_size)
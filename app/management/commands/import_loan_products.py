@@ -0,0 +1,53 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from app.bulk import FORMATS, Throughput, guess_format, read_batches
+from app.catalog import invalidate_catalog
+from app.models import LoanProduct
+
+FIELDS = [
+    'name', 'category', 'icon', 'short_description',
+    'min_loan_amount', 'max_loan_amount', 'min_interest_rate', 'max_interest_rate',
+    'min_tenure', 'max_tenure', 'features', 'is_active',
+]
+BOOLEAN_TRUE = {'1', 'true', 'yes', 'y', 't'}
+
+
+class Command(BaseCommand):
+    help = "Bulk-create loan products from a CSV, JSONL or Parquet file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File to read")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the input file extension")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows inserted per bulk_create")
+
+    def handle(self, *args, **options):
+        fmt = guess_format(options['input'], options['format'])
+        throughput = Throughput()
+
+        for rows in read_batches(options['input'], fmt, options['batch_size']):
+            products = [self.build(row, throughput.rows + i + 1) for i, row in enumerate(rows)]
+            LoanProduct.objects.bulk_create(products, batch_size=options['batch_size'])
+            throughput.add(len(products))
+
+        # bulk_create() sends no post_save, so drop the cached catalog here
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(throughput.summary("Imported")))
+
+    def build(self, row, line):
+        values = {field: row[field] for field in FIELDS if row.get(field) not in (None, '')}
+        if not values.get('name') or not values.get('category'):
+            raise CommandError(f"Row {line}: name and category are required")
+        if isinstance(values.get('is_active'), str):
+            values['is_active'] = values['is_active'].strip().lower() in BOOLEAN_TRUE
+        # CSV (and string Parquet columns) give text; the display fields need numbers
+        for field, value in values.items():
+            try:
+                values[field] = LoanProduct._meta.get_field(field).to_python(value)
+            except ValidationError as e:
+                raise CommandError(f"Row {line}: {field}: {' '.join(e.messages)}")
+
+        product = LoanProduct(**values)
+        # save() is skipped by bulk_create, so fill the display columns here
+        product.refresh_display_fields()
+        return product
@@ -0,0 +1,68 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import DocumentBlob, LoanDocument
+from app.storage import compute_content_hash, get_document_storage, hash_from_name, hashed_name
+
+
+class Command(BaseCommand):
+    help = "Move loan documents into the content-addressed store and report the bytes reclaimed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Hash the files and report the savings without moving anything"
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = get_document_storage()
+        legacy_bytes = 0
+        stored_bytes = 0
+        migrated = missing = 0
+        seen = set()
+
+        documents = (
+            LoanDocument.objects.exclude(document_file='')
+            .only('pk', 'document_file')
+            .order_by('pk')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        for document in documents:
+            old_name = document.document_file.name
+            if hash_from_name(old_name):
+                continue
+            if not default_storage.exists(old_name):
+                missing += 1
+                self.stderr.write(f"Missing file for document {document.pk}: {old_name}")
+                continue
+
+            # The write and the reference share a transaction (see app.storage)
+            with transaction.atomic(), default_storage.open(old_name, 'rb') as f:
+                f.content_hash = compute_content_hash(f)
+                new_name = hashed_name(f.content_hash, old_name)
+                size = default_storage.size(old_name)
+                legacy_bytes += size
+                if new_name not in seen and not storage.exists(new_name):
+                    stored_bytes += size
+                seen.add(new_name)
+                migrated += 1
+                if dry_run:
+                    continue
+
+                new_name = storage.save(old_name, f)
+                # update() skips LoanDocument.save(), so take the reference by hand
+                LoanDocument.objects.filter(pk=document.pk).update(
+                    document_file=new_name, file_size=size, content_hash=f.content_hash
+                )
+                DocumentBlob.acquire(new_name, size)
+            default_storage.delete(old_name)
+
+        reclaimed = legacy_bytes - stored_bytes
+        verb = "Would migrate" if dry_run else "Migrated"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {migrated} documents ({missing} missing files): "
+            f"{legacy_bytes:,} bytes -> {stored_bytes:,} bytes, {reclaimed:,} bytes reclaimed"
+        ))
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.images import process_pending_documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Resize uploaded JPEG/PNG documents, strip their EXIF metadata and add admin "
+        "thumbnails. Decoding and encoding run in a pool of worker processes; reading "
+        "and saving files stays in this process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=getattr(settings, 'DOCUMENT_PROCESSING_BATCH_SIZE', 50),
+            help="Maximum number of documents read into memory per batch"
+        )
+        parser.add_argument(
+            '--workers', type=int,
+            default=getattr(settings, 'DOCUMENT_PROCESSING_WORKERS', 1),
+            help="Worker processes for image work; 1 processes inline"
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep polling for new uploads instead of exiting once none are pending"
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            default=getattr(settings, 'DOCUMENT_PROCESSING_POLL_INTERVAL', 5),
+            help="Seconds to sleep between polls when nothing is pending (with --loop)"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = max(1, options['workers'])
+        total_processed = total_failed = total_saved = 0
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            while True:
+                processed, failed, saved = process_pending_documents(batch_size, executor=executor)
+                total_processed += processed
+                total_failed += failed
+                total_saved += saved
+                if processed or failed:
+                    self.stdout.write(f"Processed {processed}, failed {failed}, saved {saved} bytes")
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Images processed: {total_processed} normalized, {total_failed} failed, "
+            f"{total_saved / 1024 / 1024:.1f} MB saved"
+        ))
@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from app.emails import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50),
+            help="Maximum number of emails sent per batch"
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep polling the outbox instead of exiting once it is drained"
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            default=getattr(settings, 'EMAIL_OUTBOX_POLL_INTERVAL', 5),
+            help="Seconds to sleep between polls when the outbox is empty (with --loop)"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_sent = total_failed = 0
+
+        # Batches sent back to back share one connection; it is closed while
+        # idle so the mail server does not time it out between polls.
+        connection = get_connection(fail_silently=False)
+        try:
+            while True:
+                sent, failed = process_outbox(batch_size=batch_size, connection=connection)
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}")
+                    continue
+                if not options['loop']:
+                    break
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox processed: {total_sent} sent, {total_failed} failed"
+        ))
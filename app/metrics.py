@@ -0,0 +1,214 @@
+"""
+In-process request metrics.
+
+PerformanceMiddleware (app/middleware.py) opens a RequestMetrics for every
+request; database time is collected through an ``execute_wrapper`` every
+connection gets when it is opened (app/signals.py) and template time through
+the TimedDjangoTemplates backend. Both find the request through a ContextVar,
+so queries the async ORM runs in a worker thread are counted as well. Totals per
+view are kept in memory and served in the Prometheus text format by the
+``metrics`` view, so nothing outside the process is needed. Like the
+LocMem cache, each worker process reports its own numbers; Prometheus
+scrapes and sums them per instance.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+# Upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Numbers collected while one request is being handled"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.upload_bytes = 0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+    def server_timing(self):
+        return ', '.join([
+            f'app;dur={self.seconds * 1000:.1f}',
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.1f}',
+        ])
+
+    def as_dict(self):
+        return {
+            'seconds': round(self.seconds, 4),
+            'db_queries': self.db_queries,
+            'db_seconds': round(self.db_seconds, 4),
+            'template_seconds': round(self.template_seconds, 4),
+            'upload_bytes': self.upload_bytes,
+        }
+
+
+@contextmanager
+def collect():
+    """Make a fresh RequestMetrics current for the duration of the block"""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.finish()
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def _allowed_ip(request):
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+
+
+def can_view_metrics(request):
+    """
+    Whether a request may see internal timings: staff and METRICS_ALLOWED_IPS.
+    The address is checked first, so most requests need no user lookup.
+    """
+    if _allowed_ip(request):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_staff)
+
+
+async def acan_view_metrics(request):
+    """Async can_view_metrics()"""
+    if _allowed_ip(request):
+        return True
+    if not hasattr(request, 'auser'):
+        return False
+    return (await request.auser()).is_staff
+
+
+def record_query(execute, sql, params, many, context):
+    """connection.execute_wrapper hook, charging the query to the current request"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, timing each top-level render"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class Registry:
+    """Totals per (view, method, status), plus a duration histogram per view"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.requests = {}
+        self.views = {}
+
+    def record(self, view, method, status, metrics):
+        with self.lock:
+            key = (view, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            totals = self.views.setdefault(view, {
+                'buckets': [0] * len(DURATION_BUCKETS),
+                'count': 0,
+                'seconds': 0.0,
+                'db_queries': 0,
+                'db_seconds': 0.0,
+                'template_seconds': 0.0,
+                'upload_bytes': 0,
+            })
+            index = bisect.bisect_left(DURATION_BUCKETS, metrics.seconds)
+            if index < len(DURATION_BUCKETS):
+                totals['buckets'][index] += 1
+            totals['count'] += 1
+            totals['seconds'] += metrics.seconds
+            totals['db_queries'] += metrics.db_queries
+            totals['db_seconds'] += metrics.db_seconds
+            totals['template_seconds'] += metrics.template_seconds
+            totals['upload_bytes'] += metrics.upload_bytes
+
+    def render(self):
+        """The registry in the Prometheus text exposition format"""
+        with self.lock:
+            requests = sorted(self.requests.items())
+            views = {view: dict(totals, buckets=list(totals['buckets'])) for view, totals in self.views.items()}
+
+        lines = [
+            '# HELP magenn_requests_total Requests handled, by view, method and status.',
+            '# TYPE magenn_requests_total counter',
+        ]
+        for (view, method, status), count in requests:
+            lines.append(f'magenn_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+
+        lines += [
+            '# HELP magenn_request_duration_seconds Wall time per request.',
+            '# TYPE magenn_request_duration_seconds histogram',
+        ]
+        for view, totals in sorted(views.items()):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, totals['buckets']):
+                cumulative += count
+                lines.append(f'magenn_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'magenn_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {totals["count"]}')
+            lines.append(f'magenn_request_duration_seconds_sum{{view="{view}"}} {totals["seconds"]:.6f}')
+            lines.append(f'magenn_request_duration_seconds_count{{view="{view}"}} {totals["count"]}')
+
+        for name, key, help_text in (
+            ('magenn_db_queries_total', 'db_queries', 'Database queries run.'),
+            ('magenn_db_seconds_total', 'db_seconds', 'Time spent in database queries.'),
+            ('magenn_template_seconds_total', 'template_seconds', 'Time spent rendering templates.'),
+            ('magenn_upload_bytes_total', 'upload_bytes', 'Request body bytes received.'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for view, totals in sorted(views.items()):
+                value = totals[key]
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{view="{view}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,78 @@
+import json
+import logging
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger('app.performance')
+
+
+class PerformanceMiddleware:
+    """
+    Time every request and record its database, template and upload cost.
+
+    The numbers go to the in-process metrics registry, to a Server-Timing
+    response header (PERFORMANCE_SERVER_TIMING; only for the staff and
+    METRICS_ALLOWED_IPS clients that may read /metrics/) and, for requests
+    slower than SLOW_REQUEST_THRESHOLD_MS, to a structured warning on the
+    ``app.performance`` logger.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Under ASGI, stay async so async views are not pushed into a thread
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.measure(request) as request_metrics:
+            response = self.get_response(request)
+        # collect() has stopped the clock
+        self.record(request, response, request_metrics)
+        if self.server_timing_enabled() and metrics.can_view_metrics(request):
+            response['Server-Timing'] = request_metrics.server_timing()
+        return response
+
+    async def __acall__(self, request):
+        with self.measure(request) as request_metrics:
+            response = await self.get_response(request)
+        self.record(request, response, request_metrics)
+        if self.server_timing_enabled() and await metrics.acan_view_metrics(request):
+            response['Server-Timing'] = request_metrics.server_timing()
+        return response
+
+    @staticmethod
+    def server_timing_enabled():
+        return getattr(settings, 'PERFORMANCE_SERVER_TIMING', True)
+
+    @contextmanager
+    def measure(self, request):
+        with metrics.collect() as request_metrics:
+            request_metrics.upload_bytes = int(request.META.get('CONTENT_LENGTH') or 0)
+            yield request_metrics
+
+    def record(self, request, response, request_metrics):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.registry.record(view, request.method, response.status_code, request_metrics)
+
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+        if request_metrics.seconds * 1000 >= threshold:
+            record = {
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                **request_metrics.as_dict(),
+            }
+            logger.warning(json.dumps(record), extra={'performance': record})
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:52
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanApplication',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.CharField(blank=True, max_length=100)),
+                ('last_name', models.CharField(blank=True, max_length=100)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('phone', models.CharField(blank=True, max_length=15)),
+                ('requested_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('annual_income', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('purpose', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('under_review', 'Under Review'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('completed', 'Completed')], default='pending', max_length=20)),
+                ('application_id', models.CharField(blank=True, max_length=20, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('category', models.CharField(help_text='Category name (e.g., Personal Loan, Home Loan, Car Loan)', max_length=100)),
+                ('icon', models.CharField(default='💰', help_text='Icon representation (e.g., 💰, 🏠, 🚗)', max_length=50)),
+                ('short_description', models.CharField(blank=True, max_length=255)),
+                ('min_loan_amount', models.DecimalField(decimal_places=2, default=1000.0, help_text='Minimum loan amount', max_digits=12, validators=[django.core.validators.MinValueValidator(0)])),
+                ('max_loan_amount', models.DecimalField(decimal_places=2, default=50000.0, help_text='Maximum loan amount', max_digits=12, validators=[django.core.validators.MinValueValidator(0)])),
+                ('min_interest_rate', models.DecimalField(decimal_places=2, default=5.0, help_text='Minimum interest rate (%)', max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('max_interest_rate', models.DecimalField(decimal_places=2, default=15.0, help_text='Maximum interest rate (%)', max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('min_tenure', models.PositiveSmallIntegerField(default=12, help_text='Minimum tenure in months')),
+                ('max_tenure', models.PositiveSmallIntegerField(default=60, help_text='Maximum tenure in months')),
+                ('features', models.TextField(default='✓ No collateral required\n✓ Quick approval\n✓ Flexible repayment options', help_text='List key features separated by new lines')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Loan Product',
+                'verbose_name_plural': 'Loan Products',
+                'ordering': ['category', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_type', models.CharField(choices=[('aadhar_card', 'Aadhar Card (Latest Downloaded)'), ('pan_card', 'PAN Card'), ('id_proof', 'ID Proof'), ('income_proof', 'Income Proof'), ('bank_statement', 'Bank Statement'), ('udyam_certificate', 'Udyam Registration Certificate (Original Downloaded)'), ('gst_certificate', 'GST Certificate'), ('other', 'Other')], max_length=20)),
+                ('document_file', models.FileField(upload_to='loan_documents/')),
+                ('original_filename', models.CharField(max_length=255)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('is_mandatory', models.BooleanField(default=False)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='app.loanapplication')),
+            ],
+            options={
+                'ordering': ['-uploaded_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='loan_product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applications', to='app.loanproduct'),
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile_image', models.ImageField(blank=True, null=True, upload_to='profile_images/')),
+                ('phone_number', models.CharField(blank=True, max_length=15, null=True)),
+                ('date_of_birth', models.DateField(blank=True, null=True)),
+                ('bio', models.TextField(blank=True, max_length=500)),
+                ('is_email_verified', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='user_profile',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loan_applications', to='app.userprofile'),
+        ),
+    ]
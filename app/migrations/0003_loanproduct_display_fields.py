@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:54
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+DISPLAY_FIELDS = ('display_interest_rate', 'display_amount_range', 'display_tenure_range', 'features_list')
+
+
+# LoanProduct.refresh_display_fields() and its helpers, frozen here: the
+# historical model has no methods
+def format_amount(amount):
+    if amount >= 1000000:
+        return f"₹{amount/1000000:.1f}M"
+    elif amount >= 1000:
+        return f"₹{amount/1000:.0f}K"
+    return f"₹{amount:.0f}"
+
+
+def refresh_display_fields(product):
+    product.features_list = [feature.strip() for feature in product.features.split('\n') if feature.strip()]
+
+    min_years, max_years = product.min_tenure // 12, product.max_tenure // 12
+    if min_years == max_years:
+        product.display_tenure_range = f"{min_years} year{'s' if min_years > 1 else ''}"
+    else:
+        product.display_tenure_range = f"{min_years}-{max_years} years"
+
+    product.display_amount_range = (
+        f"{format_amount(Decimal(str(product.min_loan_amount)))} - "
+        f"{format_amount(Decimal(str(product.max_loan_amount)))}"
+    )
+
+    min_rate = Decimal(str(product.min_interest_rate)).quantize(Decimal('0.01'))
+    max_rate = Decimal(str(product.max_interest_rate)).quantize(Decimal('0.01'))
+    product.display_interest_rate = f"{min_rate}%" if min_rate == max_rate else f"{min_rate}% - {max_rate}%"
+
+
+def backfill_display_fields(apps, schema_editor):
+    """Fill the new columns on existing products, which the homepage reads directly"""
+    LoanProduct = apps.get_model('app', 'LoanProduct')
+    batch = []
+    for product in LoanProduct.objects.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        refresh_display_fields(product)
+        batch.append(product)
+        if len(batch) >= BATCH_SIZE:
+            LoanProduct.objects.bulk_update(batch, DISPLAY_FIELDS)
+            batch = []
+    if batch:
+        LoanProduct.objects.bulk_update(batch, DISPLAY_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanproduct',
+            name='display_amount_range',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='loanproduct',
+            name='display_interest_rate',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='loanproduct',
+            name='display_tenure_range',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='loanproduct',
+            name='features_list',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_display_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_loandocument_file_metadata'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['-created_at'], name='loanapp_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['status', '-created_at'], name='loanapp_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['loan_product', '-created_at'], name='loanapp_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['updated_at'], name='loanapp_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loandocument',
+            index=models.Index(fields=['-uploaded_at'], name='loandoc_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loandocument',
+            index=models.Index(fields=['application', 'document_type'], name='loandoc_app_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loandocument',
+            index=models.Index(fields=['document_type', '-uploaded_at'], name='loandoc_type_uploaded_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count, Q, UniqueConstraint
+from django.db.models.functions import Lower
+
+# Same definition as app.backends.EMAIL_CONSTRAINT, frozen here
+EMAIL_CONSTRAINT = UniqueConstraint(
+    Lower('email'),
+    name='auth_user_email_lower_uniq',
+    condition=~Q(email=''),
+)
+
+
+def add_constraint(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.exclude(email='')
+        .values(email_lower=Lower('email'))
+        .annotate(n=Count('pk'))
+        .filter(n__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Cannot add the unique email index: these emails belong to more than one user "
+            f"(case-insensitively): {', '.join(duplicates)}. Merge or change them and migrate again."
+        )
+    schema_editor.add_constraint(User, EMAIL_CONSTRAINT)
+
+
+def remove_constraint(apps, schema_editor):
+    schema_editor.remove_constraint(apps.get_model('auth', 'User'), EMAIL_CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_admin_query_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_constraint, remove_constraint),
+    ]
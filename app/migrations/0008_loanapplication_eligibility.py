@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_auth_user_email_lower_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='eligibility_score',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, help_text="0-100; 50 and above is affordable at the product's best rate", null=True),
+        ),
+        migrations.AddField(
+            model_name='loanapplication',
+            name='max_eligible_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+    ]
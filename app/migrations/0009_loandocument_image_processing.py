@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:23
+
+import app.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_loanapplication_eligibility'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loandocument',
+            name='original_file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Size in bytes before normalization', null=True),
+        ),
+        migrations.AddField(
+            model_name='loandocument',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Normalized'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='loandocument',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, storage=app.storage.get_document_storage, upload_to=''),
+        ),
+        migrations.AddIndex(
+            model_name='loandocument',
+            index=models.Index(condition=models.Q(('processing_status', 'pending')), fields=['id'], name='loandoc_pending_idx'),
+        ),
+    ]
@@ -1,7 +1,15 @@
+from collections import Counter
+from decimal import Decimal
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .ids import generate_application_id
+from .storage import compute_content_hash, get_document_storage, guess_content_type, hash_from_name
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -83,6 +91,14 @@ class LoanProduct(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Rendered display values, refreshed on every save (see refresh_display_fields)
+    display_interest_rate = models.CharField(max_length=50, blank=True, editable=False)
+    display_amount_range = models.CharField(max_length=50, blank=True, editable=False)
+    display_tenure_range = models.CharField(max_length=50, blank=True, editable=False)
+    features_list = models.JSONField(default=list, blank=True, editable=False)
+
+    DISPLAY_FIELDS = ('display_interest_rate', 'display_amount_range', 'display_tenure_range', 'features_list')
+
     class Meta:
         ordering = ['category', 'name']
         verbose_name = "Loan Product"
@@ -91,12 +107,37 @@ class LoanProduct(models.Model):
     def __str__(self):
         return f"{self.name} ({self.category})"
 
+    def save(self, *args, **kwargs):
+        self.refresh_display_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.DISPLAY_FIELDS)
+        super().save(*args, **kwargs)
+
+    def refresh_display_fields(self):
+        """Recompute the denormalized display columns from the source fields"""
+        self.features_list = [feature.strip() for feature in self.features.split('\n') if feature.strip()]
+        self.display_tenure_range = self._format_tenure_range()
+        self.display_amount_range = self._format_amount_range()
+        self.display_interest_rate = self._format_interest_rate()
+
     def get_features_list(self):
         """Return features as a list"""
-        return [feature.strip() for feature in self.features.split('\n') if feature.strip()]
+        return self.features_list
 
     def tenure_range_display(self):
         """Return tenure range in a readable format"""
+        return self.display_tenure_range
+
+    def amount_range_display(self):
+        """Return amount range in a readable format"""
+        return self.display_amount_range
+
+    def interest_rate_display(self):
+        """Return interest rate range in a readable format"""
+        return self.display_interest_rate
+
+    def _format_tenure_range(self):
         min_years = self.min_tenure // 12
         max_years = self.max_tenure // 12
         
@@ -105,30 +146,26 @@ class LoanProduct(models.Model):
         else:
             return f"{min_years}-{max_years} years"
 
-    def amount_range_display(self):
-        """Return amount range in a readable format"""
-        if self.max_loan_amount >= 1000000:
-            max_display = f"₹{self.max_loan_amount/1000000:.1f}M"
-        elif self.max_loan_amount >= 1000:
-            max_display = f"₹{self.max_loan_amount/1000:.0f}K"
-        else:
-            max_display = f"₹{self.max_loan_amount:.0f}"
-                    
-        if self.min_loan_amount >= 1000000:
-            min_display = f"₹{self.min_loan_amount/1000000:.1f}M"
-        elif self.min_loan_amount >= 1000:
-            min_display = f"₹{self.min_loan_amount/1000:.0f}K"
-        else:
-            min_display = f"₹{self.min_loan_amount:.0f}"
-                    
-        return f"{min_display} - {max_display}"
+    @staticmethod
+    def _format_amount(amount):
+        if amount >= 1000000:
+            return f"₹{amount/1000000:.1f}M"
+        elif amount >= 1000:
+            return f"₹{amount/1000:.0f}K"
+        return f"₹{amount:.0f}"
 
-    def interest_rate_display(self):
-        """Return interest rate range in a readable format"""
-        if self.min_interest_rate == self.max_interest_rate:
-            return f"{self.min_interest_rate}%"
+    def _format_amount_range(self):
+        min_amount = Decimal(str(self.min_loan_amount))
+        max_amount = Decimal(str(self.max_loan_amount))
+        return f"{self._format_amount(min_amount)} - {self._format_amount(max_amount)}"
+
+    def _format_interest_rate(self):
+        min_rate = Decimal(str(self.min_interest_rate)).quantize(Decimal('0.01'))
+        max_rate = Decimal(str(self.max_interest_rate)).quantize(Decimal('0.01'))
+        if min_rate == max_rate:
+            return f"{min_rate}%"
         else:
-            return f"{self.min_interest_rate}% - {self.max_interest_rate}%"
+            return f"{min_rate}% - {max_rate}%"
 
 
 
@@ -157,6 +194,15 @@ class LoanApplication(models.Model):
     annual_income = models.DecimalField(max_digits=12, decimal_places=2)
     purpose = models.TextField()
     
+    # Affordability (app/eligibility.py); set at submission and by score_loan_applications
+    eligibility_score = models.PositiveSmallIntegerField(
+        null=True, blank=True, editable=False,
+        help_text="0-100; 50 and above is affordable at the product's best rate"
+    )
+    max_eligible_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True, editable=False
+    )
+    
     # Application Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     application_id = models.CharField(max_length=20, unique=True, blank=True)
@@ -167,45 +213,56 @@ class LoanApplication(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        # Matched to the admin changelist: default ordering plus its list filters
+        indexes = [
+            models.Index(fields=['-created_at'], name='loanapp_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='loanapp_status_created_idx'),
+            models.Index(fields=['loan_product', '-created_at'], name='loanapp_product_created_idx'),
+            models.Index(fields=['updated_at'], name='loanapp_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.application_id} - {self.first_name} {self.last_name}"
     
     def save(self, *args, **kwargs):
+        self.fill_defaults()
+        super().save(*args, **kwargs)
+
+    def fill_defaults(self):
+        """Assign the application ID and copy empty personal fields from the profile"""
         if not self.application_id:
-            # Generate unique application ID
-            import random
-            import string
-            self.application_id = 'LA' + ''.join(random.choices(string.digits, k=8))
+            self.application_id = generate_application_id()
         
-        # Auto-populate from user profile if fields are empty
-        if self.user_profile:
+        # Auto-populate from user profile if fields are empty. The profile and
+        # its user are resolved once; callers that pass a profile loaded with
+        # its user (see ProfileModelBackend) make this query-free.
+        if self.user_profile_id and not all([self.first_name, self.last_name, self.email, self.phone]):
+            profile = self.user_profile
+            user = profile.user
             if not self.first_name:
-                self.first_name = self.user_profile.user.first_name
+                self.first_name = user.first_name
             if not self.last_name:
-                self.last_name = self.user_profile.user.last_name
+                self.last_name = user.last_name
             if not self.email:
-                self.email = self.user_profile.user.email
+                self.email = user.email
             if not self.phone:
-                self.phone = self.user_profile.phone_number or ''
-        
-        super().save(*args, **kwargs)
+                self.phone = profile.phone_number or ''
     
     @property
     def full_name(self):
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name}"
-        elif self.user_profile:
+        elif self.user_profile_id:
             return self.user_profile.user.get_full_name()
         return "Unknown"
     
     @property
     def applicant_email(self):
-        return self.email or (self.user_profile.user.email if self.user_profile else '')
+        return self.email or (self.user_profile.user.email if self.user_profile_id else '')
     
     @property
     def applicant_phone(self):
-        return self.phone or (self.user_profile.phone_number if self.user_profile else '')
+        return self.phone or (self.user_profile.phone_number if self.user_profile_id else '')
 
 
 class LoanDocument(models.Model):
@@ -228,13 +285,208 @@ class LoanDocument(models.Model):
     
     application = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='documents')
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
-    document_file = models.FileField(upload_to='loan_documents/')
+    document_file = models.FileField(upload_to='loan_documents/', storage=get_document_storage)
     original_filename = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_mandatory = models.BooleanField(default=False)  # Optional field to mark mandatory documents
+
+    # Recorded at upload time so listing documents never has to stat the storage
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False, help_text="Size in bytes")
+    content_type = models.CharField(max_length=100, blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+
+    # Image normalization (app/images.py, process_document_images command)
+    PROCESSING_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Normalized'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+    processing_status = models.CharField(
+        max_length=10, choices=PROCESSING_STATUS_CHOICES, default='pending', editable=False
+    )
+    original_file_size = models.PositiveBigIntegerField(
+        null=True, blank=True, editable=False, help_text="Size in bytes before normalization"
+    )
+    thumbnail = models.FileField(storage=get_document_storage, blank=True, editable=False)
+    # Set while an image worker holds the row (app.images.claim_pending_documents)
+    processing_claimed_until = models.DateTimeField(null=True, blank=True, editable=False)
     
+    # Files tracked by DocumentBlob reference counts
+    BLOB_FIELDS = ('document_file', 'thumbnail')
+
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['-uploaded_at'], name='loandoc_uploaded_idx'),
+            models.Index(fields=['application', 'document_type'], name='loandoc_app_type_idx'),
+            models.Index(fields=['document_type', '-uploaded_at'], name='loandoc_type_uploaded_idx'),
+            # The image worker's queue; stays tiny because processed rows drop out
+            models.Index(fields=['id'], name='loandoc_pending_idx', condition=models.Q(processing_status='pending')),
+        ]
     
     def __str__(self):
-        return f"{self.application.application_id} - {self.get_document_type_display()}"
\ No newline at end of file
+        return f"{self.application.application_id} - {self.get_document_type_display()}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_names = {name: instance.__dict__.get(name) or None for name in cls.BLOB_FIELDS}
+        return instance
+
+    def record_file_metadata(self):
+        """
+        Capture size, MIME type and SHA-256 of the file being uploaded.
+
+        Only reads the in-memory/spooled upload, never the storage backend;
+        already stored files are handled by the backfill_document_metadata
+        command.
+        """
+        if not self.document_file or self.document_file._committed:
+            return
+        upload = self.document_file.file
+        self.file_size = upload.size
+        self.content_hash = compute_content_hash(upload)
+        self.content_type = guess_content_type(self.original_filename or upload.name)
+        # Only images have anything for the normalization worker to do
+        self.processing_status = 'pending' if self.content_type.startswith('image/') else 'skipped'
+
+    def save(self, *args, **kwargs):
+        previous = getattr(self, '_stored_names', {})
+        self.record_file_metadata()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'document_file' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {
+                'file_size', 'content_type', 'content_hash', 'processing_status',
+            }
+        # The file is stored in pre_save; its reference must be taken in the
+        # same transaction (see app.storage)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            current = {name: getattr(self, name).name or None for name in self.BLOB_FIELDS}
+            for name in self.BLOB_FIELDS:
+                if current[name] != previous.get(name):
+                    if current[name]:
+                        size = self.file_size if name == 'document_file' else getattr(self, name).size
+                        DocumentBlob.acquire(current[name], size or 0)
+                    if previous.get(name):
+                        DocumentBlob.release(previous[name])
+        self._stored_names = current
+
+
+class DocumentBlob(models.Model):
+    """Reference count for a file in the content-addressed document store"""
+    name = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+    @classmethod
+    def acquire(cls, name, size=0):
+        """Record a new reference to a stored file"""
+        cls.acquire_many([(name, size)])
+
+    @classmethod
+    def acquire_many(cls, files):
+        """
+        Record one reference per ``(name, size)`` pair, in a constant number
+        of queries however many files there are. Legacy (non
+        content-addressed) names are ignored.
+        """
+        counts = Counter()
+        sizes = {}
+        for name, size in files:
+            if hash_from_name(name) is not None:
+                counts[name] += 1
+                sizes[name] = size
+        if not counts:
+            return
+
+        by_count = {}
+        for name, count in counts.items():
+            by_count.setdefault(count, []).append(name)
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(name=name, content_hash=hash_from_name(name), size=sizes[name]) for name in counts],
+                ignore_conflicts=True,
+            )
+            for count, names in by_count.items():
+                cls.objects.filter(name__in=names).update(ref_count=F('ref_count') + count)
+
+    @classmethod
+    def release(cls, name):
+        """Drop one reference, deleting the file once nothing points at it"""
+        if hash_from_name(name) is None:
+            return
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            cls.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            if blob.ref_count == 1:
+                transaction.on_commit(lambda: cls.delete_if_unreferenced(name))
+
+    @classmethod
+    def delete_if_unreferenced(cls, name):
+        """
+        Delete the file and its blob row if no reference was taken since the
+        last one was released. Runs under the row lock that
+        ContentAddressedStorage.save() takes before reusing a stored file.
+        """
+        with transaction.atomic():
+            blob = cls.objects.select_for_update().filter(name=name).first()
+            if blob is None or blob.ref_count > 0:
+                return
+            get_document_storage().delete(name)
+            blob.delete()
+
+
+class ApplicationIdNode(models.Model):
+    """
+    Lease on one of the node numbers baked into application IDs. Each
+    process leases its own (app.ids.NodeAllocator); an expired lease is free.
+    """
+    node = models.PositiveSmallIntegerField(primary_key=True)
+    owner = models.CharField(max_length=100, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Node {self.node} ({self.owner or 'free'})"
+
+
+class EmailOutbox(models.Model):
+    """Queued outgoing email, delivered by the process_email_outbox command"""
+    KIND_CHOICES = [
+        ('loan_confirmation', 'Loan Application Confirmation'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, default='loan_confirmation')
+    application = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='outbox_emails')
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+        verbose_name = "Email Outbox Entry"
+        verbose_name_plural = "Email Outbox"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} to {self.recipient} ({self.status})"
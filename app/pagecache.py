@@ -0,0 +1,71 @@
+"""
+Full-response cache for pages every anonymous visitor sees the same way.
+
+A request is anonymous when it carries no session cookie, which is decided
+without reading the session store or the database. Responses are cached per
+path under the catalog version, so product changes show up at once, and the
+static manifest hash, so a deploy never serves HTML that points at assets
+from the previous one. They always go out with ``Vary: Cookie``, so no cache
+downstream hands the anonymous copy to a logged-in visitor.
+
+The CSRF token in a cached page is replaced by CSRF_PLACEHOLDER when it is
+stored and by the visitor's own token on every hit. get_token() also makes
+CsrfViewMiddleware set the csrftoken cookie, as rendering would have.
+"""
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+
+from .catalog import get_catalog_version
+
+CSRF_PLACEHOLDER = b'__csrf_token__'
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def _timeout():
+    return getattr(settings, 'HOMEPAGE_CACHE_TIMEOUT', 10 * 60)
+
+
+def is_anonymous_request(request):
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+def page_cache_key(request):
+    # The query string is ignored: the cached pages do not read it, and
+    # tracking parameters would otherwise split the cache
+    manifest = getattr(staticfiles_storage, 'manifest_hash', '')
+    return f'page:{get_catalog_version()}:{manifest}:{request.path}'
+
+
+def cache_anonymous_page(view):
+    """Serve ``view``'s GET/HEAD responses for anonymous visitors from the cache"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        timeout = _timeout()
+        if not timeout or request.method not in ('GET', 'HEAD') or not is_anonymous_request(request):
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(
+                content.replace(CSRF_PLACEHOLDER, get_token(request).encode()), content_type=content_type,
+            )
+        else:
+            response = view(request, *args, **kwargs)
+            # Anything that set a cookie (a message, a session) is personal
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                content = CSRF_INPUT_RE.sub(rb'\g<1>' + CSRF_PLACEHOLDER + rb'\g<2>', response.content)
+                cache.set(key, (content, response['Content-Type']), timeout)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+    return wrapper
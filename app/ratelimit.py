@@ -0,0 +1,102 @@
+"""
+Sliding-window rate limiting on top of the cache backend.
+
+Each limiter keeps one counter per fixed window and estimates the sliding
+window as ``current + previous * (fraction of the previous window still
+inside it)``. That costs one cache read and one increment per check and
+needs no per-request timestamps. Like the catalog cache, limits are only
+shared between worker processes when CACHES points at a shared backend.
+The limiters guard the async login view, so they use the async cache API.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .backends import normalize_email
+
+
+class SlidingWindowRateLimiter:
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def _key(self, key, bucket):
+        digest = hashlib.sha256(str(key).encode()).hexdigest()[:32]
+        return f'ratelimit:{self.name}:{digest}:{bucket}'
+
+    async def _astate(self, key, now):
+        bucket = int(now // self.window)
+        counts = await cache.aget_many([self._key(key, bucket), self._key(key, bucket - 1)])
+        current = counts.get(self._key(key, bucket), 0)
+        previous = counts.get(self._key(key, bucket - 1), 0)
+        elapsed = (now % self.window) / self.window
+        return bucket, current + previous * (1 - elapsed)
+
+    async def ahit(self, key, now=None):
+        """
+        Count an attempt for ``key`` and return ``(allowed, retry_after)``.
+        Rejected attempts are not counted, so a blocked client gets back in
+        as soon as its earlier attempts slide out of the window.
+        """
+        now = time.time() if now is None else now
+        bucket, estimate = await self._astate(key, now)
+        if estimate >= self.limit:
+            retry_after = math.ceil(self.window - (now % self.window)) or 1
+            return False, retry_after
+        bucket_key = self._key(key, bucket)
+        # Two windows of TTL so the bucket is still there when it becomes "previous"
+        if not await cache.aadd(bucket_key, 1, timeout=self.window * 2):
+            try:
+                await cache.aincr(bucket_key)
+            except ValueError:
+                await cache.aset(bucket_key, 1, timeout=self.window * 2)
+        return True, 0
+
+    async def areset(self, key, now=None):
+        now = time.time() if now is None else now
+        bucket = int(now // self.window)
+        await cache.adelete_many([self._key(key, bucket), self._key(key, bucket - 1)])
+
+
+def login_limiters():
+    """(limiter, key function) pairs for login attempts, from LOGIN_RATE_LIMITS"""
+    limits = getattr(settings, 'LOGIN_RATE_LIMITS', {})
+    limiters = []
+    if 'ip' in limits:
+        limiters.append((SlidingWindowRateLimiter('login-ip', *limits['ip']), 'ip'))
+    if 'email' in limits:
+        limiters.append((SlidingWindowRateLimiter('login-email', *limits['email']), 'email'))
+    return limiters
+
+
+def _login_rate_keys(request, email):
+    return {
+        # REMOTE_ADDR is the proxy's address behind a load balancer; configure the
+        # proxy to set it (e.g. a trusted X-Forwarded-For middleware) in that case.
+        'ip': request.META.get('REMOTE_ADDR', ''),
+        'email': normalize_email(email),
+    }
+
+
+async def acheck_login_rate(request, email):
+    """
+    Count a login attempt against the per-IP and per-email limits.
+    Returns 0 if allowed, otherwise the number of seconds to wait.
+    """
+    keys = _login_rate_keys(request, email)
+    for limiter, kind in login_limiters():
+        allowed, retry_after = await limiter.ahit(keys[kind])
+        if not allowed:
+            return retry_after
+    return 0
+
+
+async def areset_login_rate(email):
+    """Forget failed attempts for an email after it logs in successfully"""
+    for limiter, kind in login_limiters():
+        if kind == 'email':
+            await limiter.areset(normalize_email(email))
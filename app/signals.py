@@ -0,0 +1,29 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import metrics
+from .catalog import invalidate_catalog
+from .models import DocumentBlob, LoanDocument, LoanProduct
+
+
+@receiver(post_save, sender=LoanProduct)
+@receiver(post_delete, sender=LoanProduct)
+def loan_product_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_delete, sender=LoanDocument)
+def loan_document_deleted(sender, instance, **kwargs):
+    for field in LoanDocument.BLOB_FIELDS:
+        name = getattr(instance, field).name
+        if name:
+            DocumentBlob.release(name)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    # Per connection rather than per request: under ASGI each thread the
+    # ORM runs in has its own connection
+    if metrics.record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.record_query)
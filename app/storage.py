@@ -0,0 +1,97 @@
+"""
+Content-addressed storage for loan documents.
+
+Files are stored under their SHA-256 digest in a sharded layout,
+
+    loan_documents/ab/cd/abcd...ef.pdf
+
+so identical scans uploaded with different applications share one file on
+disk. Reference counts live in the DocumentBlob model; the storage itself
+never deletes anything that is still referenced.
+
+A file is only deleted by DocumentBlob.release(), after its transaction
+commits and while holding the blob row's lock. save() takes the same lock
+before it trusts an existing file, so callers must save and take their
+reference (DocumentBlob.acquire) in one transaction: the lock then holds
+until the reference is visible and the pending delete sees it.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+PREFIX = 'loan_documents'
+HASHED_NAME_RE = re.compile(r'^' + PREFIX + r'/([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})(\.[a-z0-9]+)?$')
+EXTENSION_ALIASES = {'.jpeg': '.jpg'}
+
+
+def compute_content_hash(content):
+    """SHA-256 of a Django File, reusing the digest from the upload handler if present"""
+    content_hash = getattr(content, 'content_hash', None)
+    if content_hash:
+        return content_hash
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+def guess_content_type(name):
+    return mimetypes.guess_type(name or '')[0] or 'application/octet-stream'
+
+
+def hashed_name(content_hash, original_name):
+    ext = os.path.splitext(original_name or '')[1].lower()
+    ext = EXTENSION_ALIASES.get(ext, ext)
+    if not re.fullmatch(r'\.[a-z0-9]+', ext):
+        ext = ''
+    return f'{PREFIX}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{ext}'
+
+
+def hash_from_name(name):
+    """Return the digest encoded in a content-addressed name, or None for legacy names"""
+    match = HASHED_NAME_RE.match(name or '')
+    if match and match.group(3)[:2] == match.group(1) and match.group(3)[2:4] == match.group(2):
+        return match.group(3)
+    return None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by their content and skips duplicate writes"""
+
+    def __init__(self, **kwargs):
+        # Two writers racing on the same digest write identical bytes
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            from django.core.files import File
+            content = File(content, name)
+
+        name = hashed_name(compute_content_hash(content), name)
+        with transaction.atomic(savepoint=False):
+            # Waits out a delete in progress; held until the caller's
+            # transaction ends, so a later one sees the caller's reference
+            DocumentBlob = apps.get_model('app', 'DocumentBlob')
+            list(DocumentBlob.objects.select_for_update().filter(name=name).values_list('pk'))
+            if self.exists(name):
+                # Already stored: nothing to write
+                return name
+            return self._save(name, content)
+
+
+document_storage = ContentAddressedStorage()
+
+
+def get_document_storage():
+    return document_storage
@@ -0,0 +1,34 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(name, sizes='100vw', **attrs):
+    """
+    ``<img>`` for a static image, wrapped in a ``<picture>`` offering the
+    AVIF/WebP variants collectstatic made of it (app.assets). Falls back to
+    the plain image under DEBUG or with a storage that makes no variants.
+
+        {% responsive_image 'images/1.jpeg' sizes='60px' alt='Partner 1' class='partner__logo' %}
+    """
+    image = format_html('<img src="{}"{}>', static(name), flatatt(attrs))
+    image_variants = getattr(staticfiles_storage, 'image_variants', None)
+    if settings.DEBUG or image_variants is None:
+        return image
+    variants = image_variants(name)
+    if not variants:
+        return image
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (format, ', '.join(f'{staticfiles_storage.url(variant)} {width}w' for width, variant in widths), sizes)
+            for format, widths in variants.items()
+        ),
+    )
+    return format_html('<picture>{}{}</picture>', sources, image)
@@ -1,3 +1,1559 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import random
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+from pathlib import Path
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from PIL import Image, PngImagePlugin, features
+from PIL.ExifTags import Base as ExifBase
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .accounts import EmailAlreadyRegistered, acreate_user_with_profile
+from . import amortization
+from .assets import minify_css, minify_js, serve_static
+from .admin import LoanProductAdmin
+from .amortization import max_principal, quote, quote_batch, schedule
+from .eligibility import assess
+from .catalog import VERSION_KEY, bump_catalog_version, get_active_products, get_catalog_version
+from .emails import document_download_token, process_outbox
+from .ids import CLOCK_SKEW, ApplicationIdGenerator, NodeAllocator, generate_application_id
+from .images import claim_pending_documents, normalize_image, process_pending_documents
+from .management.commands.import_loan_products import FIELDS as PRODUCT_FIELDS
+from .metrics import registry
+from .middleware import PerformanceMiddleware
+from .views import get_loan_products_api, login_view, signup_view
+from .pagecache import CSRF_PLACEHOLDER
+from .ratelimit import SlidingWindowRateLimiter
+from .storage import get_document_storage
+from .models import *
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# The signup tests run the async helper from plain (and pool) threads
+create_user_with_profile = async_to_sync(acreate_user_with_profile)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class LoanSubmissionTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = LoanProduct.objects.create(
+            name='Quick Cash',
+            category='Personal Loan',
+            min_loan_amount=10000,
+            max_loan_amount=500000,
+        )
+        cls.user = User.objects.create_user(
+            username='rahul', email='rahul@example.com', password='s3cret-pass',
+            first_name='Rahul', last_name='Sharma',
+        )
+        cls.profile = UserProfile.objects.create(user=cls.user, phone_number='9876543210')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post_application(self, **overrides):
+        data = {
+            'firstName': 'Rahul',
+            'lastName': 'Sharma',
+            'email': 'rahul@example.com',
+            'phone': '9876543210',
+            'loanType': self.product.id,
+            'requestedAmount': '50000',
+            'income': '600000',
+            'purpose': 'Home renovation',
+            'aadharCard': SimpleUploadedFile('aadhar.pdf', b'%PDF-1.4 aadhar', content_type='application/pdf'),
+            'panCard': SimpleUploadedFile('pan.pdf', b'%PDF-1.4 pan', content_type='application/pdf'),
+        }
+        data.update(overrides)
+        return self.client.post(reverse('submit_loan_application'), data)
+
+
+class EmailOutboxTests(LoanSubmissionTestCase):
+    def test_submission_queues_email_without_sending(self):
+        response = self.post_application()
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(len(mail.outbox), 0)
+        entry = EmailOutbox.objects.get()
+        self.assertEqual(entry.status, 'pending')
+        self.assertEqual(entry.recipient, 'rahul@example.com')
+
+    def test_worker_sends_queued_emails_with_attachments(self):
+        self.post_application()
+        self.post_application(email='priya@example.com')
+
+        self.assertEqual(process_outbox(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(len(mail.outbox[0].attachments), 2)
+        self.assertFalse(EmailOutbox.objects.exclude(status='sent').exists())
+        self.assertEqual(process_outbox(), (0, 0))
+
+    @override_settings(EMAIL_ATTACHMENT_BUDGET=12)
+    def test_attachments_over_budget_become_links(self):
+        # pan.pdf (12 bytes) fits the budget, aadhar.pdf (15 bytes) does not
+        self.post_application()
+        process_outbox()
+        message = mail.outbox[0]
+        self.assertEqual([name for name, _, _ in message.attachments], ['pan.pdf'])
+        url = re.search(r'Download \(valid for 7 days\): (\S+)', message.body).group(1)
+        self.assertTrue(url.startswith('http://localhost:8000/documents/'))
+        self.assertIn(url, message.alternatives[0][0])
+
+        response = self.client.get(url.removeprefix('http://localhost:8000'))
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 aadhar')
+        self.assertIn('filename="aadhar.pdf"', response['Content-Disposition'])
+        self.assertIn('no-store', response['Cache-Control'])
+
+    @override_settings(EMAIL_ATTACHMENT_MODE='links')
+    def test_links_only_mode_reads_no_files(self):
+        self.post_application()
+        with mock.patch('django.db.models.fields.files.FieldFile.open') as open_file:
+            process_outbox()
+        open_file.assert_not_called()
+        self.assertEqual(mail.outbox[0].attachments, [])
+        self.assertEqual(mail.outbox[0].body.count('/documents/'), 2)
+
+    def test_download_links_expire_and_cannot_be_forged(self):
+        self.post_application()
+        token = document_download_token(LoanDocument.objects.first())
+        self.assertEqual(self.client.get(reverse('document_download', args=[token])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('document_download', args=[token[:-1] + 'x'])).status_code, 404)
+        with override_settings(EMAIL_DOCUMENT_LINK_MAX_AGE=-1):
+            self.assertEqual(self.client.get(reverse('document_download', args=[token])).status_code, 404)
+
+    def test_failed_send_reopens_the_connection(self):
+        for email in ('rahul@example.com', 'priya@example.com', 'amit@example.com'):
+            self.post_application(email=email)
+        connection = mock.Mock()
+        # A dropped connection, a delivery, then a message the backend skipped
+        connection.send_messages.side_effect = [OSError('reset'), 1, 0]
+
+        self.assertEqual(process_outbox(connection=connection), (1, 2))
+        self.assertEqual(connection.open.call_count, 2)
+        self.assertEqual(connection.close.call_count, 1)
+        statuses = dict(EmailOutbox.objects.values_list('recipient', 'status'))
+        self.assertEqual(statuses, {
+            'rahul@example.com': 'pending', 'priya@example.com': 'sent', 'amit@example.com': 'pending',
+        })
+        self.assertEqual(
+            EmailOutbox.objects.get(recipient='amit@example.com').last_error,
+            'The mail backend did not send the message',
+        )
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_send_backs_off_then_gives_up(self):
+        self.post_application()
+        entry = EmailOutbox.objects.get()
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            self.assertEqual(process_outbox(), (0, 1))
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, 'pending')
+            self.assertEqual(entry.attempts, 1)
+            self.assertGreater(entry.next_attempt_at, timezone.now())
+
+            # Not due yet, so nothing is picked up
+            self.assertEqual(process_outbox(), (0, 0))
+
+            EmailOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(process_outbox(), (0, 1))
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'failed')
+        self.assertEqual(entry.last_error, 'down')
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = LoanProduct.objects.create(name='Quick Cash', category='Personal Loan')
+        self.hidden = LoanProduct.objects.create(name='Legacy', category='Personal Loan', is_active=False)
+
+    def test_warm_hits_run_no_queries(self):
+        self.client.get(reverse('indexpage'))
+        self.client.get(reverse('loan_products_api'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('indexpage'))
+        self.assertContains(response, 'Quick Cash')
+        self.assertNotContains(response, 'Legacy')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('loan_products_api'))
+        self.assertEqual([p['id'] for p in response.json()['loans']], [self.product.pk])
+
+    def test_api_answers_conditional_requests(self):
+        response = self.client.get(reverse('loan_products_api'))
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(reverse('loan_products_api'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_save_and_delete_invalidate(self):
+        etag = self.client.get(reverse('loan_products_api'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Quick Cash Plus'
+            self.product.save()
+        response = self.client.get(reverse('loan_products_api'))
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['loans'][0]['name'], 'Quick Cash Plus')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(self.client.get(reverse('loan_products_api')).json()['loans'], [])
+
+    def test_evicted_version_does_not_revive_old_entries(self):
+        self.assertEqual([p.name for p in get_active_products()], ['Quick Cash'])
+        # A change whose bump is lost along with the evicted version key
+        LoanProduct.objects.filter(pk=self.product.pk).update(name='Quick Cash Plus')
+        cache.delete(VERSION_KEY)
+        self.assertEqual([p.name for p in get_active_products()], ['Quick Cash Plus'])
+
+        cache.delete(VERSION_KEY)
+        version = get_catalog_version()
+        cache.delete(VERSION_KEY)
+        bump_catalog_version()
+        self.assertGreater(get_catalog_version(), version)
+
+    def test_admin_bulk_actions_invalidate(self):
+        self.client.get(reverse('indexpage'))
+        model_admin = LoanProductAdmin(LoanProduct, site)
+        request = RequestFactory().post('/')
+        with mock.patch.object(model_admin, 'message_user'), self.captureOnCommitCallbacks(execute=True):
+            model_admin.activate_products(request, LoanProduct.objects.filter(pk=self.hidden.pk))
+        response = self.client.get(reverse('indexpage'))
+        self.assertEqual(len(response.context['loan']), 2)
+
+    def test_timeouts_are_short_without_a_shared_cache(self):
+        # A bump only reaches the worker that made it when each has its own cache
+        local = load_settings()
+        self.assertFalse(local.SHARED_CACHE)
+        for name in ('LOAN_CATALOG_CACHE_TIMEOUT', 'LOAN_CARDS_CACHE_TIMEOUT', 'HOMEPAGE_CACHE_TIMEOUT'):
+            self.assertLessEqual(getattr(local, name), 60, name)
+        redis = load_settings(REDIS_URL='redis://cache:6379/0')
+        self.assertEqual(redis.LOAN_CATALOG_CACHE_TIMEOUT, 60 * 60 * 24)
+        self.assertEqual(redis.HOMEPAGE_CACHE_TIMEOUT, 10 * 60)
+
+
+class HomepageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = LoanProduct.objects.create(name='Quick Cash', category='Personal Loan')
+        self.user = User.objects.create_user(username='rahul', email='rahul@example.com', password='s3cret-pass')
+        UserProfile.objects.create(user=self.user)
+
+    def test_anonymous_page_served_from_cache(self):
+        client = Client(enforce_csrf_checks=True)
+        first = client.get(reverse('indexpage'))
+        self.assertTemplateUsed(first, 'index.html')
+        self.assertIn('Cookie', first['Vary'])
+
+        client.cookies.clear()
+        with self.assertNumQueries(0):
+            second = client.get(reverse('indexpage'), {'utm_source': 'ad'})
+        self.assertEqual(second.templates, [])
+        self.assertIn('Cookie', second['Vary'])
+        self.assertContains(second, 'Quick Cash')
+        self.assertNotContains(second, CSRF_PLACEHOLDER.decode())
+
+        # The token swapped into the cached page matches the cookie set with it
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', second.content.decode())[1]
+        self.assertIn('csrftoken', second.cookies)
+        self.assertEqual(client.post(reverse('indexpage'), {'csrfmiddlewaretoken': token}).status_code, 200)
+
+    def test_catalog_change_invalidates_page(self):
+        self.client.get(reverse('indexpage'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Quick Cash Plus'
+            self.product.save()
+        self.assertContains(self.client.get(reverse('indexpage')), 'Quick Cash Plus')
+
+    def test_logged_in_pages_are_rendered(self):
+        anonymous = self.client.get(reverse('indexpage'))
+        self.assertContains(anonymous, 'To Apply Login First')
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.get(reverse('indexpage'))
+            self.assertTemplateUsed(response, 'index.html')
+            self.assertContains(response, 'Logged in as:')
+            # The cached loan cards fragment is kept apart per login state
+            self.assertContains(response, 'Apply Now')
+            self.assertNotContains(response, 'To Apply Login First')
+
+    @override_settings(HOMEPAGE_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        self.client.get(reverse('indexpage'))
+        self.assertTemplateUsed(self.client.get(reverse('indexpage')), 'index.html')
+
+
+class LoanProductDisplayFieldsTests(TestCase):
+    def test_display_fields_computed_on_save(self):
+        product = LoanProduct.objects.create(
+            name='Home Loan', category='Home Loan',
+            min_loan_amount=500000, max_loan_amount=7500000,
+            min_interest_rate=8.5, max_interest_rate=8.5,
+            min_tenure=60, max_tenure=240,
+            features="✓ Low rates\n\n  ✓ Long tenure  ",
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.display_amount_range, '₹500K - ₹7.5M')
+        self.assertEqual(product.display_interest_rate, '8.50%')
+        self.assertEqual(product.display_tenure_range, '5-20 years')
+        self.assertEqual(product.get_features_list(), ['✓ Low rates', '✓ Long tenure'])
+
+        product.max_interest_rate = 11
+        product.save(update_fields=['max_interest_rate'])
+        product.refresh_from_db()
+        self.assertEqual(product.interest_rate_display(), '8.50% - 11.00%')
+
+    def test_backfill_command(self):
+        product = LoanProduct.objects.create(name='Quick Cash', category='Personal Loan')
+        LoanProduct.objects.update(display_amount_range='', features_list=[])
+        call_command('backfill_loan_product_display', stdout=StringIO())
+        product.refresh_from_db()
+        self.assertEqual(product.display_amount_range, '₹1K - ₹50K')
+        self.assertEqual(len(product.features_list), 3)
+
+    def test_migration_backfills_existing_products(self):
+        migration = importlib.import_module('app.migrations.0003_loanproduct_display_fields')
+        products = [
+            LoanProduct.objects.create(name='Quick Cash', category='Personal Loan'),
+            LoanProduct.objects.create(
+                name='Home Loan', category='Home Loan', min_loan_amount=500000, max_loan_amount=7500000,
+                min_interest_rate=8.5, max_interest_rate=8.5, min_tenure=12, max_tenure=12,
+                features="✓ Low rates\n\n  ✓ Long tenure  ",
+            ),
+        ]
+        # Rows as they were before the columns existed
+        LoanProduct.objects.update(
+            display_interest_rate='', display_amount_range='', display_tenure_range='', features_list=[],
+        )
+        migration.backfill_display_fields(django_apps, None)
+        # The frozen copy renders what the model does
+        for product in products:
+            stored = LoanProduct.objects.values(*LoanProduct.DISPLAY_FIELDS).get(pk=product.pk)
+            self.assertEqual(stored, {field: getattr(product, field) for field in LoanProduct.DISPLAY_FIELDS})
+
+
+class ApplicationIdTests(TestCase):
+    def test_ids_are_unique_and_increasing(self):
+        generator = ApplicationIdGenerator(node=3, clock=lambda: 1767225600000)
+        ids = [generator.next_id() for _ in range(10000)]  # overflows the per-ms sequence
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertTrue(all(len(i) == 20 and i.startswith('LA') for i in ids))
+
+    def test_clock_going_backwards_keeps_order(self):
+        ticks = iter([1767225600500, 1767225600000, 1767225600900])
+        generator = ApplicationIdGenerator(node=0, clock=lambda: next(ticks))
+        ids = [generator.next_id() for _ in range(3)]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_nodes_never_collide(self):
+        clock = lambda: 1767225600000
+        a = ApplicationIdGenerator(node=1, clock=clock).next_id()
+        b = ApplicationIdGenerator(node=2, clock=clock).next_id()
+        self.assertNotEqual(a, b)
+        with self.assertRaises(ValueError):
+            ApplicationIdGenerator(node=64)
+
+
+class ApplicationIdNodeLeaseTests(TransactionTestCase):
+    def test_processes_lease_distinct_nodes(self):
+        first, second = NodeAllocator(), NodeAllocator()
+        self.assertNotEqual(first.node(), second.node())
+        # Leases taken outside a transaction count at once, so no more queries
+        with self.assertNumQueries(0):
+            self.assertEqual(first.node(), first.node())
+
+    def test_forked_process_leases_its_own_node(self):
+        allocator = NodeAllocator()
+        parent = allocator.node()
+        with mock.patch('app.ids.os.getpid', return_value=os.getpid() + 1):
+            self.assertNotEqual(allocator.node(), parent)
+
+    def test_lapsed_lease_is_taken_over(self):
+        allocator = NodeAllocator()
+        node = allocator.node()
+        ApplicationIdNode.objects.filter(node=node).update(expires_at=timezone.now() - CLOCK_SKEW * 2)
+        self.assertEqual(NodeAllocator().node(), node)
+        # Its former holder sees the lease lapse and moves on
+        allocator.lease.expires_at = timezone.now()
+        self.assertNotEqual(allocator.node(), node)
+
+    def test_rolled_back_lease_is_not_kept(self):
+        allocator = NodeAllocator()
+        with transaction.atomic():
+            node = allocator.node()
+            self.assertEqual(allocator.node(), node)  # usable inside the transaction that took it
+            transaction.set_rollback(True)
+        self.assertIsNone(allocator.lease)
+        self.assertFalse(ApplicationIdNode.objects.exclude(owner='').exists())
+        allocator.node()
+        self.assertEqual(ApplicationIdNode.objects.get(owner=allocator.owner).node, allocator.lease.node)
+
+    def test_lease_renewed_in_second_half(self):
+        allocator = NodeAllocator()
+        node = allocator.node()
+        allocator.lease.expires_at = timezone.now() + timedelta(seconds=60)
+        self.assertEqual(allocator.node(), node)
+        self.assertGreater(allocator.lease.expires_at, timezone.now() + timedelta(seconds=200))
+
+    def test_all_nodes_leased(self):
+        for _ in range(64):
+            NodeAllocator().node()
+        with self.assertRaisesMessage(RuntimeError, 'All 64 application ID nodes are leased'):
+            NodeAllocator().node()
+
+
+class StreamingUploadTests(LoanSubmissionTestCase):
+    def test_documents_are_hashed_while_streaming(self):
+        response = self.post_application()
+        self.assertTrue(response.json()['success'])
+        request = response.wsgi_request
+        self.assertEqual(
+            request.FILES['aadharCard'].content_hash,
+            hashlib.sha256(b'%PDF-1.4 aadhar').hexdigest(),
+        )
+
+    def test_bad_magic_bytes_rejected(self):
+        response = self.post_application(
+            panCard=SimpleUploadedFile('pan.pdf', b'MZ\x90\x00 not a pdf', content_type='application/pdf'),
+        )
+        self.assertEqual(response.json(), {
+            'success': False, 'error': 'File pan.pdf has invalid format. Allowed: PDF, JPG, PNG',
+        })
+        self.assertFalse(LoanApplication.objects.exists())
+
+    @override_settings(LOAN_DOCUMENT_MAX_SIZE=1024 * 1024)
+    def test_oversize_file_aborts_upload(self):
+        big = SimpleUploadedFile('scan.png', b'\x89PNG\r\n\x1a\n' + b'\0' * (2 * 1024 * 1024))
+        response = self.post_application(aadharCard=big)
+        self.assertEqual(response.json()['error'], 'File scan.png is too large. Maximum size is 1MB.')
+        self.assertFalse(LoanApplication.objects.exists())
+
+
+class ContentAddressedStorageTests(LoanSubmissionTestCase):
+    def test_identical_uploads_share_one_file(self):
+        self.post_application()
+        self.post_application()
+        names = set(LoanDocument.objects.values_list('document_file', flat=True))
+        self.assertEqual(len(names), 2)  # aadhar + pan, each stored once
+        for name in names:
+            self.assertRegex(name, r'^loan_documents/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+            self.assertEqual(DocumentBlob.objects.get(name=name).ref_count, 2)
+
+        first, second = LoanApplication.objects.all()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        for name in names:
+            self.assertTrue(get_document_storage().exists(name))
+            self.assertEqual(DocumentBlob.objects.get(name=name).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        for name in names:
+            self.assertFalse(get_document_storage().exists(name))
+        self.assertFalse(DocumentBlob.objects.exists())
+
+    def test_upload_during_pending_delete_keeps_file(self):
+        self.post_application()
+        application = LoanApplication.objects.get()
+        document = application.documents.get(document_type='pan_card')
+        name = document.document_file.name
+        with document.document_file.open('rb') as f:
+            data = f.read()
+        with self.captureOnCommitCallbacks() as callbacks:
+            document.delete()
+        # The last reference is gone but the file delete has not run yet when
+        # the same scan is uploaded again and its stored copy is reused
+        again = LoanDocument.objects.create(
+            application=application, document_type='pan_card', original_filename='pan.pdf',
+            document_file=ContentFile(data, name='pan.pdf'),
+        )
+        self.assertEqual(again.document_file.name, name)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(get_document_storage().exists(name))
+        self.assertEqual(DocumentBlob.objects.get(name=name).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            again.delete()
+        self.assertFalse(get_document_storage().exists(name))
+        self.assertFalse(DocumentBlob.objects.filter(name=name).exists())
+
+    def test_migrate_command_deduplicates_legacy_files(self):
+        self.post_application()
+        application = LoanApplication.objects.get()
+        legacy = []
+        for i in range(3):
+            name = default_storage.save(f'loan_documents/legacy_{i}.pdf', ContentFile(b'%PDF-1.4 same scan'))
+            legacy.append(name)
+            LoanDocument.objects.filter(pk=LoanDocument.objects.create(
+                application=application, document_type='other',
+                document_file=ContentFile(b'%PDF-1.4 placeholder', name='x.pdf'), original_filename='x.pdf',
+            ).pk).update(document_file=name)
+
+        out = StringIO()
+        call_command('migrate_documents_to_cas', stdout=out)
+        self.assertIn('Migrated 3 documents', out.getvalue())
+        self.assertIn(f'{2 * len(b"%PDF-1.4 same scan")} bytes reclaimed', out.getvalue())
+        for name in legacy:
+            self.assertFalse(default_storage.exists(name))
+        migrated = LoanDocument.objects.filter(document_type='other').values_list('document_file', flat=True)
+        self.assertEqual(len(set(migrated)), 1)
+        self.assertEqual(DocumentBlob.objects.get(name=migrated[0]).ref_count, 3)
+
+
+class SubmissionPipelineTests(LoanSubmissionTestCase):
+    def test_rejected_submission_writes_nothing(self):
+        files_before = sorted(p.name for p in Path(MEDIA_ROOT).rglob('*') if p.is_file())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_application(panCard='')
+        self.assertTrue(all(q['sql'].startswith('SELECT') for q in queries.captured_queries))
+        self.assertEqual(response.json()['error'], 'Missing mandatory documents: PAN Card')
+        self.assertFalse(LoanApplication.objects.exists())
+        self.assertEqual(sorted(p.name for p in Path(MEDIA_ROOT).rglob('*') if p.is_file()), files_before)
+
+    def test_business_loans_need_udyam_certificate(self):
+        self.product.category = 'Business Loan'
+        self.product.save()
+        response = self.post_application()
+        self.assertEqual(response.json()['error'], 'Missing mandatory documents: Udyam Registration Certificate')
+
+    def test_amount_limits_checked_before_writing(self):
+        response = self.post_application(requestedAmount='900000')
+        self.assertFalse(response.json()['success'])
+        response = self.post_application(requestedAmount='lots')
+        self.assertEqual(response.json()['error'], 'Please enter a valid loan amount and annual income')
+        self.assertFalse(LoanApplication.objects.exists())
+
+    def test_documents_written_in_one_insert(self):
+        response = self.post_application(
+            incomeProof=SimpleUploadedFile('salary.png', b'\x89PNG\r\n\x1a\nslip'),
+        )
+        self.assertEqual(response.json()['documents_uploaded'], 3)
+        application = LoanApplication.objects.get()
+        self.assertEqual(
+            set(application.documents.values_list('document_type', 'is_mandatory')),
+            {('aadhar_card', True), ('pan_card', True), ('income_proof', False)},
+        )
+        self.assertEqual(EmailOutbox.objects.get().application, application)
+
+
+class ProfileResolutionTests(LoanSubmissionTestCase):
+    def test_logged_in_submission_query_count(self):
+        # Reads: session, user+profile, product.
+        # Write transaction (savepoint pair): application, a blob row lock per
+        # file, documents, blobs (insert + ref update in their own savepoint
+        # pair), outbox entry. The process's ID node lease is a one-off.
+        generate_application_id()
+        with self.assertNumQueries(14):
+            response = self.post_application(firstName='', lastName='', email='', phone='')
+        self.assertTrue(response.json()['success'])
+        application = LoanApplication.objects.get()
+        self.assertEqual(
+            (application.first_name, application.email, application.phone),
+            ('Rahul', 'rahul@example.com', '9876543210'),
+        )
+
+    def test_profile_created_on_first_submission(self):
+        self.profile.delete()
+        response = self.post_application()
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(UserProfile.objects.get(user=self.user).phone_number, '9876543210')
+
+
+SETTINGS_ENVIRONMENT = (
+    'REDIS_URL', 'SESSION_CACHE_DIR', 'SESSION_BACKEND',
+    'LOAN_CATALOG_CACHE_TIMEOUT', 'LOAN_CARDS_CACHE_TIMEOUT', 'HOMEPAGE_CACHE_TIMEOUT', 'METRICS_ALLOWED_IPS',
+)
+
+
+def load_settings(**env):
+    """A fresh copy of magenn/settings.py evaluated under ``env``"""
+    environ = {k: v for k, v in os.environ.items() if k not in SETTINGS_ENVIRONMENT}
+    spec = importlib.util.spec_from_file_location('settings_probe', Path(settings.BASE_DIR, 'magenn', 'settings.py'))
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(os.environ, {**environ, **env}, clear=True):
+        spec.loader.exec_module(module)
+    return module
+
+
+class SessionEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='rahul', email='rahul@example.com', password='s3cret-pass')
+        UserProfile.objects.create(user=self.user)
+        get_active_products()  # warm the catalog so only session/auth queries remain
+
+    def homepage_queries(self, engine):
+        with self.settings(SESSION_ENGINE=engine):
+            # A fresh client: SessionMiddleware binds the engine when it is built
+            client = Client()
+            client.force_login(self.user)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(reverse('indexpage')).status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_logged_in_homepage_query_counts(self):
+        db = self.homepage_queries('django.contrib.sessions.backends.db')
+        # session row + user (with profile)
+        self.assertEqual(len(db), 2)
+        self.assertIn('django_session', db[0])
+        for engine in ('cached_db', 'cache', 'signed_cookies'):
+            queries = self.homepage_queries(f'django.contrib.sessions.backends.{engine}')
+            self.assertEqual(len(queries), 1, engine)
+            self.assertNotIn('django_session', queries[0])
+
+    def test_default_engine_needs_a_shared_cache(self):
+        # A per-process cache would keep serving a logged-out session in other workers
+        self.assertEqual(load_settings().SESSION_ENGINE, 'django.contrib.sessions.backends.db')
+        shared = load_settings(SESSION_CACHE_DIR=self.id())
+        self.assertEqual(shared.SESSION_ENGINE, 'django.contrib.sessions.backends.cached_db')
+
+    def test_sessions_get_their_own_redis_database(self):
+        # clear() on the default cache is FLUSHDB
+        redis = load_settings(REDIS_URL='redis://cache:6379/2')
+        self.assertEqual(redis.SESSION_ENGINE, 'django.contrib.sessions.backends.cached_db')
+        self.assertEqual(redis.CACHES['sessions']['LOCATION'], 'redis://cache:6379/3')
+        with self.assertRaises(ImproperlyConfigured):
+            load_settings(REDIS_URL='redis://cache:6379/2', REDIS_SESSION_DB='2')
+
+    def test_purge_expired_sessions(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1)) for i in range(7)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        out = StringIO()
+        call_command('purge_expired_sessions', batch_size=3, stdout=out)
+        self.assertIn('Purged 7 expired sessions', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])  # the test client's address
+class PerformanceMiddlewareTests(LoanSubmissionTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        registry.clear()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('indexpage'))
+        timings = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timings), {'app', 'db', 'tpl'})
+        # session + user lookup + catalog
+        self.assertIn('desc="3 queries"', timings['db'])
+        self.assertGreater(float(timings['tpl'].split('=')[1]), 0)
+
+    def test_server_timing_is_restricted(self):
+        self.client.logout()
+        response = self.client.get(reverse('indexpage'), REMOTE_ADDR='203.0.113.9')
+        self.assertNotIn('Server-Timing', response)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('indexpage'), REMOTE_ADDR='203.0.113.9')
+        self.assertIn('Server-Timing', response)
+
+    def test_prometheus_endpoint(self):
+        self.post_application()
+        self.client.get(reverse('indexpage'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('magenn_requests_total{view="submit_loan_application",method="POST",status="200"} 1', body)
+        self.assertIn('magenn_request_duration_seconds_count{view="indexpage"} 1', body)
+        upload = next(line for line in body.splitlines()
+                      if line.startswith('magenn_upload_bytes_total{view="submit_loan_application"}'))
+        self.assertGreater(int(upload.split()[-1]), 0)
+
+    def test_metrics_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.9').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.9').status_code, 200)
+
+    def test_no_address_is_allowed_by_default(self):
+        # Behind a local reverse proxy every visitor would come from loopback
+        self.assertEqual(load_settings().METRICS_ALLOWED_IPS, [])
+        self.assertEqual(load_settings(METRICS_ALLOWED_IPS='10.0.0.5, ::1').METRICS_ALLOWED_IPS, ['10.0.0.5', '::1'])
+        self.client.logout()
+        with self.settings(METRICS_ALLOWED_IPS=[]):
+            response = self.client.get(reverse('indexpage'))
+            self.assertNotIn('Server-Timing', response)
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs('app.performance', 'WARNING') as logs:
+            self.post_application()
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['event'], record['view'], record['status']), ('slow_request', 'submit_loan_application', 200))
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['upload_bytes'], 0)
+
+
+class AmortizationTests(TestCase):
+    def test_quote(self):
+        result = quote(100000, 10, 12)
+        self.assertEqual(
+            (result.emi, result.total_payment, result.total_interest),
+            (Decimal('8791.59'), Decimal('105499.08'), Decimal('5499.08')),
+        )
+        interest_free = quote(100000, 0, 7)
+        self.assertEqual((interest_free.emi, interest_free.total_interest), (Decimal('14285.71'), Decimal('0.00')))
+
+    def test_schedule_closes_at_zero(self):
+        rows = schedule('250000', '11.25', 36)
+        self.assertEqual(len(rows), 36)
+        self.assertEqual(rows[-1]['balance'], '0.00')
+        self.assertEqual(sum(Decimal(row['principal']) for row in rows), Decimal('250000.00'))
+        self.assertEqual({row['payment'] for row in rows[:-1]}, {str(quote('250000', '11.25', 36).emi)})
+
+    def test_repeated_quotes_are_memoized(self):
+        amortization._cached_quote.cache_clear()
+        quote(500000, '10.5', 60)
+        quote('500000.00', 10.5, 60)
+        self.assertEqual(amortization._cached_quote.cache_info().hits, 1)
+
+    def test_batch_matches_single_quotes(self):
+        rng = random.Random(3)
+        triples = [
+            (Decimal(rng.randrange(1000000, 500000000)) / 100, Decimal(rng.randrange(0, 3000)) / 100, rng.randrange(1, 361))
+            for _ in range(500)
+        ]
+        batch = quote_batch(*zip(*triples))
+        self.assertEqual(batch, [amortization._cached_quote(*amortization.normalize(*t)) for t in triples])
+
+    @skipIf(importlib.util.find_spec('numpy') is None, "numpy is not installed")
+    def test_vectorized_batch_uses_numpy(self):
+        amortization._cached_quote.cache_clear()
+        quote_batch([100000] * 100, [10] * 100, range(1, 101))
+        self.assertEqual(amortization._cached_quote.cache_info().misses, 0)
+
+
+class LoanQuotesApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = LoanProduct.objects.create(
+            name='Quick Cash', category='Personal Loan',
+            min_loan_amount=10000, max_loan_amount=500000,
+            min_interest_rate=Decimal('10.50'), max_interest_rate=Decimal('18.00'),
+            min_tenure=6, max_tenure=60,
+        )
+
+    def post(self, body, product_id=None):
+        return self.client.post(
+            reverse('loan_quotes_api', args=[product_id or self.product.pk]),
+            json.dumps(body), content_type='application/json',
+        )
+
+    def test_quotes_default_to_the_product_rate_range(self):
+        response = self.post({'quotes': [{'amount': 100000, 'tenure': 12}, {'amount': '50000', 'tenure': 24, 'interest_rate': '12'}]})
+        results = response.json()['results']
+        self.assertEqual([q['interest_rate'] for q in results[0]['quotes']], ['10.50', '18.00'])
+        self.assertEqual(results[0]['quotes'][0]['emi'], str(quote(100000, '10.5', 12).emi))
+        self.assertEqual(len(results[1]['quotes']), 1)
+        self.assertNotIn('schedule', results[1]['quotes'][0])
+
+    def test_schedule(self):
+        response = self.post({'quotes': [{'amount': 100000, 'tenure': 12, 'interest_rate': 12}], 'schedule': True})
+        rows = response.json()['results'][0]['quotes'][0]['schedule']
+        self.assertEqual((len(rows), rows[-1]['balance']), (12, '0.00'))
+
+    def test_requests_outside_the_product_ranges(self):
+        for item, message in (
+            ({'amount': 5000, 'tenure': 12}, 'Amount must be between'),
+            ({'amount': 100000, 'tenure': 120}, 'Tenure must be between'),
+            ({'amount': 100000, 'tenure': 12, 'interest_rate': 9}, 'Interest rate must be between'),
+            ({'amount': 'lots', 'tenure': 12}, 'Each quote needs'),
+        ):
+            response = self.post({'quotes': [{'amount': 100000, 'tenure': 12}, item]})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(f'Quote 2: {message}', response.json()['error'])
+        for raw in ('{"amount": 100000, "tenure": 1e999}', '{"amount": 1e999, "tenure": 12}', '{"amount": 100000, "tenure": NaN}'):
+            response = self.client.post(
+                reverse('loan_quotes_api', args=[self.product.pk]), '{"quotes": [%s]}' % raw,
+                content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 400, raw)
+            self.assertIn('Quote 1: Each quote needs', response.json()['error'])
+        self.assertEqual(self.post({'quotes': []}).status_code, 400)
+        self.assertEqual(self.post({'quotes': [{'amount': 100000, 'tenure': 12}]}, product_id=999).status_code, 404)
+
+
+class EligibilityTests(LoanSubmissionTestCase):
+    def setUp(self):
+        super().setUp()
+        # 10-18% over at most 60 months; an income of 6 lakh allows a 25,000 EMI
+        self.product.min_interest_rate, self.product.max_interest_rate = Decimal('10'), Decimal('18')
+        self.product.max_loan_amount = 5000000
+        self.product.save()
+        self.best = max_principal(25000, 10, 60)
+        self.worst = max_principal(25000, 18, 60)
+
+    def test_scores(self):
+        self.assertEqual(assess(self.product, 600000, self.worst), (100, self.best, Decimal('25000.00')))
+        self.assertEqual(assess(self.product, 600000, self.best).score, 50)
+        middle = assess(self.product, 600000, (self.best + self.worst) / 2)
+        self.assertTrue(middle.eligible)
+        self.assertEqual(middle.score, 74)
+        too_much = assess(self.product, 600000, self.best * 2)
+        self.assertEqual((too_much.score, too_much.eligible), (25, False))
+        self.assertEqual(assess(self.product, 0, 10000).score, 0)
+
+    def test_submission_stores_score(self):
+        self.assertTrue(self.post_application(requestedAmount='1000000').json()['success'])
+        application = LoanApplication.objects.get()
+        self.assertEqual(application.eligibility_score, assess(self.product, 600000, 1000000).score)
+        self.assertEqual(application.max_eligible_amount, self.best)
+
+    def test_ineligible_submission_is_refused(self):
+        response = self.post_application(requestedAmount='2000000', income='120000')
+        self.assertFalse(response.json()['success'])
+        self.assertIn('you can borrow up to', response.json()['error'])
+        self.assertFalse(LoanApplication.objects.exists())
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    @override_settings(ELIGIBILITY_REJECT_INELIGIBLE=False)
+    def test_ineligible_submission_can_be_kept(self):
+        self.assertTrue(self.post_application(requestedAmount='2000000', income='120000').json()['success'])
+        self.assertLess(LoanApplication.objects.get().eligibility_score, 50)
+
+    def test_bulk_rescoring(self):
+        for amount in ('100000', '1000000', '1100000'):
+            self.post_application(requestedAmount=amount)
+        LoanApplication.objects.filter(requested_amount=100000).update(eligibility_score=None, max_eligible_amount=None)
+
+        out = StringIO()
+        call_command('score_loan_applications', only_missing=True, batch_size=2, stdout=out)
+        self.assertIn('Scored 1 rows', out.getvalue())
+        self.assertIn('1 changed', out.getvalue())
+
+        updated_at = dict(LoanApplication.objects.values_list('pk', 'updated_at'))
+        with self.settings(ELIGIBILITY_MAX_EMI_RATIO='0.25'):
+            call_command('score_loan_applications', batch_size=2, stdout=out)
+        self.assertIn('Scored 3 rows', out.getvalue())
+        for application in LoanApplication.objects.all():
+            expected = assess(self.product, application.annual_income, application.requested_amount, ratio=Decimal('0.25'))
+            self.assertEqual((application.eligibility_score, application.max_eligible_amount), expected[:2])
+            self.assertEqual(application.updated_at, updated_at[application.pk])
+
+
+class BulkImportExportTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        user = User.objects.create_user(username='priya', email='priya@example.com', first_name='Priya', last_name='Nair')
+        UserProfile.objects.create(user=user, phone_number='9000000000')
+
+    def test_invalid_product_value_names_the_row(self):
+        products_csv = Path(self.dir, 'products.csv')
+        products_csv.write_text('name,category,min_tenure\nGold Loan,Personal Loan,12\nShop Loan,Business Loan,two\n')
+        with self.assertRaisesMessage(CommandError, 'Row 2: min_tenure'):
+            call_command('import_loan_products', str(products_csv), stdout=StringIO())
+
+    def test_products_then_applications_round_trip(self):
+        products_csv = Path(self.dir, 'products.csv')
+        products_csv.write_text(
+            'name,category,min_loan_amount,max_loan_amount,min_interest_rate,max_interest_rate,'
+            'min_tenure,max_tenure,features,is_active\n'
+            'Gold Loan,Personal Loan,5000,250000,9.5,12.00,12,36,"✓ Same day\n✓ No CIBIL",true\n'
+            'Shop Loan,Business Loan,100000,2000000,14,14,24,24,,false\n',
+            encoding='utf-8',
+        )
+        call_command('import_loan_products', str(products_csv), stdout=StringIO())
+        gold = LoanProduct.objects.get(name='Gold Loan')
+        self.assertEqual(gold.features_list, ['✓ Same day', '✓ No CIBIL'])
+        self.assertEqual(gold.display_amount_range, '₹5K - ₹250K')
+        self.assertEqual(gold.display_tenure_range, '1-3 years')
+        self.assertEqual(gold.display_interest_rate, '9.50% - 12.00%')
+        shop = LoanProduct.objects.get(name='Shop Loan')
+        self.assertEqual(shop.display_tenure_range, '2 years')
+        self.assertFalse(shop.is_active)
+
+        # A CSV dump of the table imports back unchanged
+        LoanProduct.objects.filter(name='Shop Loan').delete()
+        exported = Path(self.dir, 'exported-products.csv')
+        with open(exported, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=PRODUCT_FIELDS)
+            writer.writeheader()
+            writer.writerows(LoanProduct.objects.values(*PRODUCT_FIELDS))
+        gold.delete()
+        call_command('import_loan_products', str(exported), stdout=StringIO())
+        reimported = LoanProduct.objects.get(name='Gold Loan')
+        self.assertEqual(
+            (reimported.display_tenure_range, reimported.display_interest_rate, reimported.display_amount_range),
+            ('1-3 years', '9.50% - 12.00%', '₹5K - ₹250K'),
+        )
+        gold = reimported
+
+        applications_jsonl = Path(self.dir, 'applications.jsonl')
+        applications_jsonl.write_text(''.join(
+            json.dumps({
+                'user_email': 'priya@example.com', 'loan_product_id': gold.pk,
+                'requested_amount': str(10000 + i), 'annual_income': '480000', 'purpose': 'Stock',
+            }) + '\n'
+            for i in range(5)
+        ))
+        out = StringIO()
+        call_command('import_loan_applications', str(applications_jsonl), '--batch-size', '2', stdout=out)
+        self.assertIn('Imported 5 rows', out.getvalue())
+        self.assertEqual(LoanApplication.objects.filter(first_name='Priya', phone='9000000000').count(), 5)
+
+        # Backdated, so a restore can be told apart from the import time
+        LoanApplication.objects.update(
+            created_at=timezone.now() - timedelta(days=400), updated_at=timezone.now() - timedelta(days=30),
+        )
+        original_timestamps = {
+            application_id: (created_at, updated_at)
+            for application_id, created_at, updated_at
+            in LoanApplication.objects.values_list('application_id', 'created_at', 'updated_at')
+        }
+        export_csv = Path(self.dir, 'export.csv')
+        call_command('export_loan_applications', str(export_csv), '--chunk-size', '2', stdout=StringIO())
+        with open(export_csv, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['loan_product_name'], 'Gold Loan')
+        self.assertEqual(json.loads(rows[0]['documents']), [])
+
+        # The export is valid import input, timestamps included
+        LoanApplication.objects.all().delete()
+        call_command('import_loan_applications', str(export_csv), '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(
+            {
+                application_id: (created_at, updated_at)
+                for application_id, created_at, updated_at
+                in LoanApplication.objects.values_list('application_id', 'created_at', 'updated_at')
+            },
+            original_timestamps,
+        )
+
+        # Rows that are skipped keep their own timestamps
+        LoanApplication.objects.filter(application_id=rows[0]['application_id']).delete()
+        kept = LoanApplication.objects.get(application_id=rows[1]['application_id'])
+        LoanApplication.objects.filter(pk=kept.pk).update(created_at=timezone.now())
+        call_command('import_loan_applications', str(export_csv), '--skip-existing', stdout=StringIO())
+        self.assertEqual(LoanApplication.objects.count(), 5)
+        self.assertEqual(
+            LoanApplication.objects.get(application_id=rows[0]['application_id']).created_at,
+            original_timestamps[rows[0]['application_id']][0],
+        )
+        self.assertGreater(LoanApplication.objects.get(pk=kept.pk).created_at, original_timestamps[kept.application_id][0])
+
+    def test_failed_application_import_leaves_nothing_behind(self):
+        product = LoanProduct.objects.create(name='Gold Loan', category='Personal Loan')
+        applications_jsonl = Path(self.dir, 'applications.jsonl')
+        applications_jsonl.write_text(''.join(
+            json.dumps({
+                'user_email': email, 'loan_product_id': product.pk,
+                'requested_amount': '10000', 'annual_income': '480000', 'purpose': 'Stock',
+            }) + '\n'
+            for email in ['priya@example.com'] * 3 + ['nobody@example.com']
+        ))
+        with self.assertRaisesMessage(CommandError, "Row 4: no user profile for 'nobody@example.com'"):
+            call_command('import_loan_applications', str(applications_jsonl), '--batch-size', '2', stdout=StringIO())
+        self.assertFalse(LoanApplication.objects.exists())
+
+
+class LoanApplicationAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'admin-pass')
+        cls.profile = UserProfile.objects.create(user=cls.admin_user)
+        cls.personal = LoanProduct.objects.create(name='Quick Cash', category='Personal Loan')
+        cls.business = LoanProduct.objects.create(name='Shop Loan', category='Business Loan')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def add_applications(self, count, product, document_types):
+        applications = LoanApplication.objects.bulk_create([
+            LoanApplication(
+                application_id=f'LA{product.pk}{i:08d}{len(document_types)}', user_profile=self.profile,
+                loan_product=product, requested_amount=50000, annual_income=600000, purpose='test',
+            )
+            for i in range(count)
+        ])
+        LoanDocument.objects.bulk_create([
+            LoanDocument(
+                application=application, document_type=document_type, is_mandatory=True,
+                document_file='loan_documents/legacy.pdf', original_filename='legacy.pdf',
+            )
+            for application in applications for document_type in document_types
+        ])
+        return applications
+
+    def changelist(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:app_loanapplication_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_changelist_query_count_is_constant(self):
+        self.add_applications(2, self.personal, ['aadhar_card', 'pan_card'])
+        _, few = self.changelist()
+        self.add_applications(40, self.personal, ['aadhar_card'])
+        response, many = self.changelist()
+        self.assertEqual(few, many)
+        self.assertContains(response, '2 documents</a>')
+        self.assertContains(response, '1 documents</a> (mandatory missing)')
+
+    def test_incomplete_documents_filter(self):
+        complete = self.add_applications(1, self.personal, ['aadhar_card', 'pan_card'])
+        business = self.add_applications(1, self.business, ['aadhar_card', 'pan_card'])
+        empty = self.add_applications(1, self.personal, [])
+        response, _ = self.changelist(documents='incomplete')
+        shown = {a.pk for a in response.context['cl'].result_list}
+        self.assertEqual(shown, {business[0].pk, empty[0].pk})
+        response, _ = self.changelist(documents='complete')
+        self.assertEqual([a.pk for a in response.context['cl'].result_list], [complete[0].pk])
+
+
+class DocumentMetadataTests(LoanSubmissionTestCase):
+    def test_metadata_recorded_at_upload(self):
+        self.post_application()
+        document = LoanDocument.objects.get(document_type='aadhar_card')
+        self.assertEqual(document.file_size, len(b'%PDF-1.4 aadhar'))
+        self.assertEqual(document.content_type, 'application/pdf')
+        self.assertEqual(document.content_hash, hashlib.sha256(b'%PDF-1.4 aadhar').hexdigest())
+
+    def test_admin_changelist_does_no_storage_io(self):
+        self.post_application()
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'admin-pass')
+        self.client.force_login(admin_user)
+        with mock.patch.object(type(get_document_storage()), 'size', side_effect=AssertionError('stat')):
+            response = self.client.get(reverse('admin:app_loandocument_changelist'), {'o': '6'})
+        self.assertContains(response, f'{len(b"%PDF-1.4 pan")} bytes')
+        response = self.client.get(reverse('admin:app_loandocument_changelist'), {'size': 'small'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+    def test_backfill_command(self):
+        self.post_application()
+        LoanDocument.objects.update(file_size=None, content_type='', content_hash='')
+        call_command('backfill_document_metadata', stdout=StringIO())
+        document = LoanDocument.objects.get(document_type='pan_card')
+        self.assertEqual(document.file_size, len(b'%PDF-1.4 pan'))
+        self.assertEqual(document.content_type, 'application/pdf')
+        self.assertEqual(document.content_hash, hashlib.sha256(b'%PDF-1.4 pan').hexdigest())
+
+
+def exif_image(fmt, size=(3000, 2000)):
+    """An image in ``fmt`` carrying GPS-style EXIF and a rotate-90 orientation"""
+    image = Image.new('RGB', size, 'navy')
+    exif = image.getexif()
+    exif[ExifBase.Orientation] = 6
+    exif[ExifBase.Make] = 'PhoneCo'
+    buffer = BytesIO()
+    image.save(buffer, fmt, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class ImageNormalizationTests(LoanSubmissionTestCase):
+    def open_image(self, field):
+        with field.open('rb') as f:
+            return Image.open(BytesIO(f.read()))
+
+    def test_claimed_documents_are_skipped_by_other_workers(self):
+        self.post_application(aadharCard=SimpleUploadedFile('aadhar.jpg', exif_image('JPEG'), content_type='image/jpeg'))
+        claimed = claim_pending_documents(batch_size=10)
+        self.assertEqual([d.document_type for d in claimed], ['aadhar_card'])
+        # A second worker finds nothing to do while the claim holds
+        self.assertEqual(claim_pending_documents(batch_size=10), [])
+        self.assertEqual(process_pending_documents(batch_size=10), (0, 0, 0))
+
+        # A claim left by a worker that died runs out and the image is retried
+        LoanDocument.objects.filter(pk=claimed[0].pk).update(processing_claimed_until=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_pending_documents(batch_size=10)[:2], (1, 0))
+
+    def test_jpeg_resized_and_stripped(self):
+        original = exif_image('JPEG')
+        self.post_application(aadharCard=SimpleUploadedFile('aadhar.jpg', original, content_type='image/jpeg'))
+        document = LoanDocument.objects.get(document_type='aadhar_card')
+        old_name = document.document_file.name
+        self.assertEqual(document.processing_status, 'pending')
+        self.assertEqual(LoanDocument.objects.get(document_type='pan_card').processing_status, 'skipped')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            processed, failed, saved = process_pending_documents(batch_size=10)
+        self.assertEqual((processed, failed), (1, 0))
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, 'done')
+        self.assertEqual(document.original_file_size, len(original))
+        self.assertEqual(saved, len(original) - document.file_size)
+
+        image = self.open_image(document.document_file)
+        self.assertEqual(image.size, (1333, 2000))  # rotated upright, long side bounded
+        self.assertEqual(dict(image.getexif()), {})
+        self.assertEqual(max(self.open_image(document.thumbnail).size), 240)
+
+        self.assertFalse(DocumentBlob.objects.filter(name=old_name).exists())
+        self.assertFalse(get_document_storage().exists(old_name))
+        for name in (document.document_file.name, document.thumbnail.name):
+            self.assertEqual(DocumentBlob.objects.get(name=name).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+        self.assertFalse(DocumentBlob.objects.filter(name=document.thumbnail.name).exists())
+
+    def test_png_metadata_stripped_even_when_not_smaller(self):
+        image = Image.new('RGB', (120, 80), 'navy')
+        exif = image.getexif()
+        exif[ExifBase.Make] = 'PhoneCo'
+        info = PngImagePlugin.PngInfo()
+        info.add_text('Comment', 'taken at home')
+        buffer = BytesIO()
+        image.save(buffer, 'PNG', exif=exif.tobytes(), pnginfo=info)
+        self.post_application(aadharCard=SimpleUploadedFile('aadhar.png', buffer.getvalue(), content_type='image/png'))
+
+        def padded(*args, **kwargs):
+            # A re-encode larger than the original (trailing bytes after IEND are ignored)
+            result = normalize_image(*args, **kwargs)
+            return result._replace(data=result.data + b'\0' * len(buffer.getvalue()))
+
+        with mock.patch('app.images.normalize_image', side_effect=padded), \
+                self.captureOnCommitCallbacks(execute=True):
+            processed, failed, saved = process_pending_documents(batch_size=10)
+        self.assertEqual((processed, failed), (1, 0))
+        self.assertLess(saved, 0)
+        png = self.open_image(LoanDocument.objects.get(document_type='aadhar_card').document_file)
+        self.assertEqual(dict(png.getexif()), {})
+        self.assertNotIn('Comment', png.info)
+
+    @override_settings(DOCUMENT_IMAGE_MAX_DIMENSION=500)
+    def test_command_reports_savings_and_failures(self):
+        self.post_application(
+            aadharCard=SimpleUploadedFile('aadhar.png', exif_image('PNG', (1200, 800)), content_type='image/png'),
+            panCard=SimpleUploadedFile('pan.jpg', exif_image('JPEG')[:200], content_type='image/jpeg'),  # truncated
+        )
+        out = StringIO()
+        call_command('process_document_images', workers=1, stdout=out)
+        self.assertIn('1 normalized, 1 failed', out.getvalue())
+        statuses = dict(LoanDocument.objects.values_list('document_type', 'processing_status'))
+        self.assertEqual(statuses, {'aadhar_card': 'done', 'pan_card': 'failed'})
+        document = LoanDocument.objects.get(document_type='aadhar_card')
+        self.assertLess(document.file_size, document.original_file_size)
+        self.assertEqual(self.open_image(document.document_file).size, (333, 500))
+
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'admin-pass')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:app_loanapplication_change', args=[document.application_id]))
+        self.assertContains(response, document.thumbnail.url)
+
+
+class StaticPipelineTests(TestCase):
+    def test_minify_css(self):
+        css = '/* theme */\n.a :hover ,\n.b > .c {\n  content: "a  b";\n  width: calc(100% - 2px) !important;\n}\n'
+        self.assertEqual(minify_css(css), '.a :hover,.b>.c{content:"a  b";width:calc(100% - 2px)!important}')
+
+    def test_minify_js(self):
+        js = (
+            '// setup\nconst re = /\\/\\//g;  /* slashes */\n'
+            'let s = `a  ${ {x: 1}.x }  b`;\n'
+            'let t = a\n(b)\n'
+            'if (x) {\n    y = i++ + +j;\n}\n'
+        )
+        self.assertEqual(minify_js(js), (
+            'const re=/\\/\\//g;let s=`a  ${{x:1}.x}  b`;let t=a\n(b)\nif(x){y=i++ + +j;}'
+        ))
+
+    def test_collectstatic_pipeline(self):
+        source, root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        Path(source, 'css').mkdir()
+        Path(source, 'images').mkdir()
+        Path(source, 'css', 'site.css').write_text(
+            '/* site */\nbody {\n  background: url("../images/logo.png");\n}\n' * 20
+        )
+        Image.new('RGB', (300, 100), 'teal').save(Path(source, 'images', 'logo.png'))
+
+        with self.settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=root, STATIC_IMAGE_WIDTHS=(120, 240),
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'app.assets.PipelineStaticFilesStorage'}},
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            storage = staticfiles_storage
+            css_name = storage.stored_name('css/site.css')
+            css = Path(root, css_name).read_bytes()
+            self.assertTrue(css.startswith(b'body{background:url("../images/logo.'))
+            self.assertNotIn(b'/*', css)
+            self.assertEqual(gzip.decompress(Path(root, css_name + '.gz').read_bytes()), css)
+
+            formats = [name for name in ('avif', 'webp') if features.check(name)]
+            variants = storage.image_variants('images/logo.png')
+            self.assertEqual(list(variants), formats)
+            for format in formats:
+                self.assertEqual([width for width, _ in variants[format]], [120, 240])
+                with Image.open(Path(root, storage.stored_name(f'images/logo-120w.{format}'))) as image:
+                    self.assertEqual(image.size, (120, 40))
+
+            html = Template(
+                "{% load assets %}{% responsive_image 'images/logo.png' sizes='60px' alt='Logo' %}"
+            ).render(Context())
+            self.assertTrue(html.startswith('<picture><source type="image/'))
+            self.assertIn(f'{storage.url("images/logo-240w.webp")} 240w', html)
+            self.assertIn(f'<img src="{storage.url("images/logo.png")}" alt="Logo"></picture>', html)
+
+            request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+            response = serve_static(request, css_name)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertIn('max-age=31536000', response['Cache-Control'])
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            response.close()
+
+            response = serve_static(RequestFactory().get('/'), 'css/site.css')
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(response['Cache-Control'], 'no-cache')
+            response.close()
+
+
+class EmailAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='rahul', email='Rahul@Example.com', password='s3cret-pass')
+
+    def login(self, email, password='s3cret-pass'):
+        return self.client.post(
+            reverse('login'), json.dumps({'email': email, 'password': password}), content_type='application/json'
+        )
+
+    def test_login_is_case_insensitive(self):
+        response = self.login('  rahul@EXAMPLE.com')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+
+    def test_bad_credentials(self):
+        self.assertEqual(self.login('rahul@example.com', 'wrong').status_code, 400)
+        self.assertEqual(self.login('nobody@example.com').status_code, 400)
+
+    def test_lookup_is_a_single_query(self):
+        from django.contrib.auth import authenticate
+        with self.assertNumQueries(1):
+            user = authenticate(email='RAHUL@example.com', password='s3cret-pass')
+        self.assertEqual(user, self.user)
+        with self.assertNumQueries(0):  # profile (here: none) came with the user
+            self.assertFalse(hasattr(user, 'profile'))
+
+    def test_emails_unique_case_insensitively(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='other', email='rahul@example.COM')
+        # Blank emails are exempt
+        User.objects.create_user(username='a')
+        User.objects.create_user(username='b')
+
+    def test_signup_rejects_existing_email_any_case(self):
+        response = self.client.post(reverse('signup'), json.dumps({
+            'first_name': 'R', 'last_name': 'S', 'email': 'RAHUL@example.com',
+            'password': 'another-pass', 'confirm_password': 'another-pass',
+        }), content_type='application/json')
+        self.assertEqual(response.json()['message'], 'Email already exists.')
+
+
+@override_settings(LOGIN_RATE_LIMITS={'ip': (10, 60), 'email': (3, 300)})
+class LoginRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='rahul', email='rahul@example.com', password='s3cret-pass')
+
+    def login(self, email, password='wrong', ip='10.0.0.1'):
+        return self.client.post(
+            reverse('login'), json.dumps({'email': email, 'password': password}),
+            content_type='application/json', REMOTE_ADDR=ip,
+        )
+
+    def test_email_limit_rejects_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login('rahul@example.com').status_code, 400)
+        with mock.patch('app.views.aauthenticate') as authenticate:
+            response = self.login('RAHUL@example.com', 's3cret-pass', ip='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        authenticate.assert_not_called()
+
+    def test_ip_limit_spans_emails(self):
+        for i in range(10):
+            self.login(f'user{i}@example.com')
+        self.assertEqual(self.login('rahul@example.com', 's3cret-pass').status_code, 429)
+        self.assertEqual(self.login('rahul@example.com', 's3cret-pass', ip='10.0.0.2').status_code, 200)
+
+    def test_successful_login_resets_email_counter(self):
+        self.login('rahul@example.com')
+        self.login('rahul@example.com')
+        self.assertEqual(self.login('rahul@example.com', 's3cret-pass').status_code, 200)
+        self.client.logout()
+        for _ in range(3):
+            self.assertEqual(self.login('rahul@example.com').status_code, 400)
+
+    async def test_window_slides(self):
+        limiter = SlidingWindowRateLimiter('test', limit=2, window=60)
+        self.assertEqual(await limiter.ahit('k', now=600), (True, 0))
+        self.assertEqual(await limiter.ahit('k', now=610), (True, 0))
+        self.assertEqual(await limiter.ahit('k', now=620), (False, 40))
+        # Half of the previous window still counts: 2 * 0.5 = 1 < 2
+        self.assertTrue((await limiter.ahit('k', now=690))[0])
+        self.assertFalse((await limiter.ahit('k', now=690))[0])
+        self.assertTrue((await limiter.ahit('k', now=800))[0])
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    LOGIN_RATE_LIMITS={'ip': (10, 60), 'email': (3, 300)},
+)
+class AsyncViewTests(TestCase):
+    """The JSON endpoints run on the event loop under ASGI (AsyncClient)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='rahul', email='rahul@example.com', password='s3cret-pass')
+        UserProfile.objects.create(user=self.user)
+
+    def login(self, email, password):
+        return self.async_client.post(
+            reverse('login'), json.dumps({'email': email, 'password': password}), content_type='application/json',
+        )
+
+    def test_views_and_middleware_are_async(self):
+        for view in (login_view, signup_view, get_loan_products_api):
+            self.assertTrue(asyncio.iscoroutinefunction(view), view.__name__)
+
+        async def get_response(request):
+            return HttpResponse()
+        self.assertTrue(asyncio.iscoroutinefunction(PerformanceMiddleware(get_response)))
+        self.assertFalse(asyncio.iscoroutinefunction(PerformanceMiddleware(lambda request: HttpResponse())))
+
+    async def test_login(self):
+        response = await self.login('RAHUL@example.com', 's3cret-pass')
+        self.assertTrue(response.json()['success'])
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual((await self.login('rahul@example.com', 'wrong')).status_code, 400)
+
+    async def test_login_rate_limit(self):
+        for _ in range(3):
+            await self.login('rahul@example.com', 'wrong')
+        response = await self.login('rahul@example.com', 's3cret-pass')
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    async def test_login_upgrades_hash(self):
+        self.assertTrue((await self.login('rahul@example.com', 's3cret-pass')).json()['success'])
+        await self.user.arefresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+    async def test_signup(self):
+        def signup(email):
+            return self.async_client.post(reverse('signup'), json.dumps({
+                'first_name': 'Priya', 'last_name': 'Shah', 'email': email,
+                'password': 's3cret-pass', 'confirm_password': 's3cret-pass',
+            }), content_type='application/json')
+
+        response = await signup('priya@example.com')
+        self.assertTrue(response.json()['success'])
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        user = await User.objects.aget(email='priya@example.com')
+        self.assertTrue(await UserProfile.objects.filter(user=user).aexists())
+        self.assertEqual((await signup('PRIYA@example.com')).status_code, 400)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    async def test_products_api_conditional_get(self):
+        await LoanProduct.objects.acreate(name='Gold Loan', category='Personal Loan')
+        response = await self.async_client.get(reverse('loan_products_api'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([loan['name'] for loan in response.json()['loans']], ['Gold Loan'])
+        self.assertIn('Last-Modified', response)
+        # Counted although the async ORM ran them in a worker thread
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+        cached = await self.async_client.get(reverse('loan_products_api'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    async def test_server_timing_is_restricted(self):
+        response = await self.async_client.get(reverse('loan_products_api'))
+        self.assertNotIn('Server-Timing', response)
+        self.user.is_staff = True
+        await self.user.asave()
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('loan_products_api'))
+        self.assertIn('Server-Timing', response)
+
+
+@skipIf(importlib.util.find_spec('argon2') is None, "argon2-cffi is not installed")
+@override_settings(
+    PASSWORD_HASHERS=['app.hashers.TunableArgon2PasswordHasher', 'django.contrib.auth.hashers.PBKDF2PasswordHasher'],
+    ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=1024, ARGON2_PARALLELISM=1,
+)
+class PasswordHasherTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_pbkdf2_hash_upgraded_on_login(self):
+        user = User.objects.create_user(username='rahul', email='rahul@example.com')
+        user.password = make_password('s3cret-pass', hasher='pbkdf2_sha256')
+        user.save()
+        response = self.client.post(
+            reverse('login'), json.dumps({'email': 'rahul@example.com', 'password': 's3cret-pass'}),
+            content_type='application/json',
+        )
+        self.assertTrue(response.json()['success'])
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertIn('m=1024,t=1,p=1', user.password)
+
+    def test_retuned_parameters_trigger_rehash(self):
+        encoded = make_password('s3cret-pass')
+        hasher = get_hasher('default')
+        self.assertFalse(hasher.must_update(encoded))
+        with self.settings(ARGON2_TIME_COST=2):
+            self.assertTrue(hasher.must_update(encoded))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+@contextmanager
+def count_queries():
+    """
+    Yield a list that collects the SQL run on this thread's connection,
+    transaction control included. Unlike CaptureQueriesContext it does not
+    read connection.queries_log, which stops growing at 9000 entries.
+    """
+    executed = []
+
+    def wrapper(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield executed
+
+
+@contextmanager
+def file_backed_sqlite():
+    """
+    Point the default alias at a migrated scratch SQLite file, with the
+    project's WAL and busy-timeout options, so threads get connections that
+    really contend for the write lock. The in-memory test database shares
+    one cache between connections and fails concurrent writers with
+    "database table is locked" instead of letting them wait.
+    """
+    db_settings = connections.settings[DEFAULT_DB_ALIAS]
+    memory_connection, memory_name = connections[DEFAULT_DB_ALIAS], db_settings['NAME']
+    with tempfile.TemporaryDirectory() as directory:
+        db_settings['NAME'] = os.path.join(directory, 'db.sqlite3')
+        connections[DEFAULT_DB_ALIAS] = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            call_command('migrate', verbosity=0)
+            yield
+        finally:
+            connections[DEFAULT_DB_ALIAS].close()
+            connections[DEFAULT_DB_ALIAS] = memory_connection
+            db_settings['NAME'] = memory_name
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UsernameAllocationTests(TestCase):
+    def test_thousands_of_same_local_part(self):
+        per_signup = []
+        for i in range(2000):
+            with count_queries() as queries:
+                create_user_with_profile(f'rahul@mail{i}.example.com', 's3cret-pass')
+            per_signup.append(len(queries))
+        self.assertEqual(User.objects.filter(username__startswith='rahul').count(), 2000)
+        # Inside the test transaction a clean attempt is savepoint + user +
+        # profile + release (4); each collision costs savepoint, insert,
+        # rollback to and release of the savepoint plus the email check (5).
+        # Every signup after the first collides on the bare 'rahul'; a second
+        # collision among the 9000 four-digit suffixes stays rare.
+        self.assertEqual(per_signup[0], 4)
+        self.assertLessEqual(max(per_signup), 4 + 5 * 4)
+        self.assertLess(sum(per_signup) / len(per_signup), 4 + 5 * 1.25)
+
+    def test_suffix_collision_is_retried(self):
+        create_user_with_profile('rahul@a.example.com', 's3cret-pass')
+        with mock.patch('app.accounts.random.randrange', side_effect=[4242, 4242, 51515]):
+            create_user_with_profile('rahul@b.example.com', 's3cret-pass')
+            create_user_with_profile('rahul@c.example.com', 's3cret-pass')
+        self.assertEqual(
+            sorted(User.objects.values_list('username', flat=True)), ['rahul', 'rahul4242', 'rahul51515']
+        )
+
+    def test_taken_email_is_not_retried(self):
+        create_user_with_profile('rahul@example.com', 's3cret-pass')
+        with self.assertRaises(EmailAlreadyRegistered):
+            create_user_with_profile('RAHUL@example.com', 's3cret-pass')
+        self.assertEqual(User.objects.count(), 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConcurrentSignupTests(TransactionTestCase):
+    SIGNUPS = 2000
+
+    def setUp(self):
+        if connection.vendor == 'sqlite':
+            self.enterContext(file_backed_sqlite())
+
+    def test_concurrent_signups_get_distinct_usernames(self):
+        def signup(i):
+            try:
+                with count_queries() as queries:
+                    create_user_with_profile(f'rahul@c{i}.example.com', 's3cret-pass')
+                return len(queries)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            per_signup = list(pool.map(signup, range(self.SIGNUPS)))
+        usernames = list(User.objects.values_list('username', flat=True))
+        self.assertEqual(len(usernames), self.SIGNUPS)
+        self.assertEqual(len(set(usernames)), self.SIGNUPS)
+        self.assertEqual(UserProfile.objects.count(), self.SIGNUPS)
+        # Outside a transaction a clean attempt is BEGIN + user + profile (the
+        # COMMIT is not a cursor call, neither is the ROLLBACK after a
+        # collision); each collision costs BEGIN, insert and the email check.
+        # Threads racing for the same name collide no more than serial signups.
+        self.assertEqual(min(per_signup), 3)
+        self.assertLessEqual(max(per_signup), 3 + 3 * 4)
+        self.assertLess(sum(per_signup) / len(per_signup), 3 + 3 * 1.25)
@@ -0,0 +1,127 @@
+"""
+Streaming validation for loan document uploads.
+
+LoanDocumentUploadHandler sits in front of Django's default handlers for the
+loan application form. Document fields are spooled straight to a temporary
+file on disk chunk by chunk, so worker memory does not grow with the number
+or size of the scans. Extension, magic bytes and size are checked while the
+body is still being read, and the upload is stopped at the first bad file.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopFutureHandlers, StopUpload, TemporaryFileUploadHandler
+
+# Form field name -> LoanDocument.document_type
+LOAN_DOCUMENT_FIELDS = {
+    'aadharCard': 'aadhar_card',
+    'panCard': 'pan_card',
+    'incomeProof': 'income_proof',
+    'bankStatement': 'bank_statement',
+    'udyamCertificate': 'udyam_certificate',
+    'gstCertificate': 'gst_certificate',
+}
+
+# File signatures accepted for each allowed extension
+MAGIC_BYTES = {
+    '.pdf': (b'%PDF-',),
+    '.jpg': (b'\xff\xd8\xff',),
+    '.jpeg': (b'\xff\xd8\xff',),
+    '.png': (b'\x89PNG\r\n\x1a\n',),
+}
+HEADER_SIZE = max(len(magic) for signatures in MAGIC_BYTES.values() for magic in signatures)
+
+
+def max_document_size():
+    return getattr(settings, 'LOAN_DOCUMENT_MAX_SIZE', 10 * 1024 * 1024)
+
+
+def allowed_extensions():
+    return getattr(settings, 'LOAN_DOCUMENT_ALLOWED_EXTENSIONS', ['.pdf', '.jpg', '.jpeg', '.png'])
+
+
+def file_extension(name):
+    return os.path.splitext(name or '')[1].lower()
+
+
+def format_size(size):
+    return f"{size / (1024 * 1024):.0f}MB"
+
+
+def invalid_format_error(name):
+    return f'File {name} has invalid format. Allowed: PDF, JPG, PNG'
+
+
+def too_large_error(name):
+    return f'File {name} is too large. Maximum size is {format_size(max_document_size())}.'
+
+
+class LoanDocumentUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spool loan document fields to disk while validating and hashing them.
+
+    The first problem found is recorded on ``request.upload_error`` and the
+    rest of the body is discarded; the view checks that attribute before
+    reading any form data. Accepted files carry a ``content_hash`` (SHA-256
+    hex digest) computed on the fly.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.active = False
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.active = field_name in LOAN_DOCUMENT_FIELDS
+        if not self.active:
+            return
+
+        if file_extension(file_name) not in allowed_extensions():
+            self.reject(invalid_format_error(file_name))
+        if content_length is not None and content_length > max_document_size():
+            self.reject(too_large_error(file_name))
+
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.size = 0
+        self.header = b''
+        self.hasher = hashlib.sha256()
+        # Later handlers must not also buffer this field
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        self.size += len(raw_data)
+        if self.size > max_document_size():
+            self.reject(too_large_error(self.file_name))
+
+        if len(self.header) < HEADER_SIZE:
+            self.header += raw_data[:HEADER_SIZE - len(self.header)]
+            if len(self.header) >= HEADER_SIZE:
+                self.check_magic()
+
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        if len(self.header) < HEADER_SIZE:
+            self.check_magic()
+        file = super().file_complete(file_size)
+        file.content_hash = self.hasher.hexdigest()
+        return file
+
+    def check_magic(self):
+        signatures = MAGIC_BYTES.get(file_extension(self.file_name), ())
+        if not any(self.header.startswith(magic) for magic in signatures):
+            self.reject(invalid_format_error(self.file_name))
+
+    def reject(self, error):
+        self.active = False
+        if self.request is not None:
+            self.request.upload_error = error
+        raise StopUpload(connection_reset=False)
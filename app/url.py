@@ -12,5 +12,8 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('submit-loan-application/', views.submit_loan_application, name='submit_loan_application'),
     path('api/loan-products/', views.get_loan_products_api, name='loan_products_api'),
+    path('api/loan-products/<int:product_id>/quotes/', views.loan_quotes_api, name='loan_quotes_api'),
+    path('documents/<str:token>/', views.document_download, name='document_download'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
    
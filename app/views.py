@@ -1,49 +1,68 @@
 # views.py
 from django.shortcuts import render, redirect
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import aauthenticate, alogin, logout
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
+from django.views.decorators.cache import cache_control
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.db import transaction
 import json
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+from decimal import Decimal, InvalidOperation
 from django.conf import settings
 from .models import *
+from .accounts import EmailAlreadyRegistered, acreate_user_with_profile
+from .amortization import quote_batch, schedule
+from .backends import users_by_email
+from .eligibility import assess
+from .emails import document_from_token, enqueue_confirmation_email
+from .ratelimit import acheck_login_rate, areset_login_rate
+from .catalog import aget_products_api_payload, get_active_products, get_catalog_version
+from .metrics import can_view_metrics, registry
+from .pagecache import cache_anonymous_page
+from .uploads import (
+    LOAN_DOCUMENT_FIELDS, LoanDocumentUploadHandler, allowed_extensions, file_extension,
+    invalid_format_error, max_document_size, too_large_error,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 @require_POST
 @csrf_exempt
-def login_view(request):
+async def login_view(request):
     try:
         data = json.loads(request.body)
         email = data.get('email')
         password = data.get('password')
         remember_me = data.get('remember_me', False)
         
-        # Check if a user exists with this email
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return JsonResponse({
+        # Throttle before authenticate(): password hashing is the expensive part
+        retry_after = await acheck_login_rate(request, email)
+        if retry_after:
+            response = JsonResponse({
                 'success': False, 
-                'message': 'Invalid email or password.'
-            }, status=400)
+                'message': 'Too many login attempts. Please try again later.'
+            }, status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
         
-        # Authenticate user
-        user = authenticate(request, username=user.username, password=password)
+        # One indexed, case-insensitive lookup (see ProfileModelBackend)
+        user = await aauthenticate(request, email=email, password=password)
         
         if user is not None:
-            login(request, user)
+            await alogin(request, user)
+            await areset_login_rate(email)
             
             # Set session expiry based on "remember me" selection
             if not remember_me:
-                request.session.set_expiry(0)  # Session expires when browser closes
+                await request.session.aset_expiry(0)  # Session expires when browser closes
             else:
                 # Session expires after 2 weeks (default is 2 weeks)
-                request.session.set_expiry(1209600)  # 2 weeks in seconds
+                await request.session.aset_expiry(1209600)  # 2 weeks in seconds
                 
             return JsonResponse({
                 'success': True, 
@@ -63,7 +82,7 @@ def login_view(request):
 
 @require_POST
 @csrf_exempt
-def signup_view(request):
+async def signup_view(request):
     try:
         data = json.loads(request.body)
         first_name = data.get('first_name')
@@ -85,7 +104,7 @@ def signup_view(request):
                 'message': 'Passwords do not match.'
             }, status=400)
             
-        if User.objects.filter(email=email).exists():
+        if await users_by_email(email).aexists():
             return JsonResponse({
                 'success': False, 
                 'message': 'Email already exists.'
@@ -97,30 +116,23 @@ def signup_view(request):
                 'message': 'Password must be at least 8 characters long.'
             }, status=400)
         
-        # Create user
-        username = email.split('@')[0]  # Use part of email as username
-        # Ensure username is unique
-        counter = 1
-        original_username = username
-        while User.objects.filter(username=username).exists():
-            username = f"{original_username}{counter}"
-            counter += 1
-            
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password,
-            first_name=first_name,
-            last_name=last_name
-        )
-        
-        # Create user profile
-        UserProfile.objects.create(user=user)
+        # Create user; the username is allocated from the email's local part
+        try:
+            user = await acreate_user_with_profile(
+                email,
+                password,
+                first_name=first_name,
+                last_name=last_name
+            )
+        except EmailAlreadyRegistered:
+            # Lost a race with a concurrent signup for the same email
+            return JsonResponse({
+                'success': False, 
+                'message': 'Email already exists.'
+            }, status=400)
         
-        # Log the user in
-        user = authenticate(request, username=username, password=password)
-        if user is not None:
-            login(request, user)
+        # Log the user in; the password was just set, no need to re-hash it
+        await alogin(request, user, backend='app.backends.ProfileModelBackend')
             
         return JsonResponse({
             'success': True, 
@@ -137,249 +149,334 @@ def logout_view(request):
     logout(request)
     return redirect('/')  # Replace 'home' with your actual home page name
 # Create your views here. 
+@cache_anonymous_page
 def indexpage(request): 
- loans=LoanProduct.objects.all()
  context={
-     'loan':loans
-
+     'loan':get_active_products(),
+     # The loan cards fragment is cached under these (see index.html)
+     'catalog_version': get_catalog_version(),
+     'loan_cards_timeout': getattr(settings, 'LOAN_CARDS_CACHE_TIMEOUT', 60 * 60 * 24),
  }
- print(loans)
 
  return render(request,'index.html',context)
 
 
+MANDATORY_DOCUMENT_NAMES = {
+    'aadharCard': 'Aadhar Card',
+    'panCard': 'PAN Card',
+    'udyamCertificate': 'Udyam Registration Certificate',
+}
+
+
+class ApplicationValidationError(Exception):
+    """Raised by the validation stage; the message is returned to the client"""
+
+
+def mandatory_documents_for(loan_product):
+    """Form fields that must carry a document for this product"""
+    mandatory_docs = ['aadharCard', 'panCard']  # Always required
+    if loan_product.category and 'business' in loan_product.category.lower():
+        mandatory_docs.append('udyamCertificate')
+    return mandatory_docs
+
+
+def validate_loan_application(request):
+    """
+    Validation stage of the submission pipeline.
+
+    Checks the product, amounts, personal details and documents without
+    writing anything, and returns ``(loan_product, application_data,
+    documents)`` where ``documents`` is a list of
+    ``(document_type, file, is_mandatory)`` ready to be stored.
+    """
+    first_name = request.POST.get('firstName')
+    last_name = request.POST.get('lastName')
+    email = request.POST.get('email')
+    phone = request.POST.get('phone')
+    loan_product_id = request.POST.get('loanType')
+    purpose = request.POST.get('purpose')
+
+    try:
+        requested_amount = Decimal(request.POST.get('requestedAmount'))
+        annual_income = Decimal(request.POST.get('income'))
+    except (TypeError, InvalidOperation):
+        requested_amount = annual_income = None
+    if requested_amount is None or not requested_amount.is_finite() or not annual_income.is_finite():
+        raise ApplicationValidationError('Please enter a valid loan amount and annual income')
+
+    try:
+        loan_product = LoanProduct.objects.get(id=loan_product_id, is_active=True)
+    except (LoanProduct.DoesNotExist, ValueError):
+        raise ApplicationValidationError('Invalid loan product selected')
+
+    application_data = {
+        'loan_product': loan_product,
+        'requested_amount': requested_amount,
+        'annual_income': annual_income,
+        'purpose': purpose
+    }
+
+    if request.user.is_authenticated:
+        # Only add personal details if they're provided (override profile data)
+        for field, value in (('first_name', first_name), ('last_name', last_name), ('email', email), ('phone', phone)):
+            if value:
+                application_data[field] = value
+    else:
+        # For anonymous users, all personal details are required
+        if not all([first_name, last_name, email, phone]):
+            raise ApplicationValidationError('All personal details are required for guest applications')
+        application_data.update({
+            'first_name': first_name,
+            'last_name': last_name,
+            'email': email,
+            'phone': phone
+        })
+
+    # Validate loan amount against product limits
+    if requested_amount < loan_product.min_loan_amount:
+        raise ApplicationValidationError(
+            f'Requested amount is below minimum limit of ₹{loan_product.min_loan_amount:,}'
+        )
+    if requested_amount > loan_product.max_loan_amount:
+        raise ApplicationValidationError(
+            f'Requested amount exceeds maximum limit of ₹{loan_product.max_loan_amount:,}'
+        )
+
+    eligibility = assess(loan_product, annual_income, requested_amount)
+    if not eligibility.eligible and getattr(settings, 'ELIGIBILITY_REJECT_INELIGIBLE', True):
+        raise ApplicationValidationError(
+            f'Based on your annual income you can borrow up to ₹{eligibility.max_eligible_amount:,} for this loan'
+        )
+    application_data['eligibility_score'] = eligibility.score
+    application_data['max_eligible_amount'] = eligibility.max_eligible_amount
+
+    mandatory_docs = mandatory_documents_for(loan_product)
+    missing_mandatory = [doc for doc in mandatory_docs if doc not in request.FILES]
+    if missing_mandatory:
+        missing_names = [MANDATORY_DOCUMENT_NAMES.get(doc, doc) for doc in missing_mandatory]
+        raise ApplicationValidationError(f'Missing mandatory documents: {", ".join(missing_names)}')
+
+    documents = []
+    for doc_field, doc_type in LOAN_DOCUMENT_FIELDS.items():
+        file = request.FILES.get(doc_field)
+        if file is None:
+            continue
+        # Already enforced while streaming; kept as a backstop in case the
+        # upload handler was bypassed
+        if file.size > max_document_size():
+            raise ApplicationValidationError(too_large_error(file.name))
+        if file_extension(file.name) not in allowed_extensions():
+            raise ApplicationValidationError(invalid_format_error(file.name))
+        documents.append((doc_type, file, doc_field in mandatory_docs))
+
+    return loan_product, application_data, documents
+
+
+def get_request_profile(request, **defaults):
+    """
+    Profile of the logged-in user, created on first use.
+
+    ProfileModelBackend loads it together with ``request.user``, so this
+    normally costs no query.
+    """
+    try:
+        return request.user.profile
+    except UserProfile.DoesNotExist:
+        return UserProfile.objects.create(user=request.user, **defaults)
+
+
+def create_loan_application(request, application_data, documents):
+    """
+    Write stage of the submission pipeline: one transaction holding the
+    application, its documents (a single bulk insert) and the queued
+    confirmation email.
+    """
+    with transaction.atomic():
+        if request.user.is_authenticated:
+            application_data['user_profile'] = get_request_profile(
+                request, phone_number=application_data.get('phone', '')
+            )
+
+        application = LoanApplication.objects.create(**application_data)
+
+        # bulk_create() still runs FileField.pre_save, which writes each file
+        # to storage, but it skips LoanDocument.save(), so references are
+        # taken explicitly below.
+        new_documents = [
+            LoanDocument(
+                application=application,
+                document_type=doc_type,
+                document_file=file,
+                original_filename=file.name,
+                is_mandatory=is_mandatory
+            )
+            for doc_type, file, is_mandatory in documents
+        ]
+        for document in new_documents:
+            document.record_file_metadata()
+        uploaded_documents = LoanDocument.objects.bulk_create(new_documents)
+        DocumentBlob.acquire_many((doc.document_file.name, doc.file_size) for doc in uploaded_documents)
+
+        # Queued in the same transaction, so the worker never sees an email
+        # for an application that was rolled back
+        enqueue_confirmation_email(application)
+
+    return application, uploaded_documents
+
+
 @csrf_exempt
 def submit_loan_application(request):
     if request.method == 'POST':
+        # Must be installed before request.POST / request.FILES are touched
+        request.upload_handlers.insert(0, LoanDocumentUploadHandler(request))
         try:
-            # Get form data
-            first_name = request.POST.get('firstName')
-            last_name = request.POST.get('lastName')
-            email = request.POST.get('email')
-            phone = request.POST.get('phone')
-            loan_product_id = request.POST.get('loanType')
-            requested_amount = request.POST.get('requestedAmount')
-            annual_income = request.POST.get('income')
-            purpose = request.POST.get('purpose')
-            
-            # Get loan product
-            try:
-                loan_product = LoanProduct.objects.get(id=loan_product_id, is_active=True)
-            except LoanProduct.DoesNotExist:
-                return JsonResponse({'success': False, 'error': 'Invalid loan product selected'})
-            
-            user_profile = None
-            application_data = {
-                'loan_product': loan_product,
-                'requested_amount': float(requested_amount),
-                'annual_income': float(annual_income),
-                'purpose': purpose
-            }
-            
-            # Handle authenticated vs anonymous users
-            if request.user.is_authenticated:
-                try:
-                    user_profile = UserProfile.objects.get(user=request.user)
-                    application_data['user_profile'] = user_profile
-                    
-                    # Only add personal details if they're provided (override profile data)
-                    if first_name:
-                        application_data['first_name'] = first_name
-                    if last_name:
-                        application_data['last_name'] = last_name
-                    if email:
-                        application_data['email'] = email
-                    if phone:
-                        application_data['phone'] = phone
-                        
-                except UserProfile.DoesNotExist:
-                    # Create user profile if it doesn't exist
-                    user_profile = UserProfile.objects.create(
-                        user=request.user,
-                        phone_number=phone or ''
-                    )
-                    application_data['user_profile'] = user_profile
-                    
-            else:
-                # For anonymous users, all personal details are required
-                if not all([first_name, last_name, email, phone]):
-                    return JsonResponse({
-                        'success': False, 
-                        'error': 'All personal details are required for guest applications'
-                    })
-                    
-                application_data.update({
-                    'first_name': first_name,
-                    'last_name': last_name,
-                    'email': email,
-                    'phone': phone
-                })
-            
-            # Validate loan amount against product limits
-            if hasattr(loan_product, 'min_loan_amount') and float(requested_amount) < loan_product.min_loan_amount:
-                return JsonResponse({
-                    'success': False, 
-                    'error': f'Requested amount is below minimum limit of ₹{loan_product.min_loan_amount:,}'
-                })
-                
-            if hasattr(loan_product, 'max_loan_amount') and float(requested_amount) > loan_product.max_loan_amount:
-                return JsonResponse({
-                    'success': False, 
-                    'error': f'Requested amount exceeds maximum limit of ₹{loan_product.max_loan_amount:,}'
-                })
-            
-            # Create loan application
-            application = LoanApplication.objects.create(**application_data)
-            
-            # Handle file uploads with new document types
-            document_mapping = {
-                'aadharCard': 'aadhar_card',
-                'panCard': 'pan_card',
-                'incomeProof': 'income_proof',
-                'bankStatement': 'bank_statement',
-                'udyamCertificate': 'udyam_certificate',
-                'gstCertificate': 'gst_certificate',
-            }
-            
-            # Define mandatory documents based on loan category
-            mandatory_docs = ['aadharCard', 'panCard']  # Always required
-            
-            # Add business-specific mandatory documents
-            if loan_product.category and 'business' in loan_product.category.lower():
-                mandatory_docs.append('udyamCertificate')
-            
-            uploaded_documents = []
-            missing_mandatory = []
-            
-            # Check and process all uploaded documents
-            for doc_field, doc_type in document_mapping.items():
-                if doc_field in request.FILES:
-                    file = request.FILES[doc_field]
-                    
-                    # Validate file size (e.g., max 10MB)
-                    if file.size > 10 * 1024 * 1024:
-                        return JsonResponse({
-                            'success': False, 
-                            'error': f'File {file.name} is too large. Maximum size is 10MB.'
-                        })
-                    
-                    # Validate file type
-                    allowed_extensions = ['.pdf', '.jpg', '.jpeg', '.png']
-                    file_extension = '.' + file.name.split('.')[-1].lower()
-                    if file_extension not in allowed_extensions:
-                        return JsonResponse({
-                            'success': False, 
-                            'error': f'File {file.name} has invalid format. Allowed: PDF, JPG, PNG'
-                        })
-                    
-                    document = LoanDocument.objects.create(
-                        application=application,
-                        document_type=doc_type,
-                        document_file=file,
-                        original_filename=file.name,
-                        is_mandatory=doc_field in mandatory_docs
-                    )
-                    uploaded_documents.append(document)
-                    
-                elif doc_field in mandatory_docs:
-                    missing_mandatory.append(doc_field)
-            
-            # Check if all mandatory documents are uploaded
-            if missing_mandatory:
-                # Delete the application if mandatory documents are missing
-                application.delete()
-                doc_names = {
-                    'aadharCard': 'Aadhar Card',
-                    'panCard': 'PAN Card',
-                    'udyamCertificate': 'Udyam Registration Certificate'
-                }
-                missing_names = [doc_names.get(doc, doc) for doc in missing_mandatory]
-                return JsonResponse({
-                    'success': False, 
-                    'error': f'Missing mandatory documents: {", ".join(missing_names)}'
-                })
-            
-            # Send confirmation email
+            request.FILES  # parse the body; document checks run while it streams
+            if getattr(request, 'upload_error', None):
+                return JsonResponse({'success': False, 'error': request.upload_error})
+
             try:
-                send_confirmation_email(application, uploaded_documents)
-            except Exception as email_error:
-                logger.error(f"Failed to send confirmation email: {str(email_error)}")
-                # Don't fail the application submission if email fails
+                loan_product, application_data, documents = validate_loan_application(request)
+            except ApplicationValidationError as e:
+                return JsonResponse({'success': False, 'error': str(e)})
+
+            application, uploaded_documents = create_loan_application(request, application_data, documents)
             
             return JsonResponse({
                 'success': True, 
                 'application_id': application.application_id,
-                'message': 'Application submitted successfully! Confirmation email has been sent.',
+                'message': 'Application submitted successfully! A confirmation email is on its way.',
                 'documents_uploaded': len(uploaded_documents)
             })
             
         except Exception as e:
-            logger.error(f"Error in loan application submission: {str(e)}")
+            logger.exception(f"Error in loan application submission: {str(e)}")
             return JsonResponse({'success': False, 'error': str(e)})
     
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
+@cache_control(no_cache=True)
+async def get_loan_products_api(request):
+    """
+    API endpoint to get loan products for the modal. Answers conditional
+    requests like @condition, which cannot wrap an async lookup.
+    """
+    payload = await aget_products_api_payload()
+    etag = payload['etag']
+    last_modified = payload['last_modified'] and int(payload['last_modified'].timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(payload['body'], content_type='application/json')
+    if request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        response.headers.setdefault('ETag', etag)
+    return response
 
-def send_confirmation_email(application, uploaded_documents):
+MAX_BATCH_QUOTES = 1000
+MAX_SCHEDULES = 10
+
+
+def parse_quote_item(loan_product, item):
     """
-    Send confirmation email to the applicant
+    Return ``(amount, tenure, rates)`` for one requested quote, checked
+    against the product's amount, rate and tenure ranges. Without an
+    ``interest_rate`` the quote covers the product's min and max rates.
     """
     try:
-        # Email context data
-        context = {
-            'application': application,
-            'uploaded_documents': uploaded_documents,
-            'company_name': getattr(settings, 'COMPANY_NAME', 'Your Loan Company'),
-            'company_email': getattr(settings, 'COMPANY_EMAIL', 'support@yourloancompany.com'),
-            'company_phone': getattr(settings, 'COMPANY_PHONE', '+1-800-LOAN-HELP'),
-            'company_address': getattr(settings, 'COMPANY_ADDRESS', '123 Finance Street, Money City, FC 12345'),
-            'website_url': getattr(settings, 'WEBSITE_URL', 'https://yourloancompany.com'),
-            'support_url': getattr(settings, 'SUPPORT_URL', 'https://yourloancompany.com/support'),
-        }
-        
-        # Render email templates
-        subject = f'Loan Application Confirmation - {application.application_id}'
-        
-        # HTML email content
-        html_content = render_to_string('loan_confirmation.html', context)
-        
-        # Plain text email content (fallback)
-        text_content = render_to_string('loan_confirmation.txt', context)
-        
-        # Create email message
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'sahil.kumar8800931@gmail.com'),
-            to=[application.email],
-            reply_to=[getattr(settings, 'COMPANY_EMAIL', 'sahil.kumar8800931@gmail.com')]
+        amount = Decimal(str(item['amount']))
+        tenure = int(item['tenure'])
+        rate = item.get('interest_rate')
+        rates = [Decimal(str(rate))] if rate is not None else [loan_product.min_interest_rate, loan_product.max_interest_rate]
+    except (KeyError, TypeError, ValueError, OverflowError, AttributeError, InvalidOperation):
+        # OverflowError: int() of an infinite tenure, which JSON like 1e999 parses to
+        raise ApplicationValidationError('Each quote needs a numeric amount and tenure')
+    if not amount.is_finite() or not all(r.is_finite() for r in rates):
+        raise ApplicationValidationError('Each quote needs a numeric amount and tenure')
+
+    if not loan_product.min_loan_amount <= amount <= loan_product.max_loan_amount:
+        raise ApplicationValidationError(
+            f'Amount must be between {loan_product.min_loan_amount} and {loan_product.max_loan_amount}'
         )
-        
-        # Attach HTML version
-        email.attach_alternative(html_content, "text/html")
-        
-        # Attach uploaded documents to email
-        for document in uploaded_documents:
-            try:
-                if document.document_file:
-                    email.attach_file(document.document_file.path)
-            except Exception as attach_error:
-                logger.warning(f"Could not attach document {document.original_filename}: {str(attach_error)}")
-        
-        # Send email
-        email.send()
-        logger.info(f"Confirmation email sent successfully to {application.email}")
-        
-    except Exception as e:
-        logger.error(f"Error sending confirmation email: {str(e)}")
-        raise
+    if not loan_product.min_tenure <= tenure <= loan_product.max_tenure:
+        raise ApplicationValidationError(
+            f'Tenure must be between {loan_product.min_tenure} and {loan_product.max_tenure} months'
+        )
+    if not all(loan_product.min_interest_rate <= r <= loan_product.max_interest_rate for r in rates):
+        raise ApplicationValidationError(
+            f'Interest rate must be between {loan_product.min_interest_rate}% and {loan_product.max_interest_rate}%'
+        )
+    return amount, tenure, sorted(set(rates))
+
+
+@csrf_exempt
+@require_POST
+def loan_quotes_api(request, product_id):
+    """
+    EMI quotes for one loan product.
+
+    Body: ``{"quotes": [{"amount": ..., "tenure": ..., "interest_rate": ...}],
+    "schedule": false}``; ``interest_rate`` is optional and ``schedule``
+    adds month-by-month rows (for up to MAX_SCHEDULES quotes).
+    """
+    loan_product = next((product for product in get_active_products() if product.pk == product_id), None)
+    if loan_product is None:
+        return JsonResponse({'success': False, 'error': 'Invalid loan product selected'}, status=404)
+
+    try:
+        data = json.loads(request.body)
+        items = list(data['quotes'])
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Expected a JSON body with a "quotes" list'}, status=400)
+    with_schedule = bool(data.get('schedule'))
+    if not 0 < len(items) <= MAX_BATCH_QUOTES:
+        return JsonResponse({'success': False, 'error': f'Request between 1 and {MAX_BATCH_QUOTES} quotes'}, status=400)
+    if with_schedule and len(items) > MAX_SCHEDULES:
+        return JsonResponse({'success': False, 'error': f'Schedules are limited to {MAX_SCHEDULES} quotes'}, status=400)
+
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            parsed.append(parse_quote_item(loan_product, item))
+        except ApplicationValidationError as e:
+            return JsonResponse({'success': False, 'error': f'Quote {index + 1}: {e}'}, status=400)
+
+    triples = [(amount, rate, tenure) for amount, tenure, rates in parsed for rate in rates]
+    quotes = iter(quote_batch(*zip(*triples)))
+    results = []
+    for amount, tenure, rates in parsed:
+        item_quotes = []
+        for _ in rates:
+            result = next(quotes)
+            row = result.as_dict()
+            if with_schedule:
+                row['schedule'] = schedule(result.principal, result.annual_rate, result.months)
+            item_quotes.append(row)
+        results.append({'amount': str(amount), 'tenure': tenure, 'quotes': item_quotes})
+
+    return JsonResponse({'success': True, 'loan_product': loan_product.pk, 'results': results})
 
-def get_loan_products_api(request):
-    """API endpoint to get loan products for the modal"""
-    loans = LoanProduct.objects.filter(is_active=True).values(
-        'id', 'name', 'category', 'min_loan_amount', 'max_loan_amount'
-    )
-    return JsonResponse({'loans': list(loans)})
 
 def userprofile(request):
-    return render(request,'profile.html')
\ No newline at end of file
+    return render(request,'profile.html')
+
+
+@cache_control(private=True, no_store=True)
+def document_download(request, token):
+    """Serve a loan document from a signed, expiring link sent in the confirmation email"""
+    try:
+        document = document_from_token(token)
+    except (signing.BadSignature, LoanDocument.DoesNotExist):
+        raise Http404('This download link is invalid or has expired')
+    return FileResponse(
+        document.document_file.open('rb'),
+        as_attachment=True,
+        filename=document.original_filename,
+        content_type=document.content_type or None,
+    )
+
+
+def metrics_view(request):
+    """Request metrics in the Prometheus text format, for staff and METRICS_ALLOWED_IPS"""
+    if not can_view_metrics(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
\ No newline at end of file
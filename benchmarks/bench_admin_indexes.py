@@ -0,0 +1,157 @@
+"""
+EXPLAIN plans and timings for the admin changelist filters, without and
+with the composite indexes from migration 0006.
+
+    python -m benchmarks.bench_admin_indexes --applications 2000000
+
+Seeding millions of rows takes a few minutes; pass --database to keep the
+seeded file around and --skip-seed to reuse it on later runs.
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks.common import add_common_arguments, report, setup_django, timed
+
+STATUSES = ['pending', 'under_review', 'approved', 'rejected', 'completed']
+DOCUMENT_TYPES = ['aadhar_card', 'pan_card', 'income_proof', 'bank_statement']
+
+
+def seed(applications, batch_size):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from app.models import LoanApplication, LoanDocument, LoanProduct, UserProfile
+
+    user = User.objects.create_user(username='bench', email='bench@example.com')
+    profile = UserProfile.objects.create(user=user)
+    products = [
+        LoanProduct.objects.create(name=f'Product {i}', category='Business Loan' if i % 3 == 0 else 'Personal Loan')
+        for i in range(12)
+    ]
+
+    # Spread timestamps over two years instead of letting auto_now(_add) stamp "now"
+    for model, names in ((LoanApplication, ['created_at', 'updated_at']), (LoanDocument, ['uploaded_at'])):
+        for name in names:
+            field = model._meta.get_field(name)
+            field.auto_now = field.auto_now_add = False
+
+    now = timezone.now()
+    rng = random.Random(42)
+    next_id = 0
+    for start in range(0, applications, batch_size):
+        batch = []
+        for _ in range(min(batch_size, applications - start)):
+            created = now - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+            batch.append(LoanApplication(
+                application_id=f'LA{next_id:018d}',
+                user_profile=profile,
+                loan_product=rng.choice(products),
+                requested_amount=rng.randrange(10000, 5000000),
+                annual_income=rng.randrange(200000, 5000000),
+                purpose='benchmark',
+                status=rng.choices(STATUSES, weights=[50, 20, 15, 10, 5])[0],
+                created_at=created,
+                updated_at=created + timedelta(days=rng.randrange(30)),
+            ))
+            next_id += 1
+        created_apps = LoanApplication.objects.bulk_create(batch)
+        LoanDocument.objects.bulk_create([
+            LoanDocument(
+                application=application,
+                document_type=document_type,
+                document_file='loan_documents/bench.pdf',
+                original_filename='bench.pdf',
+                is_mandatory=document_type in ('aadhar_card', 'pan_card'),
+                file_size=rng.randrange(50_000, 10_000_000),
+                uploaded_at=application.created_at,
+            )
+            for application in created_apps
+            for document_type in DOCUMENT_TYPES[:rng.randrange(2, 5)]
+        ])
+        print(f"seeded {start + len(batch):,} applications", end='\r', flush=True)
+    print()
+
+
+def admin_queries():
+    """(label, queryset) pairs mirroring the changelist filters, 100-row pages"""
+    from django.utils import timezone
+    from app.models import LoanApplication, LoanDocument, LoanProduct
+
+    week_ago = timezone.now() - timedelta(days=7)
+    product = LoanProduct.objects.order_by('pk').first()
+    application = LoanApplication.objects.order_by('pk').first()
+    return [
+        ('applications: default page', LoanApplication.objects.order_by('-created_at')),
+        ('applications: status=approved', LoanApplication.objects.filter(status='approved').order_by('-created_at')),
+        ('applications: loan_product', LoanApplication.objects.filter(loan_product=product).order_by('-created_at')),
+        ('applications: created last 7d', LoanApplication.objects.filter(created_at__gte=week_ago).order_by('-created_at')),
+        ('applications: updated last 7d', LoanApplication.objects.filter(updated_at__gte=week_ago).order_by('-created_at')),
+        ('documents: default page', LoanDocument.objects.order_by('-uploaded_at')),
+        ('documents: type=pan_card', LoanDocument.objects.filter(document_type='pan_card').order_by('-uploaded_at')),
+        ('documents: application status=rejected',
+         LoanDocument.objects.filter(application__status='rejected').order_by('-uploaded_at')),
+        ('documents: one application, one type',
+         LoanDocument.objects.filter(application=application, document_type='pan_card')),
+    ]
+
+
+def measure(repeat, show_plans):
+    rows = []
+    for label, queryset in admin_queries():
+        if show_plans:
+            print(f"\n{label}\n{queryset[:100].explain()}")
+        best_page = best_count = float('inf')
+        for _ in range(repeat):
+            with timed() as page:
+                list(queryset[:100])
+            with timed() as count:
+                queryset.count()
+            best_page = min(best_page, page['seconds'])
+            best_count = min(best_count, count['seconds'])
+        rows.append((label, f"page {best_page * 1000:9.1f} ms   count {best_count * 1000:9.1f} ms"))
+    return rows
+
+
+def set_indexes(enabled):
+    from django.db import connection
+    from app.models import LoanApplication, LoanDocument
+
+    with connection.schema_editor() as editor:
+        for model in (LoanApplication, LoanDocument):
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+    with connection.cursor() as cursor:
+        if connection.vendor in ('sqlite', 'postgresql'):
+            cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--applications', type=int, default=2_000_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3, help="Best-of timing runs per query")
+    parser.add_argument('--skip-seed', action='store_true', help="Reuse the rows already in --database")
+    parser.add_argument('--no-plans', action='store_true', help="Only print timings")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    if not args.skip_seed:
+        seed(args.applications, args.batch_size)
+
+    print("\n=== without composite indexes ===")
+    set_indexes(False)
+    before = measure(args.repeat, not args.no_plans)
+    print("\n=== with composite indexes ===")
+    set_indexes(True)
+    after = measure(args.repeat, not args.no_plans)
+
+    report("Without composite indexes", before)
+    report("With composite indexes", after)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Insert throughput into the unique application_id index, random vs time-ordered IDs.
+
+    python -m benchmarks.bench_application_ids --rows 2000000
+"""
+import argparse
+import random
+import string
+
+from benchmarks.common import add_common_arguments, report, setup_django, timed
+
+
+def random_ids():
+    """The previous scheme: 'LA' + 8 random digits"""
+    while True:
+        yield 'LA' + ''.join(random.choices(string.digits, k=8))
+
+
+def ordered_ids():
+    from app.ids import ApplicationIdGenerator
+    generator = ApplicationIdGenerator(node=1)
+    while True:
+        yield generator.next_id()
+
+
+def run(label, ids, rows, batch_size, profile, product):
+    from django.db import connection
+    from app.models import LoanApplication
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {LoanApplication._meta.db_table}')
+    with timed() as t:
+        for start in range(0, rows, batch_size):
+            LoanApplication.objects.bulk_create(
+                [
+                    LoanApplication(
+                        application_id=next(ids),
+                        user_profile=profile,
+                        loan_product=product,
+                        requested_amount=50000,
+                        annual_income=600000,
+                        purpose='benchmark',
+                    )
+                    for _ in range(min(batch_size, rows - start))
+                ],
+                ignore_conflicts=True,
+            )
+    stored = LoanApplication.objects.count()
+    return [
+        (f"{label}: rows/s", f"{rows / t['seconds']:,.0f}"),
+        (f"{label}: seconds", f"{t['seconds']:.1f}"),
+        (f"{label}: rows lost to ID collisions", f"{rows - stored:,}"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.contrib.auth.models import User
+    from app.models import LoanProduct, UserProfile
+
+    user = User.objects.create_user(username='bench', email='bench@example.com')
+    profile = UserProfile.objects.create(user=user)
+    product = LoanProduct.objects.create(name='Bench Loan', category='Personal Loan')
+
+    results = run('random', random_ids(), args.rows, args.batch_size, profile, product)
+    results += run('time-ordered', ordered_ids(), args.rows, args.batch_size, profile, product)
+    report(f"Application ID inserts ({args.rows:,} rows)", results)
+
+
+if __name__ == '__main__':
+    main()
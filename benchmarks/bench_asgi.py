@@ -0,0 +1,240 @@
+"""
+Latency and throughput of the JSON endpoints served over WSGI and over ASGI
+to many concurrent keep-alive clients.
+
+    pip install uvicorn
+    python -m benchmarks.bench_asgi --concurrency 1 16 64 --duration 10
+
+Both servers are uvicorn in a single process, so only the interface differs:
+``wsgi`` runs magenn.wsgi in uvicorn's thread pool, ``asgi`` runs
+magenn.asgi, where login_view, signup_view and get_loan_products_api stay on
+the event loop. Endpoints:
+
+    products  GET /api/loan-products/ (catalog served from the cache)
+    login     POST /login/ with a valid password (one session row written)
+
+Login rate limits and slow-request logging are switched off and passwords
+use a fast hasher; pass --real-hasher to include the configured one, which
+runs in a worker thread under ASGI.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import add_common_arguments, report, setup_django
+
+INTERFACES = {
+    'wsgi': ('wsgi', 'magenn.wsgi'),
+    'asgi': ('asgi3', 'magenn.asgi'),
+}
+EMAIL = 'bench@example.com'
+PASSWORD = 'bench-password'
+
+
+def _uvicorn():
+    try:
+        import uvicorn
+    except ImportError:
+        return None
+    return uvicorn
+
+
+def configure(real_hasher):
+    from django.conf import settings
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['127.0.0.1']
+    settings.LOGIN_RATE_LIMITS = {}
+    # Under load every request would be logged as slow
+    settings.SLOW_REQUEST_THRESHOLD_MS = float('inf')
+    if not real_hasher:
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def strip_header_values(application):
+    """
+    Django's WSGI handler writes Set-Cookie values with a leading space,
+    which uvicorn's WSGI adapter (h11) rejects
+    """
+    def wrapper(environ, start_response):
+        def strip(status, headers, *args):
+            return start_response(status, [(name, value.strip()) for name, value in headers], *args)
+        return application(environ, strip)
+    return wrapper
+
+
+def run_server(interface, port, database, real_hasher):
+    """Run inside the child process until it is terminated"""
+    import importlib
+
+    setup_django(database, migrate=False)
+    configure(real_hasher)
+    uvicorn_interface, module = INTERFACES[interface]
+    application = importlib.import_module(module).application
+    if interface == 'wsgi':
+        application = strip_header_values(application)
+    _uvicorn().run(
+        application, host='127.0.0.1', port=port, interface=uvicorn_interface,
+        log_level='warning', access_log=False, lifespan='off',
+    )
+
+
+def request_bytes(endpoint):
+    if endpoint == 'products':
+        return b'GET /api/loan-products/ HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'
+    body = json.dumps({'email': EMAIL, 'password': PASSWORD}).encode()
+    return (
+        b'POST /login/ HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+        b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body
+    )
+
+
+async def read_response(reader):
+    """Read one response off a keep-alive connection; returns its status"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status
+
+
+async def load(port, endpoint, concurrency, duration):
+    """``(latencies, errors, seconds)`` for ``concurrency`` clients looping for ``duration``"""
+    payload = request_bytes(endpoint)
+    latencies = []
+    errors = 0
+
+    async def client(deadline):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                writer.write(payload)
+                status = await read_response(reader)
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+        finally:
+            writer.close()
+
+    # A short warm-up so imports, templates and the catalog cache are not measured
+    await asyncio.gather(*(client(time.perf_counter() + 0.5) for _ in range(min(concurrency, 4))))
+    latencies.clear()
+    errors = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(client(start + duration) for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not listen on port {port} within {timeout}s")
+
+
+def summarize(latencies, errors, seconds):
+    if not latencies:
+        return f"no successful requests, errors {errors}"
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return (
+        f"{len(latencies) / seconds:8.0f} requests/s   p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+        f"p99 {p99 * 1000:7.2f} ms   errors {errors}"
+    )
+
+
+def seed(products):
+    from django.contrib.auth.models import User
+    from app.models import LoanProduct, UserProfile
+
+    for i in range(products):
+        LoanProduct.objects.create(
+            name=f'Loan {i}', category='Business Loan' if i % 3 == 0 else 'Personal Loan',
+            features='✓ Quick approval\n✓ Flexible tenure\n✓ No prepayment charges',
+        )
+    user = User.objects.create_user(username='bench', email=EMAIL, password=PASSWORD)
+    UserProfile.objects.create(user=user)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64], help="Concurrent clients")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds per measurement")
+    parser.add_argument('--endpoints', nargs='+', choices=('products', 'login'), default=['products', 'login'])
+    parser.add_argument('--interfaces', nargs='+', choices=INTERFACES, default=list(INTERFACES))
+    parser.add_argument('--products', type=int, default=12, help="Active loan products in the catalog")
+    parser.add_argument('--real-hasher', action='store_true')
+    parser.add_argument('--run-server', choices=INTERFACES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    if _uvicorn() is None:
+        parser.error("this benchmark needs uvicorn: pip install uvicorn")
+    if args.run_server:
+        run_server(args.run_server, args.port, args.database, args.real_hasher)
+        return
+
+    database = setup_django(args.database)
+    configure(args.real_hasher)
+    seed(args.products)
+
+    rows = []
+    for interface in args.interfaces:
+        port = free_port()
+        command = [
+            sys.executable, '-m', 'benchmarks.bench_asgi', '--run-server', interface, '--port', str(port),
+        ]
+        if database:
+            command += ['--database', database]
+        if args.real_hasher:
+            command.append('--real-hasher')
+        server = subprocess.Popen(command, env=os.environ.copy())
+        try:
+            wait_for_port(port, server)
+            for endpoint in args.endpoints:
+                for concurrency in args.concurrency:
+                    result = asyncio.run(load(port, endpoint, concurrency, args.duration))
+                    rows.append((f"{interface} {endpoint}, {concurrency} clients", summarize(*result)))
+                    print(f"measured {rows[-1][0]}", flush=True)
+        finally:
+            server.terminate()
+            server.wait()
+
+    report(f"WSGI vs ASGI, {args.duration:g} s per row", rows)
+
+
+if __name__ == '__main__':
+    main()
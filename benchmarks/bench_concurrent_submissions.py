@@ -0,0 +1,128 @@
+"""
+Concurrent loan submissions against each database profile: throughput and
+how many requests fail with "database is locked".
+
+    python -m benchmarks.bench_concurrent_submissions --threads 16 --submissions 25
+    DATABASE_PROFILE=postgresql POSTGRES_DB=magenn_bench \\
+        python -m benchmarks.bench_concurrent_submissions --profiles postgresql
+
+Profiles:
+    sqlite-default  Django's stock SQLite settings (rollback journal, deferred
+                    transactions, 5 s timeout) - the configuration before
+                    DATABASE_PROFILE existed
+    sqlite-tuned    SQLITE_OPTIONS from settings (WAL, BEGIN IMMEDIATE, busy_timeout)
+    postgresql      the server configured through the POSTGRES_* variables
+
+Each profile runs in its own process so its settings apply from the first
+connection onwards.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import add_common_arguments, report, setup_django, timed
+
+PROFILES = ('sqlite-default', 'sqlite-tuned', 'postgresql')
+
+
+def submission(product):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    return {
+        'firstName': 'Bench', 'lastName': 'User', 'email': 'bench@example.com', 'phone': '9000000000',
+        'loanType': product.id, 'requestedAmount': '50000', 'income': '600000', 'purpose': 'benchmark',
+        'aadharCard': SimpleUploadedFile('aadhar.pdf', b'%PDF-1.4 aadhar', content_type='application/pdf'),
+        'panCard': SimpleUploadedFile('pan.pdf', b'%PDF-1.4 pan', content_type='application/pdf'),
+    }
+
+
+def run_profile(profile, threads, submissions, database):
+    """Run inside the child process; returns a dict of counters"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'magenn.settings')
+    from django.conf import settings
+    if profile == 'sqlite-default':
+        settings.DATABASES['default']['OPTIONS'] = {}
+    settings.MEDIA_ROOT = tempfile.mkdtemp(prefix='magenn-bench-media-')
+    setup_django(database)
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from app.models import LoanProduct, UserProfile
+
+    setup_test_environment()
+    product = LoanProduct.objects.create(name='Bench', category='Personal Loan', min_loan_amount=1000, max_loan_amount=10**7)
+    clients = []
+    for i in range(threads):
+        user = User.objects.create_user(username=f'bench{i}', email=f'bench{i}@example.com')
+        UserProfile.objects.create(user=user)
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+    connection.close()
+
+    def worker(client):
+        counts = Counter()
+        try:
+            for _ in range(submissions):
+                body = client.post('/submit-loan-application/', submission(product)).json()
+                if body.get('success'):
+                    counts['ok'] += 1
+                elif 'locked' in body.get('error', ''):
+                    counts['locked'] += 1
+                else:
+                    counts['other'] += 1
+        finally:
+            connection.close()
+        return counts
+
+    with timed() as elapsed:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            totals = sum(pool.map(worker, clients), Counter())
+    return {'seconds': elapsed['seconds'], **totals}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--submissions', type=int, default=25, help="Submissions per thread")
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=['sqlite-default', 'sqlite-tuned'])
+    parser.add_argument('--run-profile', choices=PROFILES, help=argparse.SUPPRESS)
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    if args.run_profile:
+        result = run_profile(args.run_profile, args.threads, args.submissions, args.database)
+        print(json.dumps(result))
+        return
+
+    rows = []
+    for profile in args.profiles:
+        env = dict(os.environ, DATABASE_PROFILE='postgresql' if profile == 'postgresql' else 'sqlite')
+        command = [
+            sys.executable, '-m', 'benchmarks.bench_concurrent_submissions', '--run-profile', profile,
+            '--threads', str(args.threads), '--submissions', str(args.submissions),
+        ]
+        if args.database and profile != 'postgresql':
+            # One file per profile: each run seeds its own users
+            command += ['--database', f'{args.database}.{profile}']
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        attempted = args.threads * args.submissions
+        rows.append((profile, (
+            f"{result.get('ok', 0) / result['seconds']:8.1f} submissions/s   "
+            f"locked {result.get('locked', 0):5d}/{attempted}   other errors {result.get('other', 0)}"
+        )))
+        print(f"measured {profile}", flush=True)
+
+    report(f"{args.threads} threads x {args.submissions} submissions", rows)
+
+
+if __name__ == '__main__':
+    main()
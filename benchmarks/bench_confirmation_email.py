@@ -0,0 +1,95 @@
+"""
+Peak RSS and build/serialize time of one confirmation email per attachment
+mode, for an application carrying several large scans.
+
+    python -m benchmarks.bench_confirmation_email --documents 4 --size-mb 8
+
+"Send" here is what the SMTP backend does before touching the network:
+render the templates, read the attachments and encode the MIME message.
+Each mode runs in its own process so peak RSS (ru_maxrss) is not carried
+over from the previous one.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import add_common_arguments, report, setup_django
+
+MODES = ('attach', 'budget', 'links')
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def run_mode(mode, documents, size_mb, repeat, database):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'magenn.settings')
+    from django.conf import settings
+    settings.MEDIA_ROOT = tempfile.mkdtemp(prefix='magenn-bench-media-')
+    settings.EMAIL_ATTACHMENT_MODE = mode
+    setup_django(database)
+
+    from django.contrib.auth.models import User
+    from django.core.files.base import ContentFile
+    from app.emails import build_confirmation_email
+    from app.models import LoanApplication, LoanDocument, LoanProduct, UserProfile
+
+    user = User.objects.create_user(username='bench', email='bench@example.com')
+    application = LoanApplication.objects.create(
+        user_profile=UserProfile.objects.create(user=user),
+        loan_product=LoanProduct.objects.create(name='Bench'),
+        requested_amount=100000, annual_income=1200000, purpose='benchmark',
+    )
+    types = [choice for choice, _ in LoanDocument.DOCUMENT_TYPES]
+    for i in range(documents):
+        document = LoanDocument(application=application, document_type=types[i % len(types)],
+                                original_filename=f'scan{i}.pdf')
+        document.document_file.save(f'scan{i}.pdf', ContentFile(b'%PDF-1.4' + os.urandom(size_mb * 1024 * 1024)), save=False)
+        document.save()
+    uploaded = list(application.documents.all())
+
+    baseline = rss_mb()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        message_bytes = len(build_confirmation_email(application, uploaded).message().as_bytes())
+    seconds = (time.perf_counter() - start) / repeat
+    return {'seconds': seconds, 'rss_growth_mb': rss_mb() - baseline, 'message_bytes': message_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=4)
+    parser.add_argument('--size-mb', type=int, default=8, help="Size of each scan")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--run-mode', choices=MODES, help=argparse.SUPPRESS)
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args.run_mode, args.documents, args.size_mb, args.repeat, args.database)))
+        return
+
+    rows = []
+    for mode in args.modes:
+        command = [
+            sys.executable, '-m', 'benchmarks.bench_confirmation_email', '--run-mode', mode,
+            '--documents', str(args.documents), '--size-mb', str(args.size_mb), '--repeat', str(args.repeat),
+        ]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        rows.append((mode, (
+            f"{result['seconds'] * 1000:9.1f} ms/email   peak RSS +{result['rss_growth_mb']:7.1f} MB   "
+            f"message {result['message_bytes'] / 1024 / 1024:7.2f} MB"
+        )))
+
+    report(f"Confirmation email, {args.documents} x {args.size_mb} MB documents", rows)
+
+
+if __name__ == '__main__':
+    main()
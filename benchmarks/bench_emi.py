@@ -0,0 +1,89 @@
+"""
+EMI quote throughput: single Decimal quotes (cold and memoized), batches
+through quote_batch(), and the batch JSON API.
+
+    python -m benchmarks.bench_emi --quotes 100000
+
+The batch numbers use NumPy when it is installed; run once with and once
+without it to see the difference.
+"""
+import argparse
+import json
+import random
+from decimal import Decimal
+
+from benchmarks.common import add_common_arguments, report, setup_django, timed
+
+
+def random_inputs(count, seed):
+    rng = random.Random(seed)
+    return [
+        (Decimal(rng.randrange(1_000_000, 500_000_000)) / 100, Decimal(rng.randrange(500, 2400)) / 100, rng.randrange(6, 361))
+        for _ in range(count)
+    ]
+
+
+def rate(count, seconds):
+    return f"{count / seconds:12,.0f} quotes/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--quotes', type=int, default=100_000)
+    parser.add_argument('--api-batch', type=int, default=1000, help="Quotes per API request")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from app import amortization
+    from app.models import LoanProduct
+
+    inputs = random_inputs(args.quotes, seed=1)
+    rows = [("numpy", "installed" if amortization._numpy() else "not installed")]
+
+    amortization._cached_quote.cache_clear()
+    with timed() as cold:
+        for principal, annual_rate, months in inputs:
+            amortization.quote(principal, annual_rate, months)
+    rows.append(("single quote(), distinct inputs", rate(len(inputs), cold['seconds'])))
+
+    repeated = inputs[:amortization.QUOTE_CACHE_SIZE]
+    with timed() as warm:
+        for _ in range(max(1, len(inputs) // len(repeated))):
+            for principal, annual_rate, months in repeated:
+                amortization.quote(principal, annual_rate, months)
+    rows.append(("single quote(), repeated inputs", rate(len(repeated) * max(1, len(inputs) // len(repeated)), warm['seconds'])))
+
+    amortization._cached_quote.cache_clear()
+    batch_inputs = random_inputs(args.quotes, seed=2)
+    with timed() as batch:
+        amortization.quote_batch(*zip(*batch_inputs))
+    rows.append(("quote_batch(), distinct inputs", rate(len(batch_inputs), batch['seconds'])))
+
+    setup_test_environment()
+    product = LoanProduct.objects.create(
+        name='Bench', min_loan_amount=10_000, max_loan_amount=5_000_000,
+        min_interest_rate=5, max_interest_rate=24, min_tenure=6, max_tenure=360,
+    )
+    client = Client()
+    amortization._cached_quote.cache_clear()
+    api_inputs = random_inputs(args.api_batch * 10, seed=3)
+    bodies = [
+        json.dumps({'quotes': [
+            {'amount': str(principal), 'interest_rate': str(annual_rate), 'tenure': months}
+            for principal, annual_rate, months in api_inputs[start:start + args.api_batch]
+        ]})
+        for start in range(0, len(api_inputs), args.api_batch)
+    ]
+    with timed() as api:
+        for body in bodies:
+            client.post(f'/api/loan-products/{product.pk}/quotes/', body, content_type='application/json')
+    rows.append((f"POST quotes API, {args.api_batch} per request", rate(len(api_inputs), api['seconds'])))
+
+    report("EMI quote throughput", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Homepage requests per second for anonymous and logged-in visitors, with
+the page and fragment caches off and on.
+
+    python -m benchmarks.bench_homepage --requests 1000 --products 12
+
+"Off" sets HOMEPAGE_CACHE_TIMEOUT and LOAN_CARDS_CACHE_TIMEOUT to 0, so
+every hit renders index.html (parsed templates stay cached either way).
+Requests go through the full middleware stack in-process with the test
+client, one at a time, so the numbers are per-core.
+"""
+import argparse
+
+from benchmarks.common import add_common_arguments, report, setup_django, timed
+
+MODES = {
+    'caches off': {'HOMEPAGE_CACHE_TIMEOUT': 0, 'LOAN_CARDS_CACHE_TIMEOUT': 0},
+    'caches on': {},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1000, help="Homepage views per row")
+    parser.add_argument('--products', type=int, default=12, help="Active loan products on the page")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+    from app.models import LoanProduct, UserProfile
+
+    setup_test_environment()
+    settings.DEBUG = False
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    for i in range(args.products):
+        LoanProduct.objects.create(
+            name=f'Loan {i}', category='Business Loan' if i % 3 == 0 else 'Personal Loan',
+            features='✓ Quick approval\n✓ Flexible tenure\n✓ No prepayment charges',
+        )
+    user = User.objects.create_user(username='bench', email='bench@example.com', password='bench')
+    UserProfile.objects.create(user=user)
+
+    rows = []
+    for mode, overrides in MODES.items():
+        with override_settings(**overrides):
+            cache.clear()
+            anonymous = Client()
+            logged_in = Client()
+            logged_in.force_login(user)
+            for label, client in (('anonymous', anonymous), ('logged in', logged_in)):
+                client.get('/')  # warm the catalog, templates and caches
+                with timed() as elapsed:
+                    for _ in range(args.requests):
+                        client.get('/')
+                rate = args.requests / elapsed['seconds']
+                rows.append((f"{label}, {mode}", f"{rate:8.0f} requests/s   {1000 / rate:6.2f} ms/request"))
+
+    report(f"Homepage throughput, {args.products} loan products", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Login latency as the user table grows: the old unindexed ``email = %s``
+lookup versus the indexed, case-insensitive one, plus full POST /login/
+round trips.
+
+    python -m benchmarks.bench_login --sizes 10000 100000 1000000
+
+Password hashing is switched to a fast hasher by default so the numbers
+show the lookup cost; pass --real-hasher to include PBKDF2.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from benchmarks.common import add_common_arguments, report, setup_django
+
+PASSWORD = 'bench-password'
+
+
+def grow_users(target, batch_size, password_hash):
+    from django.contrib.auth.models import User
+
+    current = User.objects.count()
+    for start in range(current, target, batch_size):
+        stop = min(start + batch_size, target)
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'User{i}@Example.com', password=password_hash)
+            for i in range(start, stop)
+        ])
+    return target
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"p50 {statistics.median(samples) * 1000:8.3f} ms   p99 {p99 * 1000:8.3f} ms"
+
+
+def time_calls(fn, emails):
+    samples = []
+    for email in emails:
+        start = time.perf_counter()
+        fn(email)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--samples', type=int, default=200, help="Lookups / logins per size")
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--real-hasher', action='store_true')
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.conf import settings
+    if not args.real_hasher:
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from app.backends import users_by_email
+
+    setup_test_environment()
+    password_hash = make_password(PASSWORD)
+    rng = random.Random(7)
+    results = []
+
+    for size in sorted(args.sizes):
+        grow_users(size, args.batch_size, password_hash)
+        emails = [f'user{rng.randrange(size)}@example.com' for _ in range(args.samples)]
+        exact_emails = [email.replace('user', 'User').replace('example', 'Example') for email in emails]
+
+        legacy = time_calls(lambda email: User.objects.filter(email=email).first(), exact_emails)
+        indexed = time_calls(lambda email: users_by_email(email).first(), emails)
+
+        client = Client()
+        body = lambda email: json.dumps({'email': email, 'password': PASSWORD})
+        logins = time_calls(
+            lambda email: client.post('/login/', body(email), content_type='application/json'),
+            emails[: max(1, args.samples // 4)],
+        )
+
+        results += [
+            (f"{size:>9,} users: legacy email= lookup", percentiles(legacy)),
+            (f"{size:>9,} users: indexed LOWER(email)", percentiles(indexed)),
+            (f"{size:>9,} users: POST /login/", percentiles(logins)),
+        ]
+        print(f"measured {size:,} users", flush=True)
+
+    report("Login lookup latency by user table size", results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+CPU cost of POST /login/ per hasher, and of requests the rate limiter
+rejects before any hashing happens.
+
+    python -m benchmarks.bench_login_cpu --logins 50
+
+Times are process CPU time (``time.process_time``) on a single thread, so
+"logins/s per core" is simply the inverse of CPU seconds per login.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import add_common_arguments, report, setup_django
+
+PASSWORD = 'bench-password'
+HASHERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'argon2': 'app.hashers.TunableArgon2PasswordHasher',
+}
+
+
+def cpu_per_call(fn, count):
+    start = time.process_time()
+    for i in range(count):
+        fn(i)
+    return (time.process_time() - start) / count
+
+
+def login_body(email, password):
+    return json.dumps({'email': email, 'password': password})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=50, help="Logins per hasher")
+    parser.add_argument('--rejected', type=int, default=2000, help="Throttled attempts to time")
+    parser.add_argument('--hashers', nargs='+', choices=sorted(HASHERS), default=sorted(HASHERS))
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.conf import settings
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    settings.LOGIN_RATE_LIMITS = {}
+    user = User.objects.create_user(username='bench', email='bench@example.com')
+    client = Client()
+    results = []
+
+    for name in args.hashers:
+        settings.PASSWORD_HASHERS = [HASHERS[name]]
+        user.password = make_password(PASSWORD)
+        user.save(update_fields=['password'])
+        seconds = cpu_per_call(
+            lambda i: client.post('/login/', login_body('bench@example.com', PASSWORD), content_type='application/json'),
+            args.logins,
+        )
+        results.append((f"{name}: successful login", f"{seconds * 1000:8.2f} ms CPU   {1 / seconds:8.1f} logins/s/core"))
+
+    # Exhaust the per-email budget, then time attempts that get a 429
+    settings.LOGIN_RATE_LIMITS = {'email': (1, 3600)}
+    cache.clear()
+    client.post('/login/', login_body('bench@example.com', 'wrong'), content_type='application/json')
+    rejected = login_body('bench@example.com', 'wrong')
+    seconds = cpu_per_call(lambda i: client.post('/login/', rejected, content_type='application/json'), args.rejected)
+    results.append(("rate-limited attempt (429)", f"{seconds * 1000:8.2f} ms CPU   {1 / seconds:8.1f} rejections/s/core"))
+
+    report("Login CPU cost per request", results)
+
+
+if __name__ == '__main__':
+    main()
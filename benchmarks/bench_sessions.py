@@ -0,0 +1,55 @@
+"""
+Queries and latency of a logged-in homepage view for each session engine.
+
+    python -m benchmarks.bench_sessions --requests 500
+
+The catalog is warmed first, so the remaining queries are the session load
+and the user lookup done by AuthenticationMiddleware.
+"""
+import argparse
+
+from benchmarks.common import add_common_arguments, report, setup_django, timed
+
+ENGINES = ('db', 'cached_db', 'cache', 'signed_cookies')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500, help="Homepage views per engine")
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES))
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.db import connection, reset_queries
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, setup_test_environment
+    from app.catalog import get_active_products
+
+    setup_test_environment()
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    user = User.objects.create_user(username='bench', email='bench@example.com', password='bench')
+    get_active_products()
+    results = []
+
+    for name in args.engines:
+        settings.SESSION_ENGINE = settings.SESSION_ENGINES[name]
+        client = Client()
+        client.force_login(user)
+        client.get('/')
+        reset_queries()  # a full query log (e.g. after migrate) would hide new entries
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/')
+        with timed() as elapsed:
+            for _ in range(args.requests):
+                client.get('/')
+        per_request = elapsed['seconds'] / args.requests
+        results.append((name, f"{len(queries):2d} queries   {per_request * 1000:7.2f} ms/request"))
+
+    report("Logged-in homepage per session engine", results)
+
+
+if __name__ == '__main__':
+    main()
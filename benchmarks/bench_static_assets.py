@@ -0,0 +1,123 @@
+"""
+Bytes a first visit to the homepage downloads, with static files collected
+as-is and through the asset pipeline (app/assets.py).
+
+    python -m benchmarks.bench_static_assets --dpr 2
+
+Both runs collect into a scratch STATIC_ROOT and render the anonymous
+homepage. Every stylesheet, script and image it references is counted at
+its transfer size: the smallest precompressed copy a browser accepting
+br/gzip would get, and for <picture> elements the first (best) format's
+srcset candidate a browser would pick at --dpr for the ``sizes`` width.
+The HTML (uncompressed, and a little longer once images become <picture>
+elements) is reported separately from the static total.
+"""
+import argparse
+import re
+import tempfile
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote
+
+from benchmarks.common import add_common_arguments, report, setup_django
+
+STORAGES = {
+    'before': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    'after': 'app.assets.PipelineStaticFilesStorage',
+}
+
+
+class AssetParser(HTMLParser):
+    """Collect (kind, url) for the assets a browser fetches on first load"""
+
+    def __init__(self, dpr):
+        super().__init__()
+        self.dpr = dpr
+        self.assets = []
+        self.picture = None  # chosen <source> url inside the current <picture>
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and attrs.get('rel') == 'stylesheet':
+            self.assets.append(('css', attrs['href']))
+        elif tag == 'script' and attrs.get('src'):
+            self.assets.append(('js', attrs['src']))
+        elif tag == 'picture':
+            self.picture = ''
+        elif tag == 'source' and self.picture == '':
+            self.picture = self.pick(attrs['srcset'], attrs.get('sizes', '100vw'))
+        elif tag == 'img':
+            self.assets.append(('images', self.picture or attrs['src']))
+
+    def handle_endtag(self, tag):
+        if tag == 'picture':
+            self.picture = None
+
+    def pick(self, srcset, sizes):
+        match = re.match(r'(\d+)px', sizes)
+        wanted = int(match[1]) * self.dpr if match else 1920
+        candidates = sorted(
+            (int(width.rstrip('w')), url)
+            for url, width in (candidate.split() for candidate in srcset.split(','))
+        )
+        return next((url for width, url in candidates if width >= wanted), candidates[-1][1])
+
+
+def transfer_size(path):
+    sizes = [path.stat().st_size]
+    for suffix in ('.br', '.gz'):
+        if Path(f'{path}{suffix}').exists():
+            sizes.append(Path(f'{path}{suffix}').stat().st_size)
+    return min(sizes)
+
+
+def first_load(storage, dpr):
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    root = tempfile.mkdtemp(prefix='magenn-bench-static-')
+    with override_settings(
+        DEBUG=False, STATIC_ROOT=root,
+        STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': storage}},
+    ):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        html = Client().get('/').content
+
+    parser = AssetParser(dpr)
+    parser.feed(html.decode())
+    totals = {'html': len(html), 'css': 0, 'js': 0, 'images': 0}
+    for kind, url in parser.assets:
+        if url.startswith(settings.STATIC_URL):
+            totals[kind] += transfer_size(Path(root, unquote(url[len(settings.STATIC_URL):])))
+    return totals, len(parser.assets)
+
+
+def kb(size):
+    return f"{size / 1024:9.1f} KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dpr', type=int, default=2, help="Device pixel ratio used to pick srcset candidates")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+
+    results = {mode: first_load(storage, args.dpr) for mode, storage in STORAGES.items()}
+    rows = []
+    for kind in ('html', 'css', 'js', 'images'):
+        before, after = results['before'][0][kind], results['after'][0][kind]
+        rows.append((kind, f"{kb(before)} -> {kb(after)}"))
+    before = sum(size for kind, size in results['before'][0].items() if kind != 'html')
+    after = sum(size for kind, size in results['after'][0].items() if kind != 'html')
+    rows.append((f"static total ({results['after'][1]} requests)", f"{kb(before)} -> {kb(after)}  ({1 - after / before:.0%} less)"))
+    report(f"Homepage first-load bytes, before -> after the asset pipeline (DPR {args.dpr})", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+Each script runs against a throwaway SQLite database (or the one named by
+--database; with DATABASE_PROFILE=postgresql, the configured server) with
+the project's migrations applied, e.g.:
+
+    python -m benchmarks.bench_application_ids --rows 2000000
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django(database=None, migrate=True):
+    """Configure Django against a scratch database and return its path"""
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'magenn.settings')
+
+    from django.conf import settings
+    if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        # Other profiles (DATABASE_PROFILE=postgresql) use the configured database as is
+        if database is None:
+            database = os.path.join(tempfile.mkdtemp(prefix='magenn-bench-'), 'bench.sqlite3')
+        settings.DATABASES['default']['NAME'] = database
+
+    import django
+    django.setup()
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+    return database
+
+
+def add_common_arguments(parser):
+    parser.add_argument('--database', help="SQLite file to use instead of a temporary one")
+
+
+@contextmanager
+def timed():
+    """Yield a dict whose 'seconds' key is filled in when the block exits"""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
+
+
+def report(title, rows):
+    """Print a simple aligned table of (label, value) rows"""
+    print(f"\n{title}")
+    print('-' * len(title))
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"{label:<{width}}  {value}")
@@ -11,7 +11,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
+from urllib.parse import urlsplit, urlunsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,10 +60,17 @@ ROOT_URLCONF = 'magenn.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'app.metrics.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Parsed templates are kept in memory; the dev server's autoreloader
+            # resets the cache whenever a template changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -70,14 +83,194 @@ TEMPLATES = [
 WSGI_APPLICATION = 'magenn.wsgi.application'
 
 
+# Performance instrumentation (app/middleware.py, served at /metrics/)
+
+# Server-Timing and /metrics/ go to staff and METRICS_ALLOWED_IPS clients
+# only: query counts and timings are internal detail. No address is allowed
+# by default: behind a reverse proxy on the same host every visitor arrives
+# from 127.0.0.1, so list loopback only when nothing proxies to this server.
+PERFORMANCE_SERVER_TIMING = os.environ.get('PERFORMANCE_SERVER_TIMING', '1') == '1'
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 500))
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite33',
+# DATABASE_PROFILE selects the backend:
+#   sqlite      (default) one file, tuned for concurrent readers and a writer
+#   postgresql  for production; POSTGRES_* variables below
+# The benchmarks in benchmarks/bench_concurrent_submissions.py compare them.
+
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'sqlite')
+
+# Applied by Django on every new SQLite connection. WAL lets readers carry on
+# while a submission writes; synchronous=NORMAL is durable in WAL mode except
+# across power loss. BEGIN IMMEDIATE takes the write lock up front, so a busy
+# writer waits out `timeout` (busy_timeout) instead of failing on a lock upgrade.
+SQLITE_OPTIONS = {
+    'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),  # seconds
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA cache_size=-20000;'  # KiB
+        'PRAGMA mmap_size=134217728;'
+    ),
+}
+
+if DATABASE_PROFILE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'magenn'),
+            'USER': os.environ.get('POSTGRES_USER', 'magenn'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('POSTGRES_POOL', '1') == '1':
+        # psycopg's pool (needs psycopg[pool]); connections are reused by the
+        # pool, so Django's own persistence (CONN_MAX_AGE) must stay off
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+        }
+    else:
+        # Behind an external pooler such as PgBouncer: keep connections per worker
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('CONN_MAX_AGE', 60))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DATABASE_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite33'),
+            'OPTIONS': SQLITE_OPTIONS,
+        }
     }
+else:
+    raise ImproperlyConfigured(f"Unknown DATABASE_PROFILE {DATABASE_PROFILE!r}")
+
+
+# Cache
+# The loan catalog is invalidated through the cache, so deployments running
+# more than one worker process need a shared backend (set REDIS_URL); with
+# the per-process fallback the catalog timeouts below are kept short.
+
+# Sessions get their own alias so a catalog flush never logs anyone out. On
+# Redis that means their own database (REDIS_SESSION_DB, by default the one
+# after REDIS_URL's), since clear() flushes the whole database it points at.
+# Without Redis, SESSION_CACHE_DIR gives processes on one host a shared file
+# cache; the in-memory fallback is per process, so sessions then default to
+# the 'db' engine (see Sessions below).
+
+if os.environ.get('REDIS_URL'):
+    _redis = urlsplit(os.environ['REDIS_URL'])
+    _redis_db = int(_redis.path.strip('/') or 0)
+    REDIS_SESSION_DB = int(os.environ.get('REDIS_SESSION_DB', _redis_db + 1))
+    if REDIS_SESSION_DB == _redis_db:
+        raise ImproperlyConfigured("REDIS_SESSION_DB must differ from the database in REDIS_URL")
+    REDIS_SESSION_URL = urlunsplit(_redis._replace(path=f'/{REDIS_SESSION_DB}'))
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_SESSION_URL,
+            'KEY_PREFIX': 'session',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sessions',
+        },
+    }
+    if os.environ.get('SESSION_CACHE_DIR'):
+        CACHES['sessions'] = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['SESSION_CACHE_DIR'],
+        }
+SHARED_CACHE = bool(os.environ.get('REDIS_URL'))
+SHARED_SESSION_CACHE = bool(SHARED_CACHE or os.environ.get('SESSION_CACHE_DIR'))
+
+# The entries below are keyed on the catalog version, which a product change
+# bumps only in the cache of the process that saved it. On a shared cache the
+# timeouts just bound memory; on a per-process one they bound how long other
+# workers serve the old catalog.
+_CATALOG_TIMEOUT = 60 * 60 * 24 if SHARED_CACHE else 60
+LOAN_CATALOG_CACHE_TIMEOUT = int(os.environ.get('LOAN_CATALOG_CACHE_TIMEOUT', _CATALOG_TIMEOUT))
+# Rendered homepage loan cards; 0 disables
+LOAN_CARDS_CACHE_TIMEOUT = int(os.environ.get('LOAN_CARDS_CACHE_TIMEOUT', _CATALOG_TIMEOUT))
+# Whole homepage for visitors without a session cookie (app/pagecache.py); 0 disables
+HOMEPAGE_CACHE_TIMEOUT = int(os.environ.get('HOMEPAGE_CACHE_TIMEOUT', 10 * 60 if SHARED_CACHE else 60))
+
+
+# Sessions
+# SESSION_BACKEND picks the engine: 'cached_db' reads from the sessions
+# cache and falls back to the database, 'cache' skips the database entirely
+# (sessions are lost if the cache is flushed), 'signed_cookies' keeps the
+# whole session client-side, and 'db' is Django's default. The default is
+# 'cached_db' when the sessions cache is shared between processes and 'db'
+# otherwise: with a per-process cache, a logout in one worker would leave
+# the session cached, and logged in, in the others.
+# Expired database rows are removed by `manage.py purge_expired_sessions`.
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_BACKEND', 'cached_db' if SHARED_SESSION_CACHE else 'db')]
+SESSION_CACHE_ALIAS = 'sessions'
+
+
+# Authentication
+
+AUTHENTICATION_BACKENDS = [
+    'app.backends.ProfileModelBackend',
+]
+
+
+# Eligibility (app/eligibility.py)
+# Share of monthly income an applicant may spend on the new EMI; submissions
+# that are unaffordable even at the product's best rate are refused.
+
+ELIGIBILITY_MAX_EMI_RATIO = os.environ.get('ELIGIBILITY_MAX_EMI_RATIO', '0.5')
+ELIGIBILITY_REJECT_INELIGIBLE = os.environ.get('ELIGIBILITY_REJECT_INELIGIBLE', '1') == '1'
+
+
+# Password hashing
+# Argon2 (tuned below) is preferred when argon2-cffi is installed; existing
+# PBKDF2 hashes keep working and are upgraded transparently on next login.
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if importlib.util.find_spec('argon2') is not None:
+    PASSWORD_HASHERS.insert(0, 'app.hashers.TunableArgon2PasswordHasher')
+
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 19 * 1024))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+
+# Login throttling: (attempts, window in seconds), checked before any hashing
+LOGIN_RATE_LIMITS = {
+    'ip': (30, 60),
+    'email': (5, 5 * 60),
 }
 
 
@@ -119,24 +312,69 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS=[ 
 os.path.join(BASE_DIR,'static')] 
 STATIC_ROOT= os.path.join(BASE_DIR,'assets') 
+
+# collectstatic pipeline (app/assets.py): hashed names, minified CSS/JS,
+# .gz/.br copies and AVIF/WebP variants of images at these widths (px).
+# Needs collectstatic before serving, so it is off by default under DEBUG.
+STATIC_PIPELINE = os.environ.get('STATIC_PIPELINE', '0' if DEBUG else '1') == '1'
+if STATIC_PIPELINE:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'app.assets.PipelineStaticFilesStorage'},
+    }
+STATIC_IMAGE_WIDTHS = (120, 240, 480)
+STATIC_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # hashed files only; the rest revalidate
+# Serve STATIC_ROOT from Django when DEBUG is off; disable when nginx or a CDN does
+SERVE_STATIC = os.environ.get('SERVE_STATIC', '1') == '1'
  
 MEDIA_URL = '/media/' 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-ILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Uploads above this size are spooled to disk instead of held in memory.
+# Loan documents always go to disk (see app.uploads.LoanDocumentUploadHandler).
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Seconds a process holds its application ID node (app.ids) between renewals
+APPLICATION_ID_NODE_LEASE = 300
+
 # Allowed file extensions for loan documents
 LOAN_DOCUMENT_ALLOWED_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png']
-LOAN_DOCUMENT_MAX_SIZE = 5 * 1024 * 1024  # 5MB
+LOAN_DOCUMENT_MAX_SIZE = 10 * 1024 * 1024  # 10MB, checked while the upload streams
+
+# JPEG/PNG scans (normalized by `manage.py process_document_images`)
+DOCUMENT_IMAGE_MAX_DIMENSION = 2000  # pixels on the long side; enough for OCR and manual review
+DOCUMENT_IMAGE_JPEG_QUALITY = 85
+DOCUMENT_THUMBNAIL_SIZE = 240
+DOCUMENT_PROCESSING_WORKERS = int(os.environ.get('DOCUMENT_PROCESSING_WORKERS', os.cpu_count() or 1))
+DOCUMENT_PROCESSING_BATCH_SIZE = 50
+DOCUMENT_PROCESSING_LEASE_SECONDS = 10 * 60  # a batch claimed by a worker that died is retried after this
+DOCUMENT_PROCESSING_POLL_INTERVAL = 5  # seconds between polls with --loop when nothing is pending
 
 # Email configuration (for sending application confirmations)
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'sahil.kumar8800931@gmail.com'
 EMAIL_HOST_PASSWORD = 'wkkm lfpn kmsj iubm'
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = 30
+
+# Email outbox (delivered by `manage.py process_email_outbox`)
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_BASE_DELAY = 60  # seconds, doubled after every failed attempt
+EMAIL_OUTBOX_RETRY_MAX_DELAY = 60 * 60
+EMAIL_OUTBOX_LEASE_SECONDS = 5 * 60
+EMAIL_OUTBOX_POLL_INTERVAL = 5
+
+# Confirmation email attachments: 'attach' every document, send signed
+# 'links' only, or attach while the raw bytes fit in the 'budget' (base64
+# adds a third on the wire) and link the rest
+EMAIL_ATTACHMENT_MODE = os.environ.get('EMAIL_ATTACHMENT_MODE', 'budget')
+EMAIL_ATTACHMENT_BUDGET = 5 * 1024 * 1024
+EMAIL_DOCUMENT_LINK_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')  # base of links in emails
 # Security settings for file uploads
 SECURE_FILE_UPLOAD = True
 # Default primary key field type
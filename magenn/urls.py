@@ -1,9 +1,14 @@
 from django.contrib import admin 
-from django.urls import path,include 
+from django.urls import path,include,re_path
 from django.conf import settings 
 from django.conf.urls.static import static 
+from app.assets import serve_static
 urlpatterns = [ 
     path('admin/', admin.site.urls), 
     path('',include('app.url')), 
  
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) 
\ No newline at end of file
+]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) 
+
+# Under DEBUG runserver serves static files itself, uncached
+if getattr(settings, 'SERVE_STATIC', False) and not settings.DEBUG:
+    urlpatterns.append(re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static))